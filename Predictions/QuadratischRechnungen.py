@@ -1,89 +1,13 @@
 # -*- coding: utf-8 -*-
 
-import pandas as pd
-import numpy as np
-from sqlalchemy import text
-from connection import engine
-from sklearn.linear_model import LinearRegression
-from sklearn.preprocessing import PolynomialFeatures
-from sklearn.metrics import r2_score
+# Lineare und quadratische Vorhersage der nchsten 3 Quartale je Business ID aus backup ('forecast_backup').
+import os
+import sys
 
-# Funktion zur Berechnung der linearen und quadratischen Regression und Vorhersage
-def calculate_regressions(df):
-    # Um sicherzustellen, dass die Daten sortiert sind
-    df = df.sort_values(by='Key Date').reset_index(drop=True)
-    
-    # Erstellen des Zeit/Rechenabschnitts
-    df['Zeit/Rechen abschnitte'] = np.arange(len(df))
-    
-    # Entfernen von NaN-Werten aus den Spalten 'Value' und 'Zeit/Rechen abschnitte'
-    df_clean = df.dropna(subset=['Value'])
-    
-    if len(df_clean) < 2:
-        # Wenn nach dem Entfernen der NaN-Werte nicht gengend Daten fr eine Regression brig sind, berspringen
-        df['LinearPredictedValue'] = np.nan
-        df['QuadratischePredictedValue'] = np.nan
-        df['LinearBestimmtheitsgrad'] = np.nan
-        df['QuadratischBestimmtheitsgrad'] = np.nan
-        return df
-    
-    # Lineare Regression
-    X = df_clean['Zeit/Rechen abschnitte'].values.reshape(-1, 1)
-    y = df_clean['Value'].values
-    
-    linear_model = LinearRegression()
-    linear_model.fit(X, y)
-    
-    df['LinearPredictedValue'] = linear_model.predict(df['Zeit/Rechen abschnitte'].values.reshape(-1, 1))
-    
-    # Quadratische Regression
-    poly = PolynomialFeatures(degree=2)
-    X_poly = poly.fit_transform(X)
-    quadratic_model = LinearRegression()
-    quadratic_model.fit(X_poly, y)
-    
-    df['QuadratischePredictedValue'] = quadratic_model.predict(poly.fit_transform(df['Zeit/Rechen abschnitte'].values.reshape(-1, 1)))
-    
-    # Bestimmtheitsgrade berechnen
-    linear_r2 = r2_score(y, linear_model.predict(X)) * 100
-    quadratic_r2 = r2_score(y, quadratic_model.predict(X_poly)) * 100
-    
-    df['LinearBestimmtheitsgrad'] = linear_r2
-    df['QuadratischBestimmtheitsgrad'] = quadratic_r2
-    
-    # Vorhersagen fr zuknftige Zeitpunkte (3 zustzliche Quartale)
-    future_dates = pd.date_range(df['Key Date'].max(), periods=4, freq='Q')[1:]
-    future_df = pd.DataFrame({
-        'Key Date': future_dates,
-        'Business ID': df['Business ID'].iloc[0],
-        'Value': np.nan,
-        'Zeit/Rechen abschnitte': np.arange(len(df), len(df) + 3),
-        'LinearPredictedValue': linear_model.predict(np.arange(len(df), len(df) + 3).reshape(-1, 1)),
-        'QuadratischePredictedValue': quadratic_model.predict(poly.fit_transform(np.arange(len(df), len(df) + 3).reshape(-1, 1))),
-        'LinearBestimmtheitsgrad': linear_r2,
-        'QuadratischBestimmtheitsgrad': quadratic_r2
-    })
-    
-    # Zusammenfhren der vorhandenen Daten mit den zuknftigen Zeitpunkten
-    return pd.concat([df, future_df], ignore_index=True)
+# Repository-Wurzel fr `import tci`, wenn das Skript direkt gestartet wird
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-# SQL-Abfrage, um die Daten fr jede Business ID zu laden
-query = "SELECT * FROM backup"
+from tci.cli import main
 
-# Daten aus der Datenbank laden
-df = pd.read_sql(query, engine)
-
-# Ergebnisse initialisieren
-results = []
-
-# Anwendung der Berechnung fr jede Business ID
-for business_id, group in df.groupby('Business ID'):
-    results.append(calculate_regressions(group))
-
-# Zusammenfhren aller Ergebnisse
-final_df = pd.concat(results, ignore_index=True)
-
-# Daten zurck in die Datenbank schreiben
-final_df.to_sql('backup', con=engine, if_exists='replace', index=False)
-
-print("Die Berechnungen der linearen und quadratischen Regression und die Speicherung der Ergebnisse in der Datenbank waren erfolgreich.")
+if __name__ == '__main__':
+    main(['run', 'quadratic', '--table', 'backup', *sys.argv[1:]])
@@ -0,0 +1 @@
+# Gemeinsame Bausteine für die Kennzahlen-Skripte auf der Tabelle `ldp`
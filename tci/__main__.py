@@ -0,0 +1,3 @@
+from tci.cli import main
+
+main()
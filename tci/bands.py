@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+
+
+# Spaltenname für das k-Sigma-Band, z.B. 'Within_2Std_Range'
+def band_column(k):
+    return f'Within_{k:g}Std_Range'
+
+
+# Markiert für jede Zeile, ob der Wert innerhalb von Mittelwert ± k * Std
+# seiner Gruppe liegt – für alle Schwellen in `thresholds` in einem Durchlauf.
+# Mittelwert und Standardabweichung je Gruppe werden einmal per transform
+# berechnet (oder direkt übergeben). NaN-Werte und Gruppen ohne Std ergeben False.
+# Gibt einen DataFrame mit einer Spalte je Schwelle zurück (bool oder z.B. 'int8').
+def sigma_band_flags(values, groups=None, thresholds=(1, 2, 3), dtype=bool, columns=None, mean=None, std=None):
+    values = pd.Series(values) if not isinstance(values, pd.Series) else values
+    if mean is None or std is None:
+        grouped = values.groupby(np.asarray(groups), sort=False)
+        mean = grouped.transform('mean') if mean is None else mean
+        std = grouped.transform('std') if std is None else std
+
+    index = values.index
+    values = values.to_numpy(dtype=float)
+    mean = np.asarray(mean, dtype=float)
+    std = np.asarray(std, dtype=float)
+
+    flags = {}
+    for k in thresholds:
+        column = columns[k] if columns else band_column(k)
+        lower = mean - k * std
+        upper = mean + k * std
+        flags[column] = ((values >= lower) & (values <= upper)).astype(dtype)
+    return pd.DataFrame(flags, index=index)
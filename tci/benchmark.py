@@ -0,0 +1,170 @@
+import argparse
+import json
+import os
+import platform
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import sqlalchemy
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import make_url
+
+from tci.forecast_store import FORECAST_TABLE, MODEL_TABLE
+from tci.jobs import JOBS, run_jobs
+from tci.parallel import engine_for
+from tci.synthetic import generate_ldp, load_table
+
+SIZES = {'10k': 10_000, '1m': 1_000_000, '10m': 10_000_000}
+
+# Ab diesem Faktor gegenüber der Vergleichsdatei gilt eine Stufe als langsamer
+REGRESSION_FACTOR = 1.2
+
+# Ein Benchmark-Job je Skript (siehe tci.jobs) und 'pipeline' für alle Kennzahlen in einem Lauf
+BENCHMARK_JOBS = {
+    **{name: [name] for name in JOBS},
+    'pipeline': [name for name, job in JOBS.items() if job.kind == 'metric'],
+}
+
+
+def parse_size(value):
+    value = value.strip().lower()
+    if value in SIZES:
+        return SIZES[value]
+    factor = {'k': 1_000, 'm': 1_000_000}.get(value[-1:], 1)
+    return int(float(value[:-1] if factor > 1 else value) * factor)
+
+
+def parse_list(value):
+    return [v.strip() for v in value.split(',') if v.strip()]
+
+
+# Führt einen Job über tci.jobs.run_jobs aus; Lesen, Rechnen und Schreiben
+# kommen aus den Stufen des Laufberichts
+def run_job(job, engine):
+    names = BENCHMARK_JOBS[job]
+    if any(JOBS[name].kind == 'forecast' for name in names):
+        with engine.begin() as connection:
+            for table in (FORECAST_TABLE, MODEL_TABLE):
+                connection.execute(text(f"DROP TABLE IF EXISTS {table}"))
+
+    run = run_jobs(engine, names, trace_memory=False)
+    timings = {stage: 0.0 for stage in ('read', 'compute', 'write')}
+    for stage in run['stages']:
+        if stage['name'] in timings:
+            timings[stage['name']] += stage['wall_seconds']
+    writes = run['extra']['writes']
+    return {
+        'job': job,
+        'script': JOBS[job].script if job in JOBS else 'tci/jobs.py',
+        'rows': run['extra']['rows'],
+        'rows_written': sum(w['rows'] for w in writes),
+        'affected': sum(w['affected'] for w in writes),
+        'statements': sum(s['count'] for s in run['statements'].values()),
+        'write_method': ','.join(w['method'] for w in writes),
+        **{f'{stage}_seconds': round(seconds, 4) for stage, seconds in timings.items()},
+        'total_seconds': round(sum(timings.values()), 4),
+        'max_rss_mb': run['max_rss_mb'],
+    }
+
+
+# SQLite-Datei je Größe und Datenparametern; vorhandene Dateien werden wiederverwendet
+def prepare_database(workdir, rows, options, regenerate=False):
+    name = f"ldp_{rows}_q{options['quarters']}_n{options['nan_ratio']:g}_s{options['skew']:g}_r{options['seed']}.db"
+    path = os.path.join(workdir, name)
+    engine = engine_for(make_url(f'sqlite:///{path}'))
+    if regenerate or not inspect(engine).has_table('ldp'):
+        started = time.perf_counter()
+        load_table(engine, generate_ldp(rows=rows, **options))
+        print(f"{path}: {rows} Zeilen erzeugt in {time.perf_counter() - started:.1f}s")
+    return engine
+
+
+def environment():
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'sqlalchemy': sqlalchemy.__version__,
+    }
+
+
+def run_benchmark(sizes, jobs=None, workdir='.', quarters=12, nan_ratio=0.1, skew=0.5, seed=0, regenerate=False):
+    jobs = list(jobs or BENCHMARK_JOBS)
+    options = {'quarters': quarters, 'nan_ratio': nan_ratio, 'skew': skew, 'seed': seed}
+    os.makedirs(workdir, exist_ok=True)
+    results = []
+    for rows in sizes:
+        engine = prepare_database(workdir, rows, options, regenerate)
+        try:
+            for job in jobs:
+                result = {'size': rows, **run_job(job, engine)}
+                results.append(result)
+                print(summary_line(result))
+        finally:
+            engine.dispose()
+    return {'environment': environment(), 'options': options, 'results': results}
+
+
+def summary_line(result):
+    return (f"{result['size']:>10} {result['job']:<16} lesen {result['read_seconds']:8.2f}s  "
+            f"rechnen {result['compute_seconds']:8.2f}s  schreiben {result['write_seconds']:8.2f}s  "
+            f"gesamt {result['total_seconds']:8.2f}s")
+
+
+# Vergleicht zwei Benchmark-Ergebnisse je (Größe, Job, Stufe); gibt die Stufen
+# zurück, die um mehr als `factor` langsamer geworden sind
+def compare(baseline, current, factor=REGRESSION_FACTOR):
+    previous = {(r['size'], r['job']): r for r in baseline['results']}
+    regressions = []
+    for result in current['results']:
+        before = previous.get((result['size'], result['job']))
+        if before is None:
+            continue
+        for stage in ('read', 'compute', 'write', 'total'):
+            old, new = before[f'{stage}_seconds'], result[f'{stage}_seconds']
+            if old > 0 and new / old > factor:
+                regressions.append({'size': result['size'], 'job': result['job'], 'stage': stage,
+                                    'baseline_seconds': old, 'seconds': new, 'factor': round(new / old, 2)})
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Misst Lesen, Rechnen und Schreiben aller Skripte auf synthetischen Daten.")
+    parser.add_argument('--sizes', type=parse_list, default=['10k', '1m', '10m'],
+                        help="Kommagetrennte Zeilenzahlen, z.B. 10k,1m,10m (Standard)")
+    parser.add_argument('--jobs', type=parse_list, default=None,
+                        help=f"Kommagetrennte Auswahl aus: {', '.join(BENCHMARK_JOBS)} (Standard: alle)")
+    parser.add_argument('--workdir', default='benchmark_data', help="Verzeichnis für die SQLite-Dateien")
+    parser.add_argument('--quarters', type=int, default=12)
+    parser.add_argument('--nan-ratio', type=float, default=0.1)
+    parser.add_argument('--skew', type=float, default=0.5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--regenerate', action='store_true', help="Daten neu erzeugen statt wiederverwenden")
+    parser.add_argument('--output', default='benchmark.json', help="JSON-Datei für die Ergebnisse")
+    parser.add_argument('--compare', default=None, help="Früheres Ergebnis (JSON) zum Vergleich")
+    args = parser.parse_args(argv)
+
+    unknown = [j for j in args.jobs or [] if j not in BENCHMARK_JOBS]
+    if unknown:
+        parser.error(f"Unbekannte(r) Job(s): {', '.join(unknown)}")
+
+    report = run_benchmark([parse_size(s) for s in args.sizes], args.jobs, args.workdir, quarters=args.quarters,
+                           nan_ratio=args.nan_ratio, skew=args.skew, seed=args.seed, regenerate=args.regenerate)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            report['regressions'] = compare(json.load(f), report)
+        for regression in report['regressions']:
+            print(f"Langsamer: {regression['size']} {regression['job']} {regression['stage']} "
+                  f"{regression['baseline_seconds']:.2f}s -> {regression['seconds']:.2f}s (x{regression['factor']})")
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=1)
+    print(f"Ergebnisse in {args.output} gespeichert.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,239 @@
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import bindparam, text
+from sqlalchemy.exc import OperationalError
+
+CACHE_VERSION = 2
+
+# Umgebungsvariable für das Cache-Verzeichnis (gilt für alle Skripte über load_ldp)
+CACHE_DIR_ENV = 'TCI_CACHE_DIR'
+
+NULL_PARTITION = 'null'
+
+# Verzeichnisname einer Partition: volles Key Date einschließlich Uhrzeit, damit
+# Zeitpunkte desselben Tages getrennte Partitionen bleiben (lexikografisch sortierbar)
+PARTITION_FORMAT = '%Y-%m-%d_%H%M%S_%f'
+
+# Aggregate des Fingerabdrucks je Partition mit dem Typ, in dem sie verglichen werden
+FINGERPRINT_AGGREGATES = {
+    "COUNT(*)": int,
+    "COUNT(`Value`)": int,
+    "SUM(`Value`)": float,
+    "SUM(`Value` * `Value`)": float,
+    "MIN(`Business ID`)": str,
+    "MAX(`Business ID`)": str,
+    "SUM(LENGTH(`Business ID`))": int,
+    "SUM(`Value` * LENGTH(`Business ID`))": float,
+}
+
+# Prüfsumme über Business ID und Value gemeinsam (erkennt auch zwischen IDs
+# vertauschte Werte); unter SQLite über die von tci.engine registrierte CRC32-Funktion
+ROW_CHECKSUMS = {
+    'mysql': "SUM(CRC32(CONCAT_WS('|', `Business ID`, `Value`)))",
+    'mariadb': "SUM(CRC32(CONCAT_WS('|', `Business ID`, `Value`)))",
+    'sqlite': "SUM(CRC32(`Business ID` || '|' || COALESCE(`Value`, '')))",
+}
+
+# Maximale Anzahl Partitionen je IN-Liste beim Nachladen
+IN_BATCH = 100
+
+
+def default_cache_dir():
+    return os.environ.get(CACHE_DIR_ENV)
+
+
+def _partition_name(key_date):
+    if key_date is None or pd.isna(key_date):
+        return NULL_PARTITION
+    return pd.Timestamp(key_date).strftime(PARTITION_FORMAT)
+
+
+def _partition_date(name):
+    return pd.NaT if name == NULL_PARTITION else pd.to_datetime(name, format=PARTITION_FORMAT)
+
+
+def _fingerprint_rows(engine, table, aggregates):
+    sql = text(f"SELECT `Key Date`, {', '.join(aggregates)} FROM {table} GROUP BY `Key Date`;")
+    with engine.connect() as connection:
+        return connection.execute(sql).fetchall()
+
+
+# Fingerabdruck je Partition (Key Date) mit einer einzigen aggregierenden Abfrage,
+# in allen Dialekten: Zeilenzahl, Anzahl, Summe und Quadratsumme der Werte
+# (erkennt geänderte Werte an Ort und Stelle), kleinste/größte Business ID,
+# Summe der ID-Längen und die mit der ID-Länge gewichtete Wertesumme; unter
+# MySQL und SQLite (mit CRC32 aus tci.engine) zusätzlich die Prüfsumme ROW_CHECKSUMS
+def partition_fingerprints(engine, table='ldp'):
+    aggregates = dict(FINGERPRINT_AGGREGATES)
+    checksum = ROW_CHECKSUMS.get(engine.dialect.name)
+    if checksum:
+        aggregates[checksum] = int
+    try:
+        rows = _fingerprint_rows(engine, table, aggregates)
+    except OperationalError:
+        # SQLite-Engine ohne registrierte CRC32-Funktion
+        if not checksum or engine.dialect.name != 'sqlite':
+            raise
+        del aggregates[checksum]
+        rows = _fingerprint_rows(engine, table, aggregates)
+    fingerprints = {}
+    raw_keys = {}
+    for key_date, *values in rows:
+        name = _partition_name(key_date)
+        fingerprints[name] = [None if value is None else convert(value)
+                              for convert, value in zip(aggregates.values(), values)]
+        raw_keys[name] = key_date
+    return fingerprints, raw_keys
+
+
+def _same_fingerprint(a, b):
+    if a is None or b is None or len(a) != len(b):
+        return False
+    for x, y in zip(a, b):
+        if isinstance(x, float) and isinstance(y, float):
+            if not np.isclose(x, y, rtol=1e-12, atol=0.0):
+                return False
+        elif x != y:
+            return False
+    return True
+
+
+# Lokale Momentaufnahme von (Key Date, Business ID, Value) einer Tabelle als
+# speichergemappte NumPy-Arrays, eine Partition je Key Date:
+#   <cache_dir>/<table>/meta.json, business_ids.npy, <Key Date>/codes.npy, value.npy
+# Die Business-ID-Liste wird nur erweitert, damit Codes alter Partitionen gültig bleiben.
+class SnapshotCache:
+    def __init__(self, cache_dir, table='ldp'):
+        self.table = table
+        self.path = os.path.join(cache_dir, table)
+        os.makedirs(self.path, exist_ok=True)
+        self.meta = self._read_meta()
+        ids_path = os.path.join(self.path, 'business_ids.npy')
+        ids = np.load(ids_path, allow_pickle=False).tolist() if os.path.exists(ids_path) else []
+        self.business_ids = ids
+        self.id_codes = {business_id: code for code, business_id in enumerate(ids)}
+
+    def _read_meta(self):
+        meta_path = os.path.join(self.path, 'meta.json')
+        if os.path.exists(meta_path):
+            with open(meta_path, encoding='utf-8') as f:
+                meta = json.load(f)
+            if meta.get('version') == CACHE_VERSION:
+                return meta
+        return {'version': CACHE_VERSION, 'table': self.table, 'partitions': {}}
+
+    def _write_meta(self):
+        tmp_path = os.path.join(self.path, 'meta.json.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.meta, f, indent=1)
+        os.replace(tmp_path, os.path.join(self.path, 'meta.json'))
+
+    def _write_ids(self):
+        tmp_path = os.path.join(self.path, 'business_ids.tmp.npy')
+        np.save(tmp_path, np.array(self.business_ids, dtype=str))
+        os.replace(tmp_path, os.path.join(self.path, 'business_ids.npy'))
+
+    def _encode(self, business_ids):
+        local_codes, uniques = pd.factorize(np.asarray(business_ids, dtype=object))
+        mapping = np.empty(len(uniques), dtype=np.int32)
+        for i, business_id in enumerate(uniques):
+            code = self.id_codes.get(business_id)
+            if code is None:
+                code = self.id_codes[business_id] = len(self.business_ids)
+                self.business_ids.append(business_id)
+            mapping[i] = code
+        return mapping[local_codes]
+
+    def _write_partition(self, name, frame):
+        # NULL-Business-IDs werden wie beim Gruppieren nicht zwischengespeichert
+        frame = frame[frame['Business ID'].notna()]
+        directory = os.path.join(self.path, name)
+        tmp_directory = directory + '.tmp'
+        shutil.rmtree(tmp_directory, ignore_errors=True)
+        os.makedirs(tmp_directory)
+        np.save(os.path.join(tmp_directory, 'codes.npy'), self._encode(frame['Business ID'].astype(str).tolist()))
+        np.save(os.path.join(tmp_directory, 'value.npy'), pd.to_numeric(frame['Value']).to_numpy(dtype=np.float64))
+        shutil.rmtree(directory, ignore_errors=True)
+        os.replace(tmp_directory, directory)
+
+    def _fetch_partitions(self, engine, names, raw_keys):
+        base = f"SELECT `Key Date`, `Business ID`, `Value` FROM {self.table} WHERE "
+        keys = [raw_keys[name] for name in names if name != NULL_PARTITION]
+        frames = []
+        query = text(base + "`Key Date` IN :keys;").bindparams(bindparam('keys', expanding=True))
+        for start in range(0, len(keys), IN_BATCH):
+            frames.append(pd.read_sql_query(query, engine, params={'keys': keys[start:start + IN_BATCH]}))
+        if NULL_PARTITION in names:
+            frames.append(pd.read_sql_query(text(base + "`Key Date` IS NULL;"), engine))
+        if not frames:
+            return {}
+        df = pd.concat(frames, ignore_index=True)
+        df['_partition'] = [_partition_name(k) for k in df['Key Date']]
+        return {name: group for name, group in df.groupby('_partition', sort=False)}
+
+    # Gleicht den Cache mit der Datenbank ab: nur neue oder geänderte Partitionen
+    # werden gelesen, entfernte gelöscht. Gibt die Namen der nachgeladenen Partitionen zurück.
+    def refresh(self, engine):
+        fingerprints, raw_keys = partition_fingerprints(engine, self.table)
+        cached = self.meta['partitions']
+        stale = [name for name, fp in fingerprints.items() if not _same_fingerprint(cached.get(name), fp)]
+        removed = [name for name in cached if name not in fingerprints]
+
+        if stale:
+            fetched = self._fetch_partitions(engine, stale, raw_keys)
+            for name in stale:
+                frame = fetched.get(name, pd.DataFrame(columns=['Key Date', 'Business ID', 'Value']))
+                self._write_partition(name, frame)
+                cached[name] = fingerprints[name]
+            self._write_ids()
+        for name in removed:
+            shutil.rmtree(os.path.join(self.path, name), ignore_errors=True)
+            del cached[name]
+        if stale or removed:
+            self._write_meta()
+        return stale
+
+    # Setzt den Cache als DataFrame im Format von tci.loader.load_ldp zusammen
+    def frame(self, value_dtype='float64', key_date='datetime'):
+        names = sorted(self.meta['partitions'])
+        codes, values, dates = [], [], []
+        for name in names:
+            directory = os.path.join(self.path, name)
+            part_codes = np.load(os.path.join(directory, 'codes.npy'), mmap_mode='r')
+            codes.append(part_codes)
+            values.append(np.load(os.path.join(directory, 'value.npy'), mmap_mode='r'))
+            date = _partition_date(name)
+            dates.append(np.full(len(part_codes), date, dtype='datetime64[ns]'))
+
+        categories = np.array(self.business_ids, dtype=object)
+        codes = np.concatenate(codes) if codes else np.empty(0, dtype=np.int32)
+        business_ids = pd.Categorical.from_codes(codes, categories=categories)
+        business_ids = business_ids.reorder_categories(np.sort(categories))
+        df = pd.DataFrame({
+            'Key Date': pd.to_datetime(np.concatenate(dates) if dates else np.empty(0, dtype='datetime64[ns]')),
+            'Business ID': business_ids,
+            'Value': (np.concatenate(values) if values else np.empty(0)).astype(value_dtype),
+        })
+        if key_date == 'quarter':
+            from tci.loader import quarter_ordinal
+            df['Key Date'] = quarter_ordinal(df['Key Date'])
+        return df
+
+
+# Liest (Key Date, Business ID, Value) über den lokalen Cache; die Datenbank
+# wird nur nach dem Fingerabdruck und den geänderten Partitionen gefragt
+def load_cached(engine, table='ldp', cache_dir=None, value_dtype='float64', key_date='datetime', verbose=False):
+    cache_dir = cache_dir or default_cache_dir()
+    started = time.perf_counter()
+    cache = SnapshotCache(cache_dir, table)
+    refreshed = cache.refresh(engine)
+    df = cache.frame(value_dtype, key_date)
+    if verbose:
+        state = f"{len(refreshed)} Partition(en) nachgeladen" if refreshed else "unverändert, kein Lesen aus der Datenbank"
+        print(f"Cache {cache.path}: {state}, {len(df)} Zeilen in {time.perf_counter() - started:.2f}s")
+    return df
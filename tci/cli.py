@@ -0,0 +1,144 @@
+import argparse
+import importlib
+import sys
+
+# Unterbefehle, die an die main()-Funktion eines Moduls weitergereicht werden
+DELEGATES = {
+    'pipeline': 'tci.pipeline',
+    'incremental': 'tci.incremental',
+    'streaming': 'tci.streaming',
+    'parallel': 'tci.parallel',
+    'pushdown': 'tci.pushdown',
+    'overlap': 'tci.overlap',
+    'lookup': 'tci.lookup',
+    'panel': 'tci.panel',
+    'robust': 'tci.robust',
+    'benchmark': 'tci.benchmark',
+    'synthetic': 'tci.synthetic',
+    'engine': 'tci.engine',
+}
+
+MODES = ('fused', 'overlap', 'incremental', 'streaming', 'parallel', 'pushdown')
+
+
+# Engine aus --url oder, wie in den Skripten, aus tci.engine.default_engine
+# (Umgebung bzw. connection.py)
+def get_engine(url=None):
+    from tci.engine import default_engine, make_engine
+
+    return make_engine(url=url) if url else default_engine()
+
+
+def _run(args, parser):
+    from tci.jobs import JOBS, parse_jobs
+
+    try:
+        names = parse_jobs(args.jobs)
+    except ValueError as e:
+        parser.error(str(e))
+    engine = get_engine(args.url)
+
+    if args.mode == 'fused':
+        from tci.jobs import run_jobs
+
+        run_jobs(engine, names, table=args.table, method=args.method, value_dtype=args.value_dtype,
+                 report_path=args.report, trace_memory=args.trace_memory, show=args.show,
+                 fit_cache_dir=args.fit_cache, panel=args.panel, changed_only=not args.write_all,
+                 dry_run=args.dry_run)
+        return
+
+    if args.mode == 'overlap':
+        from tci.overlap import run_overlapped
+
+        run_overlapped(engine, names, table=args.table, method=args.method, value_dtype=args.value_dtype,
+                       report_path=args.report, trace_memory=args.trace_memory, panel=args.panel,
+                       changed_only=not args.write_all, dry_run=args.dry_run)
+        return
+
+    if args.dry_run:
+        parser.error(f"--dry-run gibt es nur in den Modi fused und overlap, nicht in '{args.mode}'")
+
+    if args.mode == 'pushdown':
+        from tci.pushdown import PUSHDOWN_JOBS, run_pushdown
+
+        unsupported = [name for name in names if name not in PUSHDOWN_JOBS]
+        if unsupported:
+            parser.error(f"Modus 'pushdown' unterstützt nicht: {', '.join(unsupported)}")
+        run_pushdown(engine, names, table=args.table)
+        return
+
+    kinds = ('metric', 'forecast') if args.mode == 'parallel' else ('metric',)
+    unsupported = [name for name in names if JOBS[name].kind not in kinds]
+    if unsupported:
+        parser.error(f"Modus '{args.mode}' unterstützt nur {' und '.join(kinds)}-Jobs, nicht: {', '.join(unsupported)}")
+    if args.mode == 'incremental':
+        from tci.incremental import run_incremental
+        run_incremental(engine, names, table=args.table, method=args.method)
+    elif args.mode == 'streaming':
+        from tci.streaming import run_streaming
+        run_streaming(engine, names, table=args.table, method=args.method)
+    else:
+        from tci.parallel import run_parallel
+        run_parallel(engine, [name for name in names if JOBS[name].kind == 'metric'], workers=args.workers,
+                     table=args.table, method=args.method,
+                     forecasts=[name for name in names if JOBS[name].kind == 'forecast'])
+
+
+def _list(args, parser):
+    from tci.jobs import JOBS
+
+    for name, job in JOBS.items():
+        target = ', '.join(job.columns) if job.columns else 'Vorhersagetabelle'
+        print(f"{name:<18} {target:<22} {job.script}")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='python -m tci',
+        description="Kennzahlen und Vorhersagen für die Tabelle ldp.",
+        epilog=f"Weitere Befehle (eigene Optionen, siehe '<befehl> --help'): {', '.join(DELEGATES)}")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run = commands.add_parser('run', help="Jobs in einem Prozess ausführen, z.B. 'run change,volatility'")
+    run.add_argument('jobs', help="Kommagetrennte Jobs (siehe 'list') oder 'all'")
+    run.add_argument('--mode', choices=MODES, default='fused',
+                     help="fused: einmal lesen/schreiben (Standard); overlap: blockweise mit überlappendem Lesen, "
+                          "Rechnen und Schreiben; sonst inkrementell, blockweise (streaming: Speicher je Block "
+                          "begrenzt, mindestens die größte Business ID), parallel "
+                          "oder pushdown (Fensterfunktionen in der Datenbank)")
+    run.add_argument('--table', default='ldp')
+    run.add_argument('--method', choices=['auto', 'staging', 'executemany'], default='auto')
+    run.add_argument('--value-dtype', choices=['float64', 'float32'], default='float64')
+    run.add_argument('--workers', type=int, default=4, help="Worker-Prozesse im Modus parallel")
+    run.add_argument('--url', default=None, help="SQLAlchemy-URL statt connection.engine")
+    run.add_argument('--report', default=None, help="JSON-Datei für den Laufbericht")
+    run.add_argument('--trace-memory', action='store_true', default=None, help="Speicherspitzen mit tracemalloc")
+    run.add_argument('--fit-cache', default=None,
+                     help="Verzeichnis des Fit-Caches für Regressionen (Standard: TCI_FIT_CACHE_DIR, nur Modus fused)")
+    run.add_argument('--panel', action='store_true',
+                     help="Kennzahlen in der dichten Darstellung Business ID × Key Date rechnen (Modi fused, overlap); "
+                          "bei zu lückenhaften Daten im Langformat")
+    run.add_argument('--write-all', action='store_true',
+                     help="Alle Zeilen schreiben; sonst werden die gespeicherten Kennzahlen mitgelesen und nur "
+                          "abweichende Zeilen geschrieben (Modi fused, overlap)")
+    run.add_argument('--dry-run', action='store_true',
+                     help="Nichts schreiben, nur berichten, welche Zeilen sich ändern würden (Modi fused, overlap)")
+    run.add_argument('--show', action='store_true', help="Anfang und Ende der Ergebnisse ausgeben")
+    run.set_defaults(handler=_run)
+
+    jobs = commands.add_parser('list', help="Verfügbare Jobs anzeigen")
+    jobs.set_defaults(handler=_list)
+    return parser
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if argv and argv[0] in DELEGATES:
+        return importlib.import_module(DELEGATES[argv[0]]).main(argv[1:])
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    return args.handler(args, parser)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,299 @@
+import argparse
+import json
+import os
+import threading
+import weakref
+import zlib
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, fields, replace
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import make_url
+
+# Version der Engine-Fabrik. Konfigurationsdateien tragen "version"; eine Datei
+# für eine neuere Fabrik wird abgelehnt, statt Einstellungen still zu ignorieren.
+FACTORY_VERSION = 1
+
+# Pfad einer JSON-Konfigurationsdatei (Schlüssel wie EngineSettings, dazu "version")
+CONFIG_ENV = 'TCI_DB_CONFIG'
+
+# Einzelne Einstellungen aus der Umgebung: TCI_DB_ + Feldname in Großbuchstaben,
+# z.B. TCI_DB_URL, TCI_DB_POOL_SIZE, TCI_DB_STATEMENT_TIMEOUT (Vorrang vor der Datei)
+ENV_PREFIX = 'TCI_DB_'
+
+PROFILES = ('default', 'sqlite')
+
+# Datenbankdatei des Profils 'sqlite', wenn keine URL angegeben ist
+SQLITE_PROFILE_DATABASE = 'tci_local.db'
+
+# Einstellungen je neuer SQLite-Verbindung im Profil 'sqlite': WAL, damit Lesen
+# (z.B. der Reader in tci.overlap) und Schreiben sich nicht blockieren
+SQLITE_PRAGMAS = ('PRAGMA journal_mode=WAL', 'PRAGMA synchronous=NORMAL', 'PRAGMA temp_store=MEMORY')
+
+_TRUE = ('1', 'true', 'yes', 'ja', 'on')
+
+
+# Einstellungen der Engine-Fabrik; die Standardwerte passen für den MySQL-Server der Skripte
+@dataclass(frozen=True)
+class EngineSettings:
+    url: str = ''
+    profile: str = 'default'
+    pool_size: int = 5
+    max_overflow: int = 10
+    pool_timeout: float = 30.0
+    # unter MySQLs wait_timeout (Standard 8 h), damit keine getrennten Verbindungen im Pool liegen
+    pool_recycle: int = 3600
+    pre_ping: bool = True
+    # serverseitiger Cursor für große Lesevorgänge, siehe read_connection
+    stream_results: bool = True
+    # Sekunden je Statement, 0: ohne Begrenzung (MySQL begrenzt nur SELECT, SQLite gar nicht)
+    statement_timeout: float = 0.0
+    # Zeilen je Paket bei executemany (psycopg2) bzw. insertmanyvalues
+    bulk_page_size: int = 10000
+    # Wartezeit auf Sperren in SQLite (Sekunden)
+    sqlite_timeout: float = 60.0
+    echo: bool = False
+
+
+_FIELDS = {f.name: f for f in fields(EngineSettings)}
+
+# Einstellungen und Poolzähler der Engines aus make_engine
+_SETTINGS = weakref.WeakKeyDictionary()
+_COUNTERS = weakref.WeakKeyDictionary()
+
+_default_engine = None
+_default_lock = threading.Lock()
+
+
+def _convert(name, value):
+    kind = _FIELDS[name].type
+    if kind is bool and not isinstance(value, bool):
+        return str(value).strip().lower() in _TRUE
+    return kind(value)
+
+
+def _with_profile(settings):
+    if settings.profile not in PROFILES:
+        raise ValueError(f"Unbekanntes Profil '{settings.profile}' (verfügbar: {', '.join(PROFILES)})")
+    if settings.profile == 'sqlite':
+        url = settings.url or f'sqlite:///{SQLITE_PROFILE_DATABASE}'
+        if make_url(url).get_backend_name() != 'sqlite':
+            raise ValueError(f"Profil 'sqlite' erwartet eine SQLite-URL, nicht {make_url(url).get_backend_name()}")
+        return replace(settings, url=url)
+    if not settings.url:
+        raise ValueError(f"Keine Datenbank-URL: {ENV_PREFIX}URL, {CONFIG_ENV} oder {ENV_PREFIX}PROFILE=sqlite setzen")
+    return settings
+
+
+def read_config(path):
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    version = data.pop('version', FACTORY_VERSION)
+    if version > FACTORY_VERSION:
+        raise ValueError(f"{path}: Konfigurationsversion {version}, unterstützt bis {FACTORY_VERSION}")
+    unknown = sorted(set(data) - set(_FIELDS))
+    if unknown:
+        raise ValueError(f"{path}: unbekannte Einstellung(en) {', '.join(unknown)}")
+    return data
+
+
+# Einstellungen aus Standardwerten, Konfigurationsdatei (path bzw. TCI_DB_CONFIG),
+# Umgebungsvariablen und zuletzt overrides (None zählt nicht)
+def load_settings(path=None, environ=None, **overrides):
+    environ = os.environ if environ is None else environ
+    values = {}
+    path = path or environ.get(CONFIG_ENV)
+    if path:
+        values.update(read_config(path))
+    for name in _FIELDS:
+        value = environ.get(ENV_PREFIX + name.upper())
+        if value not in (None, ''):
+            values[name] = value
+    values.update({name: value for name, value in overrides.items() if value is not None})
+    unknown = sorted(set(values) - set(_FIELDS))
+    if unknown:
+        raise ValueError(f"Unbekannte Einstellung(en) {', '.join(unknown)}")
+    return _with_profile(EngineSettings(**{name: _convert(name, value) for name, value in values.items()}))
+
+
+# Ist die Engine-Fabrik über die Umgebung konfiguriert (sonst gilt connection.py)?
+def configured(environ=None):
+    environ = os.environ if environ is None else environ
+    return any(environ.get(name) for name in (ENV_PREFIX + 'URL', ENV_PREFIX + 'PROFILE', CONFIG_ENV))
+
+
+def _crc32(value):
+    return None if value is None else zlib.crc32(str(value).encode('utf-8'))
+
+
+def _pool_options(settings):
+    return {'pool_size': settings.pool_size, 'max_overflow': settings.max_overflow,
+            'pool_timeout': settings.pool_timeout, 'pool_recycle': settings.pool_recycle}
+
+
+# SQLite bekommt CRC32 als Funktion nachgerüstet (Shard-Bedingung in tci.parallel),
+# im Profil 'sqlite' zusätzlich SQLITE_PRAGMAS
+def _setup_sqlite(engine, pragmas):
+    @event.listens_for(engine, 'connect')
+    def _connect(dbapi_connection, connection_record):
+        dbapi_connection.create_function('CRC32', 1, _crc32, deterministic=True)
+        if pragmas:
+            cursor = dbapi_connection.cursor()
+            for pragma in pragmas:
+                cursor.execute(pragma)
+            cursor.close()
+
+
+# Statement-Timeout je Verbindung: MySQL MAX_EXECUTION_TIME (ms, nur SELECT),
+# MariaDB max_statement_time (s); welcher Server antwortet, zeigt VERSION()
+def _mysql_statement_timeout(engine, seconds):
+    @event.listens_for(engine, 'connect')
+    def _connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("SELECT VERSION()")
+        if 'mariadb' in str(cursor.fetchone()[0]).lower():
+            cursor.execute(f"SET SESSION max_statement_time = {float(seconds)}")
+        else:
+            cursor.execute(f"SET SESSION MAX_EXECUTION_TIME = {int(seconds * 1000)}")
+        cursor.close()
+
+
+# Zähler über Pool-Events: neue DBAPI-Verbindungen, Checkouts/Checkins,
+# verworfene Verbindungen (z.B. nach fehlgeschlagenem pre-ping) und die
+# höchste Zahl gleichzeitig ausgeliehener Verbindungen
+def _track_pool(engine):
+    counters = {'connects': 0, 'checkouts': 0, 'checkins': 0, 'invalidated': 0, 'peak_checked_out': 0}
+    lock = threading.Lock()
+    _COUNTERS[engine] = (counters, lock)
+
+    def _count(name):
+        with lock:
+            counters[name] += 1
+            checked_out = counters['checkouts'] - counters['checkins']
+            counters['peak_checked_out'] = max(counters['peak_checked_out'], checked_out)
+
+    event.listen(engine, 'connect', lambda *args: _count('connects'))
+    event.listen(engine, 'checkout', lambda *args: _count('checkouts'))
+    event.listen(engine, 'checkin', lambda *args: _count('checkins'))
+    event.listen(engine, 'invalidate', lambda *args: _count('invalidated'))
+
+
+# Engine nach settings (Standard: load_settings(**overrides)) mit Pool und pre-ping.
+# Je Dialekt: SQLite mit Sperr-Timeout und CRC32 (Pool nur für Dateien, nicht
+# :memory:), MySQL/MariaDB mit Statement-Timeout (pymysql/mysqlclient fassen
+# executemany-INSERTs, wie beim Staging in tci.writeback, selbst zu mehrzeiligen
+# INSERTs zusammen), PostgreSQL mit statement_timeout und unter psycopg2 mit
+# gebündeltem executemany (auch für die UPDATEs in tci.writeback).
+def make_engine(settings=None, **overrides):
+    if settings is None:
+        settings = load_settings(**overrides)
+    elif overrides:
+        settings = _with_profile(replace(settings, **overrides))
+    url = make_url(settings.url)
+    backend = url.get_backend_name()
+    options = {'pool_pre_ping': settings.pre_ping, 'echo': settings.echo,
+               'insertmanyvalues_page_size': settings.bulk_page_size}
+    connect_args = {}
+    if backend == 'sqlite':
+        connect_args['timeout'] = settings.sqlite_timeout
+        if url.database not in (None, '', ':memory:'):
+            options.update(_pool_options(settings))
+    else:
+        options.update(_pool_options(settings))
+    if backend == 'postgresql':
+        if settings.statement_timeout:
+            connect_args['options'] = f"-c statement_timeout={int(settings.statement_timeout * 1000)}"
+        if url.get_driver_name() == 'psycopg2':
+            options.update(executemany_mode='values_plus_batch', executemany_batch_page_size=settings.bulk_page_size)
+
+    engine = create_engine(url, connect_args=connect_args, **options)
+    if backend == 'sqlite':
+        _setup_sqlite(engine, SQLITE_PRAGMAS if settings.profile == 'sqlite' else ())
+    elif backend in ('mysql', 'mariadb') and settings.statement_timeout:
+        _mysql_statement_timeout(engine, settings.statement_timeout)
+    _SETTINGS[engine] = settings
+    _track_pool(engine)
+    return engine
+
+
+# Einstellungen einer Engine; für fremde Engines (z.B. aus connection.py) die Standardwerte
+def settings_for(engine):
+    return _SETTINGS.get(engine, EngineSettings())
+
+
+# Engine der Skripte und Unterbefehle: über make_engine, sobald TCI_DB_URL,
+# TCI_DB_CONFIG oder TCI_DB_PROFILE gesetzt ist, sonst wie bisher die Engine
+# aus connection.py (liegt nicht im Repository). Einmal je Prozess angelegt.
+def default_engine():
+    global _default_engine
+    with _default_lock:
+        if _default_engine is None:
+            if configured():
+                _default_engine = make_engine()
+            else:
+                from connection import engine
+
+                _default_engine = engine
+        return _default_engine
+
+
+# Verbindung für große Lesevorgänge: mit serverseitigem Cursor (stream_results),
+# damit pandas die Blöcke abholt, ohne dass der Treiber vorher das ganze Ergebnis
+# puffert. Dialekte ohne serverseitige Cursor (SQLite) lesen wie bisher.
+@contextmanager
+def read_connection(engine, rows=None):
+    with engine.connect() as connection:
+        if settings_for(engine).stream_results and engine.dialect.supports_server_side_cursors:
+            connection = connection.execution_options(stream_results=True, **({'max_row_buffer': rows} if rows else {}))
+        yield connection
+
+
+# Poolstatistik: Zustand des Pools (Größe, frei, ausgeliehen, Überlauf) und für
+# Engines aus make_engine die Zähler seit dem Anlegen
+def pool_stats(engine):
+    pool = engine.pool
+    stats = {'pool': type(pool).__name__, 'factory_version': FACTORY_VERSION if engine in _SETTINGS else None}
+    for name in ('size', 'checkedin', 'checkedout', 'overflow'):
+        method = getattr(pool, name, None)
+        if callable(method):
+            stats[name] = method()
+    if engine in _COUNTERS:
+        counters, lock = _COUNTERS[engine]
+        with lock:
+            stats.update(counters)
+    return stats
+
+
+def pool_summary(stats):
+    if 'connects' not in stats:
+        return None
+    return (f"Pool {stats['pool']}: {stats['connects']} Verbindungen, {stats['checkouts']} Checkouts, "
+            f"max. {stats['peak_checked_out']} gleichzeitig, {stats['invalidated']} verworfen")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Engine-Einstellungen anzeigen und die Verbindung prüfen (Konfiguration über "
+                    f"{CONFIG_ENV} bzw. {ENV_PREFIX}URL, {ENV_PREFIX}POOL_SIZE, ...).")
+    parser.add_argument('--config', default=None, help="JSON-Konfigurationsdatei (statt TCI_DB_CONFIG)")
+    parser.add_argument('--url', default=None)
+    parser.add_argument('--profile', choices=PROFILES, default=None)
+    args = parser.parse_args(argv)
+
+    try:
+        settings = load_settings(args.config, url=args.url, profile=args.profile)
+    except ValueError as e:
+        parser.error(str(e))
+    shown = asdict(settings)
+    shown['url'] = make_url(settings.url).render_as_string(hide_password=True)
+    print(json.dumps({'version': FACTORY_VERSION, **shown}, indent=1))
+
+    engine = make_engine(settings)
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+    print(pool_summary(pool_stats(engine)))
+    print(json.dumps(pool_stats(engine), indent=1))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+import hashlib
+import os
+
+import numpy as np
+
+FIT_CACHE_VERSION = 1
+
+# Umgebungsvariable für das Verzeichnis des Fit-Caches; ohne sie wird, falls
+# gesetzt, <TCI_CACHE_DIR>/fits verwendet (siehe tci.cache)
+FIT_CACHE_DIR_ENV = 'TCI_FIT_CACHE_DIR'
+
+# Umgebungsvariable für die Obergrenze der Einträge je Modell
+FIT_CACHE_ENTRIES_ENV = 'TCI_FIT_CACHE_ENTRIES'
+
+# Standard-Obergrenze der Einträge je Modell (bei z.B. 8 Werten je Eintrag rund 100 MB)
+MAX_ENTRIES = 1_000_000
+
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+_NAN_BITS = np.float64(np.nan).view(np.uint64)
+
+
+# splitmix64 über ein uint64-Array (Überläufe sind gewollt)
+def _mix(z):
+    z = z + _GOLDEN
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return z ^ (z >> np.uint64(31))
+
+
+# Inhalts-Hash je Gruppe über die Reihe (Position, Key Date, Value), vektorisiert:
+# jede Zeile wird einzeln gemischt, die Zeilen einer Gruppe werden (modulo 2^64)
+# addiert und mit der Gruppengröße nochmals gemischt. Die Position in der Gruppe
+# geht in den Zeilen-Hash ein, die Reihenfolge zählt also mit. Voraussetzung:
+# die Zeilen einer Gruppe liegen zusammenhängend und jede Gruppe hat Zeilen.
+def series_hashes(codes, key_dates, values, n_groups):
+    codes = np.asarray(codes, dtype=np.intp)
+    if len(codes) == 0:
+        return np.zeros(n_groups, dtype=np.uint64)
+    sizes = np.bincount(codes, minlength=n_groups)
+    starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    positions = (np.arange(len(codes)) - starts[codes]).astype(np.uint64)
+    dates = np.asarray(key_dates, dtype='datetime64[ns]').view(np.int64).view(np.uint64)
+    values = np.asarray(values, dtype=np.float64)
+    bits = np.where(np.isnan(values), _NAN_BITS, values.view(np.uint64))
+
+    rows = _mix(_mix(_mix(positions) ^ dates) ^ bits)
+    sums = np.add.reduceat(rows, starts)
+    return _mix(sums ^ _mix(sizes.astype(np.uint64)))
+
+
+# Salz je Modellkonfiguration (z.B. 'poly2_h3'), damit dieselbe Reihe je Modell
+# einen eigenen Schlüssel hat
+def model_salt(model):
+    digest = hashlib.blake2b(f'{FIT_CACHE_VERSION}:{model}'.encode('utf-8'), digest_size=8).digest()
+    return np.uint64(int.from_bytes(digest, 'little'))
+
+
+def model_keys(hashes, model):
+    return _mix(np.asarray(hashes, dtype=np.uint64) ^ model_salt(model))
+
+
+# Persistenter Cache für Ergebnisse je Business ID (Koeffizienten, R², Vorhersagen),
+# adressiert über den Inhalts-Hash der Reihe und die Modellkonfiguration.
+# Je Modell eine Datei <cache_dir>/<model>.npz mit sortierten Schlüsseln, einer
+# Ergebnismatrix (ein Vektor fester Breite je Eintrag) und dem Lauf der letzten
+# Verwendung. Über max_entries hinaus werden die am längsten nicht verwendeten
+# Einträge verdrängt (LRU je Lauf). Treffer/Fehlschläge stehen in self.stats.
+class FitCache:
+    def __init__(self, cache_dir, max_entries=None):
+        self.path = cache_dir
+        os.makedirs(self.path, exist_ok=True)
+        if max_entries is None:
+            max_entries = int(os.environ.get(FIT_CACHE_ENTRIES_ENV, MAX_ENTRIES))
+        self.max_entries = max_entries
+        self.stats = {}
+
+    def _file(self, model):
+        return os.path.join(self.path, f'{model}.npz')
+
+    def _load(self, model, width):
+        path = self._file(model)
+        if os.path.exists(path):
+            with np.load(path, allow_pickle=False) as data:
+                if int(data['version']) == FIT_CACHE_VERSION and data['payload'].shape[1] == width:
+                    return data['keys'], data['payload'], data['used'], int(data['run'])
+        return np.empty(0, dtype=np.uint64), np.empty((0, width)), np.empty(0, dtype=np.int64), 0
+
+    def _save(self, model, keys, payload, used, run):
+        tmp_path = self._file(model) + '.tmp.npz'
+        np.savez(tmp_path, version=FIT_CACHE_VERSION, keys=keys, payload=payload, used=used, run=run)
+        os.replace(tmp_path, self._file(model))
+
+    # Liefert je Gruppe den Ergebnisvektor der Breite `width`. Gruppen, deren
+    # Schlüssel (Reihen-Hash + Modell) im Cache steht, werden übernommen; für die
+    # übrigen wird compute(miss) aufgerufen (miss: bool je Gruppe) und muss ein
+    # Array (miss.sum(), width) liefern. Danach wird der Cache gespeichert.
+    def get_or_compute(self, model, hashes, width, compute):
+        keys = model_keys(hashes, model)
+        cached_keys, payload, used, run = self._load(model, width)
+        run += 1
+
+        position = np.searchsorted(cached_keys, keys)
+        position = np.minimum(position, max(len(cached_keys) - 1, 0))
+        hit = (cached_keys[position] == keys) if len(cached_keys) else np.zeros(len(keys), dtype=bool)
+
+        result = np.empty((len(keys), width))
+        result[hit] = payload[position[hit]]
+        used = used.copy()
+        used[position[hit]] = run
+        miss = ~hit
+        if miss.any():
+            result[miss] = compute(miss)
+
+        new_keys, first = np.unique(keys[miss], return_index=True)
+        keys_all = np.concatenate([cached_keys, new_keys])
+        payload_all = np.concatenate([payload, result[miss][first]])
+        used_all = np.concatenate([used, np.full(len(new_keys), run, dtype=np.int64)])
+        evicted = max(len(keys_all) - self.max_entries, 0)
+        if evicted:
+            keep = np.sort(np.argsort(-used_all, kind='stable')[:self.max_entries])
+            keys_all, payload_all, used_all = keys_all[keep], payload_all[keep], used_all[keep]
+        order = np.argsort(keys_all, kind='stable')
+        self._save(model, keys_all[order], payload_all[order], used_all[order], run)
+
+        stats = self.stats.setdefault(model, {'hits': 0, 'misses': 0, 'evicted': 0, 'entries': 0})
+        stats['hits'] += int(hit.sum())
+        stats['misses'] += int(miss.sum())
+        stats['evicted'] += evicted
+        stats['entries'] = len(keys_all)
+        return result
+
+    def summary(self):
+        parts = []
+        for model, s in self.stats.items():
+            total = s['hits'] + s['misses']
+            rate = 100 * s['hits'] / total if total else 0.0
+            parts.append(f"{model}: {s['hits']} Treffer, {s['misses']} neu berechnet ({rate:.1f}% Trefferquote), "
+                         f"{s['entries']} Einträge, {s['evicted']} verdrängt")
+        return f"Fit-Cache {self.path}: " + '; '.join(parts) if parts else f"Fit-Cache {self.path}: nicht benutzt"
+
+
+def default_fit_cache_dir():
+    from tci.cache import CACHE_DIR_ENV
+
+    if os.environ.get(FIT_CACHE_DIR_ENV):
+        return os.environ[FIT_CACHE_DIR_ENV]
+    if os.environ.get(CACHE_DIR_ENV):
+        return os.path.join(os.environ[CACHE_DIR_ENV], 'fits')
+    return None
+
+
+# FitCache aus der Umgebung (TCI_FIT_CACHE_DIR bzw. TCI_CACHE_DIR) oder None
+def default_fit_cache():
+    cache_dir = default_fit_cache_dir()
+    return FitCache(cache_dir) if cache_dir else None
@@ -0,0 +1,276 @@
+import numpy as np
+import pandas as pd
+
+from tci.fit_cache import series_hashes
+
+# Spaltennamen der Vorhersagen je Polynomgrad (wie in den Predictions-Skripten)
+DEGREE_COLUMNS = {
+    1: ('LinearPredictedValue', 'LinearBestimmtheitsgrad'),
+    2: ('QuadratischePredictedValue', 'QuadratischBestimmtheitsgrad'),
+}
+
+TIME_COLUMN = 'Zeit/Rechen abschnitte'
+
+# Modellname je Polynomgrad in der schmalen Vorhersagetabelle
+MODEL_NAMES = {1: 'linear', 2: 'quadratisch'}
+
+# Spalten der schmalen Vorhersagetabelle (eine Zeile je Business ID, Key Date und Modell)
+RECORD_KEY_COLUMNS = ['Business ID', 'Key Date', 'model']
+RECORD_VALUE_COLUMNS = [TIME_COLUMN, 'PredictedValue', 'Bestimmtheitsgrad']
+
+# Höchster Polynomgrad, dessen Koeffizienten in der Modelltabelle gespeichert werden
+MAX_MODEL_DEGREE = 3
+
+# Spalten der Modelltabelle (eine Zeile je Business ID und Modell): Koeffizienten
+# des Polynoms c0 + c1 * x + c2 * x² + c3 * x³, R², Anzahl Zeitabschnitte (x der ersten
+# Vorhersage) und letztes Key Date (Ausgangspunkt der Vorhersagequartale)
+COEF_COLUMNS = [f'c{k}' for k in range(MAX_MODEL_DEGREE + 1)]
+MODEL_KEY_COLUMNS = ['Business ID', 'model']
+MODEL_VALUE_COLUMNS = ['degree', *COEF_COLUMNS, 'Bestimmtheitsgrad', 'Abschnitte', 'Last Key Date']
+
+# Mindestanzahl gültiger Werte für eine Regression
+MIN_POINTS = 2
+
+
+def degree_columns(degree):
+    return DEGREE_COLUMNS.get(degree, (f'Grad{degree}PredictedValue', f'Grad{degree}Bestimmtheitsgrad'))
+
+
+def model_name(degree):
+    return MODEL_NAMES.get(degree, f'grad{degree}')
+
+
+def _group_sums(values, codes, n_groups):
+    return np.bincount(codes, weights=values, minlength=n_groups)
+
+
+# Polynomfit vom Grad `degree` für alle Gruppen gleichzeitig über die
+# Normalgleichungen. Die Merkmale x, x², ... werden je Gruppe zentriert
+# (wie in LinearRegression), die Gram-Matrizen aller Gruppen als ein
+# Stapel (n_groups, degree, degree) aufgebaut und gemeinsam pseudo-invertiert.
+# Bei unterbestimmten Gruppen entspricht das der Minimum-Norm-Lösung von sklearn.
+# Rückgabe: coef (n_groups, degree + 1) mit [intercept, b1, b2, ...] und n.
+def polynomial_fit_by_codes(x, y, codes, n_groups, degree):
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    codes = np.asarray(codes, dtype=np.intp)
+
+    n = np.bincount(codes, minlength=n_groups).astype(float)
+    safe_n = np.where(n > 0, n, 1.0)
+    features = np.stack([x ** k for k in range(1, degree + 1)], axis=1)
+    feature_means = np.stack([_group_sums(features[:, k], codes, n_groups) for k in range(degree)], axis=1) / safe_n[:, None]
+    y_mean = _group_sums(y, codes, n_groups) / safe_n
+
+    centered = features - feature_means[codes]
+    dy = y - y_mean[codes]
+    gram = np.empty((n_groups, degree, degree))
+    for j in range(degree):
+        for k in range(j, degree):
+            gram[:, j, k] = gram[:, k, j] = _group_sums(centered[:, j] * centered[:, k], codes, n_groups)
+    moments = np.stack([_group_sums(centered[:, k] * dy, codes, n_groups) for k in range(degree)], axis=1)
+
+    beta = np.einsum('gjk,gk->gj', np.linalg.pinv(gram, rcond=1e-10), moments)
+    intercept = y_mean - np.einsum('gk,gk->g', beta, feature_means)
+
+    coef = np.column_stack([intercept, beta])
+    coef[n == 0] = np.nan
+    return {'coef': coef, 'n': n.astype(int)}
+
+
+# Wertet die Polynome (coef je Gruppe) an den Stellen x aus
+def evaluate_polynomial(coef, codes, x):
+    x = np.asarray(x, dtype=float)
+    rows = coef[codes]
+    result = rows[:, -1].copy()
+    for k in range(coef.shape[1] - 2, -1, -1):
+        result = result * x + rows[:, k]
+    return result
+
+
+# Bestimmtheitsgrad je Gruppe in Prozent (wie r2_score * 100)
+def r2_by_codes(y, predicted, codes, n_groups):
+    y = np.asarray(y, dtype=float)
+    n = np.bincount(codes, minlength=n_groups).astype(float)
+    y_mean = _group_sums(y, codes, n_groups) / np.where(n > 0, n, 1.0)
+    ss_res = _group_sums((y - predicted) ** 2, codes, n_groups)
+    ss_tot = _group_sums((y - y_mean[codes]) ** 2, codes, n_groups)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        r2 = np.where(ss_tot > 0, 1.0 - ss_res / np.where(ss_tot > 0, ss_tot, 1.0),
+                      np.where(ss_res <= np.finfo(float).eps * np.maximum(ss_tot, 1.0), 1.0, 0.0))
+    return r2 * 100
+
+
+# Nächste `horizon` Quartalsenden nach dem letzten Key Date, je eindeutigem Datum nur einmal berechnet
+def future_quarters(last_dates, horizon):
+    last_dates = pd.DatetimeIndex(last_dates)
+    unique_dates = last_dates.unique()
+    table = np.stack([
+        pd.date_range(date, periods=horizon + 1, freq=pd.offsets.QuarterEnd())[1:].to_numpy()
+        for date in unique_dates
+    ]) if len(unique_dates) else np.empty((0, horizon), dtype='datetime64[ns]')
+    return table[unique_dates.get_indexer(last_dates)]
+
+
+# Lineare/polynomiale Trends und Vorhersagen für alle Business IDs in einem Aufruf.
+# Erwartet nach (Business ID, Key Date) sortierte Arrays und liefert spaltenweise
+# Ergebnisse ohne DataFrame je Gruppe:
+#   x, predictions[degree], coef[degree], r2[degree] (je Gruppe), valid, sizes
+#   und last_dates (je Gruppe), future_codes, future_x, future_dates,
+#   future_predictions[degree]
+# Mit cache (tci.fit_cache.FitCache) werden Koeffizienten und R² nur für
+# Business IDs neu berechnet, deren Reihe sich seit dem letzten Lauf geändert hat.
+def fit_forecasts(codes, key_dates, values, n_groups, degrees=(1, 2), horizon=3, cache=None):
+    codes = np.asarray(codes, dtype=np.intp)
+    values = np.asarray(values, dtype=float)
+
+    # Zeitachse 0..len(Gruppe)-1 je Business ID (inkl. NaN-Zeilen, wie bisher)
+    sizes = np.bincount(codes, minlength=n_groups)
+    starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    x = np.arange(len(codes)) - starts[codes]
+
+    clean = ~np.isnan(values)
+    n_clean = np.bincount(codes[clean], minlength=n_groups)
+    valid = n_clean >= MIN_POINTS
+
+    result = {'x': x, 'valid': valid, 'predictions': {}, 'r2': {}, 'coef': {}, 'future_predictions': {}}
+
+    # Zukünftige Zeitpunkte nur für Gruppen mit gültiger Regression
+    valid_groups = np.flatnonzero(valid)
+    future_codes = np.repeat(valid_groups, horizon)
+    future_x = sizes[future_codes] + np.tile(np.arange(horizon), len(valid_groups))
+    last_dates = pd.Series(key_dates).groupby(codes).max().reindex(range(n_groups))
+    result['sizes'] = sizes
+    result['last_dates'] = last_dates.to_numpy()
+    result['future_codes'] = future_codes
+    result['future_x'] = future_x
+    result['future_dates'] = future_quarters(last_dates.to_numpy()[valid_groups], horizon).reshape(-1)
+
+    hashes = series_hashes(codes, key_dates, values, n_groups) if cache is not None and n_groups else None
+    for degree in degrees:
+        if hashes is None:
+            coef, r2 = _fit_degree(x, values, codes, clean, valid, n_groups, degree)
+            future_predictions = evaluate_polynomial(coef, future_codes, future_x)
+        else:
+            # Ergebnisvektor je Business ID: Koeffizienten, R² und die `horizon` Vorhersagen
+            fitted = cache.get_or_compute(
+                f'poly{degree}_h{horizon}', hashes, degree + 2 + horizon,
+                lambda miss: _fit_cached(x, values, codes, clean, valid, sizes, miss, degree, horizon))
+            coef, r2 = fitted[:, :degree + 1], fitted[:, degree + 1]
+            future_predictions = fitted[future_codes, degree + 2 + np.tile(np.arange(horizon), len(valid_groups))]
+        result['coef'][degree] = coef
+        result['predictions'][degree] = evaluate_polynomial(coef, codes, x)
+        result['r2'][degree] = r2
+        result['future_predictions'][degree] = future_predictions
+    return result
+
+
+# Koeffizienten und R² je Gruppe für einen Polynomgrad
+def _fit_degree(x, values, codes, clean, valid, n_groups, degree):
+    fit = polynomial_fit_by_codes(x[clean], values[clean], codes[clean], n_groups, degree)
+    coef = fit['coef']
+    coef[~valid] = np.nan
+    predicted_clean = evaluate_polynomial(coef, codes[clean], x[clean])
+    r2 = np.where(valid, r2_by_codes(values[clean], predicted_clean, codes[clean], n_groups), np.nan)
+    return coef, r2
+
+
+# Wie _fit_degree, aber nur für die Gruppen mit groups[code] == True
+# (Codes werden dafür auf 0..groups.sum()-1 umnummeriert)
+def _fit_subset(x, values, codes, clean, valid, groups, degree):
+    rows = groups[codes]
+    subset_codes = (np.cumsum(groups) - 1)[codes[rows]]
+    return _fit_degree(x[rows], values[rows], subset_codes, clean[rows], valid[groups], int(groups.sum()), degree)
+
+
+# Ergebnisvektoren für den Fit-Cache: [Koeffizienten, R², Vorhersagen] je Gruppe in groups
+def _fit_cached(x, values, codes, clean, valid, sizes, groups, degree, horizon):
+    coef, r2 = _fit_subset(x, values, codes, clean, valid, groups, degree)
+    n = len(coef)
+    future_x = (sizes[groups][:, None] + np.arange(horizon)).reshape(-1)
+    future = evaluate_polynomial(coef, np.repeat(np.arange(n), horizon), future_x).reshape(n, horizon)
+    return np.column_stack([coef, r2, future])
+
+
+# Baut das Ergebnis im bisherigen Tabellenformat der Predictions-Skripte:
+# vorhandene Zeilen je Business ID nach Key Date sortiert, gefolgt von den
+# `horizon` zukünftigen Quartalen
+def forecast_frame(df, degrees=(1, 2), horizon=3, cache=None):
+    return _forecast_frame(df, degrees, horizon, cache)[0]
+
+
+# forecast_frame plus Business IDs und Fit-Ergebnis (für die Modelltabelle)
+def _forecast_frame(df, degrees, horizon, cache):
+    df = df.copy()
+    df['Key Date'] = pd.to_datetime(df['Key Date'])
+    df = df[df['Business ID'].notna()]
+    df = df.sort_values(by=['Business ID', 'Key Date'], kind='mergesort').reset_index(drop=True)
+    codes, business_ids = pd.factorize(df['Business ID'])
+
+    result = fit_forecasts(codes, df['Key Date'].to_numpy(), df['Value'].to_numpy(dtype=float),
+                           len(business_ids), degrees=degrees, horizon=horizon, cache=cache)
+
+    df[TIME_COLUMN] = result['x']
+    future_df = pd.DataFrame({
+        'Key Date': result['future_dates'],
+        'Business ID': business_ids[result['future_codes']],
+        'Value': np.nan,
+        TIME_COLUMN: result['future_x'],
+    })
+    for degree in degrees:
+        predicted_column, r2_column = degree_columns(degree)
+        df[predicted_column] = result['predictions'][degree]
+        future_df[predicted_column] = result['future_predictions'][degree]
+    for degree in degrees:
+        _, r2_column = degree_columns(degree)
+        df[r2_column] = result['r2'][degree][codes]
+        future_df[r2_column] = result['r2'][degree][result['future_codes']]
+
+    future_df['_order'] = result['future_codes']
+    df['_order'] = codes
+    final_df = pd.concat([df, future_df], ignore_index=True)
+    final_df = final_df.sort_values(by='_order', kind='mergesort').drop(columns='_order')
+    return final_df.reset_index(drop=True), business_ids, result
+
+
+# Koeffizienten je Business ID und Modell für die Modelltabelle (nur gültige Regressionen)
+def model_records(business_ids, result, degrees):
+    valid = result['valid']
+    frames = []
+    for degree in degrees:
+        if degree > MAX_MODEL_DEGREE:
+            raise ValueError(f"Modelltabelle speichert Polynome bis Grad {MAX_MODEL_DEGREE}, nicht {degree}.")
+        coef = result['coef'][degree][valid]
+        frame = pd.DataFrame({'Business ID': np.asarray(business_ids[valid]).astype(str), 'model': model_name(degree),
+                              'degree': degree})
+        for k, column in enumerate(COEF_COLUMNS):
+            frame[column] = coef[:, k] if k <= degree else 0.0
+        frame['Bestimmtheitsgrad'] = result['r2'][degree][valid]
+        frame['Abschnitte'] = result['sizes'][valid]
+        frame['Last Key Date'] = pd.to_datetime(result['last_dates'][valid])
+        frames.append(frame)
+    if not frames:
+        return pd.DataFrame(columns=MODEL_KEY_COLUMNS + MODEL_VALUE_COLUMNS)
+    return pd.concat(frames, ignore_index=True)
+
+
+# Vorhersagen im schmalen Format für die Vorhersagetabelle: je Modell eine Zeile
+# pro (Business ID, Key Date) für die vorhandenen und die zukünftigen Quartale
+def forecast_records(df, degrees=(1, 2), horizon=3, cache=None):
+    return forecast_outputs(df, degrees, horizon, cache)[0]
+
+
+# Vorhersagezeilen (forecast_records) und Modellzeilen (model_records) aus einem Fit
+def forecast_outputs(df, degrees=(1, 2), horizon=3, cache=None):
+    final_df, business_ids, result = _forecast_frame(df, degrees, horizon, cache)
+    final_df = final_df[final_df['Key Date'].notna()]
+    frames = []
+    for degree in degrees:
+        predicted_column, r2_column = degree_columns(degree)
+        frame = final_df[['Business ID', 'Key Date', TIME_COLUMN, predicted_column, r2_column]].rename(
+            columns={predicted_column: 'PredictedValue', r2_column: 'Bestimmtheitsgrad'})
+        frame.insert(2, 'model', model_name(degree))
+        frames.append(frame)
+    records = pd.concat(frames, ignore_index=True)
+    records['Business ID'] = records['Business ID'].astype(str)
+    records = records.drop_duplicates(subset=RECORD_KEY_COLUMNS, keep='last').reset_index(drop=True)
+    return records, model_records(business_ids, result, degrees)
@@ -0,0 +1,85 @@
+from sqlalchemy import Column, DateTime, Float, Integer, MetaData, String, Table
+
+from tci.forecast import (COEF_COLUMNS, MODEL_KEY_COLUMNS, MODEL_VALUE_COLUMNS, RECORD_KEY_COLUMNS,
+                          RECORD_VALUE_COLUMNS, TIME_COLUMN)
+from tci.schema import ensure_schema
+from tci.writeback import DeleteScope, bulk_upsert
+
+FORECAST_TABLE = 'forecast'
+
+# Koeffizienten je Business ID und Modell, Grundlage für tci.lookup
+MODEL_TABLE = 'forecast_model'
+
+# Quelltabelle, deren Vorhersagen in FORECAST_TABLE/MODEL_TABLE stehen
+DEFAULT_SOURCE = 'ldp'
+
+
+# Vorhersage- und Modelltabelle je Quelltabelle: andere Quellen als ldp (z.B.
+# backup) bekommen eigene Tabellen ('forecast_backup', 'forecast_model_backup'),
+# damit Läufe auf verschiedenen Quellen sich nicht gegenseitig überschreiben
+def forecast_tables(source=DEFAULT_SOURCE):
+    if source == DEFAULT_SOURCE:
+        return FORECAST_TABLE, MODEL_TABLE
+    return f'{FORECAST_TABLE}_{source}', f'{MODEL_TABLE}_{source}'
+
+
+# Schmale Vorhersagetabelle mit Primärschlüssel (Business ID, Key Date, model)
+def forecast_table(table=FORECAST_TABLE, metadata=None):
+    return Table(
+        table, metadata or MetaData(),
+        Column('Business ID', String(191), primary_key=True),
+        Column('Key Date', DateTime, primary_key=True),
+        Column('model', String(32), primary_key=True),
+        Column(TIME_COLUMN, Integer),
+        Column('PredictedValue', Float),
+        Column('Bestimmtheitsgrad', Float),
+    )
+
+
+# Modelltabelle mit Primärschlüssel (Business ID, model)
+def model_table(table=MODEL_TABLE, metadata=None):
+    return Table(
+        table, metadata or MetaData(),
+        Column('Business ID', String(191), primary_key=True),
+        Column('model', String(32), primary_key=True),
+        Column('degree', Integer),
+        *(Column(column, Float) for column in COEF_COLUMNS),
+        Column('Bestimmtheitsgrad', Float),
+        Column('Abschnitte', Integer),
+        Column('Last Key Date', DateTime),
+    )
+
+
+# Legt die Vorhersagetabelle an, falls sie noch nicht existiert
+def create_forecast_table(engine, table=FORECAST_TABLE):
+    forecast_table(table).create(engine, checkfirst=True)
+
+
+# Schreibt Vorhersagen (Format von tci.forecast.forecast_records) per Upsert;
+# nur neue oder geänderte Zeilen werden tatsächlich geschrieben
+def write_forecasts(engine, records, table=FORECAST_TABLE, batch_size=10000, scope=None):
+    create_forecast_table(engine, table)
+    return bulk_upsert(engine, records, RECORD_KEY_COLUMNS, RECORD_VALUE_COLUMNS, table=table, batch_size=batch_size,
+                       scope=scope)
+
+
+# Schreibt die Koeffizienten (Format von tci.forecast.model_records) per Upsert;
+# ältere Modelltabellen bekommen fehlende Koeffizientenspalten ergänzt
+def write_models(engine, models, table=MODEL_TABLE, batch_size=10000, scope=None):
+    model_table(table).create(engine, checkfirst=True)
+    ensure_schema(engine, table, {column: 'FLOAT' for column in COEF_COLUMNS}, key_index=False)
+    return bulk_upsert(engine, models, MODEL_KEY_COLUMNS, MODEL_VALUE_COLUMNS, table=table, batch_size=batch_size,
+                       scope=scope)
+
+
+# Schreibt Vorhersagen und Koeffizienten in die Tabellen der Quelle (forecast_tables).
+# Zeilen der Modelle model_names, die im Ergebnis fehlen (Business IDs, die aus der
+# Quelle verschwunden sind oder keine gültige Regression mehr haben, nicht mehr
+# vorhergesagte Key Dates), werden vorher gelöscht; id_range (after, upto)
+# beschränkt das auf einen Block Business IDs (None: offen).
+def store_forecasts(engine, records, models, source=DEFAULT_SOURCE, model_names=None, id_range=None):
+    forecast, model = forecast_tables(source)
+    if model_names is None:
+        model_names = sorted(set(records['model']) | set(models['model']))
+    scope = DeleteScope({'model': list(model_names)}, None if id_range is None else ('Business ID', *id_range))
+    return write_forecasts(engine, records, forecast, scope=scope), write_models(engine, models, model, scope=scope)
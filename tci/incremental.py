@@ -0,0 +1,293 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import bindparam, inspect, text
+
+from tci.bands import sigma_band_flags
+from tci.metrics import KEY_COLUMNS, METRICS, REFERENCE_DATE, compute_metrics, parse_metrics, prepare_frame
+from tci.moments import FIELDS, merge_moments, moments_by_codes, moments_mean, moments_slope, moments_std
+from tci.schema import ensure_schema
+from tci.writeback import bulk_update
+
+STATE_TABLE = 'ldp_state'
+
+# Momentsätze im Zustand: gefüllte Werte (Volatility, Within_Range), ungefüllte
+# Werte (Standard Deviation), Value über Days (Steigung), Änderung über Days (SteigungTrend)
+STAT_SETS = ('filled', 'raw', 'slope', 'trend')
+
+STATE_COLUMNS = (['Business ID', 'last_key_date', 'last_value', 'last_filled']
+                 + [f'{prefix}_{name}' for prefix in STAT_SETS for name in FIELDS])
+
+# Kennzahlen mit einem Wert je Zeile bzw. einem Wert je Business ID
+ROW_METRICS = ('change', 'change_indicator')
+GROUP_METRICS = ('std_dev', 'volatility', 'steigung', 'steigung_trend')
+
+# Alle Kennzahlen teilen Zustand und Watermark, daher schreibt jeder Lauf alle;
+# eine Teilmenge bliebe sonst für die übrigen Spalten hinter dem Watermark zurück
+INCREMENTAL_METRICS = ROW_METRICS + GROUP_METRICS + ('within_range',)
+
+# Maximale Anzahl Business IDs je IN-Liste
+IN_BATCH = 1000
+
+
+def _quote(engine, name):
+    return engine.dialect.identifier_preparer.quote(name)
+
+
+def _select_rows(engine, table):
+    return (f"SELECT {', '.join(_quote(engine, c) for c in ['Key Date', 'Business ID', 'Value'])} "
+            f"FROM {_quote(engine, table)}")
+
+
+def empty_state():
+    state = pd.DataFrame({column: pd.Series(dtype=float) for column in STATE_COLUMNS})
+    state['Business ID'] = state['Business ID'].astype(object)
+    state['last_key_date'] = pd.Series(dtype='datetime64[ns]')
+    return state
+
+
+# Liest den Zustand je Business ID (leer, wenn die Tabelle noch nicht existiert)
+def read_state(engine, state_table=STATE_TABLE):
+    if not inspect(engine).has_table(state_table):
+        return empty_state()
+    state = pd.read_sql_query(text(f"SELECT * FROM {_quote(engine, state_table)}"), engine)
+    state['last_key_date'] = pd.to_datetime(state['last_key_date'])
+    return state
+
+
+# Liest nur die Zeilen nach dem Watermark (ohne Watermark die ganze Tabelle)
+def read_delta(engine, watermark=None, table='ldp'):
+    sql = _select_rows(engine, table)
+    if watermark is None or pd.isna(watermark):
+        return pd.read_sql_query(text(sql), engine)
+    return pd.read_sql_query(text(f"{sql} WHERE {_quote(engine, 'Key Date')} > :watermark"), engine,
+                             params={'watermark': pd.Timestamp(watermark).to_pydatetime()})
+
+
+# Liest alle Zeilen der angegebenen Business IDs (für Within_Range)
+def read_rows_for_ids(engine, business_ids, table='ldp'):
+    query = text(f"{_select_rows(engine, table)} WHERE {_quote(engine, 'Business ID')} IN :ids")
+    query = query.bindparams(bindparam('ids', expanding=True))
+    business_ids = list(business_ids)
+    frames = [pd.read_sql_query(query, engine, params={'ids': business_ids[start:start + IN_BATCH]})
+              for start in range(0, len(business_ids), IN_BATCH)]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=KEY_COLUMNS + ['Value'])
+
+
+def _state_moments(state, prefix):
+    return {name: state[f'{prefix}_{name}'].fillna(0).to_numpy(dtype=float) for name in FIELDS}
+
+
+# Erster Wert je Gruppe im (sortierten) Block
+def _first_positions(codes):
+    return np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]]) if len(codes) else np.array([], dtype=int)
+
+
+# Aktualisiert den Zustand mit einem Block neuer Zeilen. Gibt den neuen
+# Zustand (alle Business IDs), die neuen Zeilen mit Change/Change Indicator
+# und die Liste der betroffenen Business IDs zurück.
+def update_state(state, delta):
+    delta = prepare_frame(delta)
+    delta = delta[delta['Business ID'].notna()].reset_index(drop=True)
+
+    known = pd.Index(state['Business ID'])
+    new_ids = pd.Index(delta['Business ID'].unique()).difference(known)
+    ids = known.append(new_ids)
+    state = state.set_index('Business ID').reindex(ids).rename_axis('Business ID').reset_index()
+    n_groups = len(ids)
+
+    codes = ids.get_indexer(delta['Business ID'])
+    raw = delta['Value'].to_numpy(dtype=float)
+    filled = np.nan_to_num(raw, nan=0.0)
+    days = (delta['Key Date'] - REFERENCE_DATE).dt.days.to_numpy(dtype=float)
+    first = _first_positions(codes)
+    first_codes = codes[first]
+    is_known = first_codes < len(known)
+
+    # Change aus den gefüllten Werten, erste neue Zeile gegen den gespeicherten letzten Wert
+    change = np.empty(len(delta))
+    change[1:] = filled[1:] - filled[:-1]
+    last_filled = state['last_filled'].to_numpy(dtype=float)
+    change[first] = np.where(is_known, filled[first] - last_filled[first_codes], 0.0)
+
+    # Änderung der ungefüllten Werte (NaN bleibt NaN) für SteigungTrend
+    raw_change = np.empty(len(delta))
+    raw_change[1:] = raw[1:] - raw[:-1]
+    last_value = state['last_value'].to_numpy(dtype=float)
+    raw_change[first] = np.where(is_known, raw[first] - last_value[first_codes], np.nan)
+
+    raw_mask = ~np.isnan(raw)
+    trend_mask = ~np.isnan(raw_change)
+    batches = {
+        'filled': moments_by_codes(codes, n_groups, filled),
+        'raw': moments_by_codes(codes[raw_mask], n_groups, raw[raw_mask]),
+        'slope': moments_by_codes(codes[raw_mask], n_groups, raw[raw_mask], days[raw_mask]),
+        'trend': moments_by_codes(codes[trend_mask], n_groups, raw_change[trend_mask], days[trend_mask]),
+    }
+    for prefix, batch in batches.items():
+        merged = merge_moments(_state_moments(state, prefix), batch)
+        for name in FIELDS:
+            state[f'{prefix}_{name}'] = merged[name]
+
+    last = np.r_[first[1:] - 1, len(delta) - 1] if len(delta) else np.array([], dtype=int)
+    last_codes = codes[last]
+    state.loc[last_codes, 'last_key_date'] = delta['Key Date'].to_numpy()[last]
+    state.loc[last_codes, 'last_value'] = raw[last]
+    state.loc[last_codes, 'last_filled'] = filled[last]
+
+    rows = delta[KEY_COLUMNS].copy()
+    rows['Change'] = change
+    rows['Change Indicator'] = np.sign(change).astype(int)
+    return state, rows, ids[np.unique(codes)]
+
+
+# Kennzahlen je Business ID aus dem Zustand
+def group_metrics(state):
+    moments = {prefix: _state_moments(state, prefix) for prefix in STAT_SETS}
+    result = pd.DataFrame({'Business ID': state['Business ID']})
+    result['Standard Deviation'] = moments_std(moments['raw'])
+    result['Volatility'] = moments_std(moments['filled'])
+    result['Steigung'] = moments_slope(moments['slope'])
+    result['SteigungTrend'] = moments_slope(moments['trend'])
+    result['Mean'] = moments_mean(moments['filled'])
+    return result
+
+
+# Schreibt den Zustand der betroffenen Business IDs (alte Zeilen löschen, neue
+# anhängen); mit replace wird der ganze Zustand ersetzt. Löschen und Einfügen
+# laufen in einer Transaktion, ein Fehler lässt den alten Zustand (und Watermark) stehen.
+def write_state(engine, state, affected_ids, state_table=STATE_TABLE, replace=False):
+    changed = state[STATE_COLUMNS] if replace else state[state['Business ID'].isin(affected_ids)][STATE_COLUMNS]
+    exists = inspect(engine).has_table(state_table)
+    table = _quote(engine, state_table)
+    with engine.begin() as connection:
+        if exists and replace:
+            connection.execute(text(f"DELETE FROM {table}"))
+        elif exists:
+            delete = text(f"DELETE FROM {table} WHERE {_quote(engine, 'Business ID')} IN :ids")
+            delete = delete.bindparams(bindparam('ids', expanding=True))
+            ids = list(affected_ids)
+            for start in range(0, len(ids), IN_BATCH):
+                connection.execute(delete, {'ids': ids[start:start + IN_BATCH]})
+        changed.to_sql(state_table, connection, if_exists='append', index=False, chunksize=10000)
+
+
+# Inkrementeller Lauf: nur Zeilen nach dem Watermark lesen, Zustand fortschreiben
+# und nur neue Zeilen bzw. betroffene Business IDs zurückschreiben.
+# full_rebuild verwirft den Zustand und verarbeitet die ganze Tabelle über
+# denselben Codepfad. Voraussetzung: neue Daten kommen nur mit späterem Key Date hinzu.
+# Geschrieben werden immer alle INCREMENTAL_METRICS, auch wenn metrics eine Teilmenge nennt.
+def run_incremental(engine, metrics=None, full_rebuild=False, table='ldp', state_table=STATE_TABLE, method='auto'):
+    if metrics and set(metrics) != set(INCREMENTAL_METRICS):
+        print(f"Inkrementeller Modus: gemeinsamer Watermark, es werden alle Kennzahlen geschrieben "
+              f"({', '.join(INCREMENTAL_METRICS)}).")
+    metrics = list(INCREMENTAL_METRICS)
+    ensure_schema(engine, table, [METRICS[name][0] for name in metrics])
+
+    started = time.perf_counter()
+    state = empty_state() if full_rebuild else read_state(engine, state_table)
+    watermark = state['last_key_date'].max() if len(state) else None
+    delta = read_delta(engine, watermark, table)
+    print(f"Watermark: {watermark}, neue Zeilen: {len(delta)}")
+    if delta.empty:
+        return state, []
+
+    state, rows, affected_ids = update_state(state, delta)
+    per_group = group_metrics(state)
+    per_group = per_group[per_group['Business ID'].isin(affected_ids)]
+    print(f"Betroffene Business IDs: {len(affected_ids)}, Zustand berechnet in {time.perf_counter() - started:.2f}s")
+
+    reports = []
+    row_columns = [METRICS[m][0] for m in metrics if m in ROW_METRICS]
+    if row_columns:
+        reports.append(bulk_update(engine, rows, KEY_COLUMNS, row_columns, table=table, method=method))
+
+    group_columns = [METRICS[m][0] for m in metrics if m in GROUP_METRICS]
+    if group_columns:
+        reports.append(bulk_update(engine, per_group, ['Business ID'], group_columns, table=table, method=method))
+
+    if 'within_range' in metrics:
+        # Mittelwert/Std ändern sich für die ganze Gruppe -> alle Zeilen der betroffenen IDs
+        history = delta if full_rebuild or watermark is None else read_rows_for_ids(engine, affected_ids, table)
+        history = history.merge(per_group[['Business ID', 'Mean', 'Volatility']], on='Business ID', how='left')
+        history['Within_Range'] = sigma_band_flags(history['Value'].fillna(0), thresholds=[2],
+                                                   columns={2: 'Within_Range'}, mean=history['Mean'],
+                                                   std=history['Volatility'])['Within_Range']
+        reports.append(bulk_update(engine, history, KEY_COLUMNS, ['Within_Range'], table=table, method=method))
+
+    write_state(engine, state, affected_ids, state_table, replace=full_rebuild)
+
+    for report in reports:
+        print(report)
+    return state, reports
+
+
+def _verify_state(engine, table, state_table, rtol, atol):
+    stored = group_metrics(read_state(engine, state_table)).set_index('Business ID').sort_index()
+    rebuilt, _, _ = update_state(empty_state(), read_delta(engine, None, table))
+    rebuilt = group_metrics(rebuilt).set_index('Business ID').sort_index()
+    if not stored.index.equals(rebuilt.index):
+        print("Business IDs im Zustand weichen vom Neuaufbau ab.")
+        return False
+    ok = True
+    for column in rebuilt.columns:
+        a = stored[column].to_numpy(dtype=float)
+        b = rebuilt[column].to_numpy(dtype=float)
+        if not np.allclose(a, b, rtol=rtol, atol=atol, equal_nan=True):
+            diff = np.nanmax(np.abs(a - b))
+            print(f"Abweichung in '{column}': max. {diff}")
+            ok = False
+    return ok
+
+
+# Geschriebene Spalten gegen einen vollständigen Neuaufbau über den pandas-Pfad
+# (tci.metrics.compute_metrics); Toleranz wie beim Zurückschreiben (FLOAT in MySQL)
+def _verify_columns(engine, table):
+    from tci.loader import LDP_COLUMNS, load_ldp
+    from tci.writeback import changed_rows
+
+    columns = [METRICS[name][0] for name in INCREMENTAL_METRICS]
+    stored = load_ldp(engine, table, columns=LDP_COLUMNS + columns)
+    expected = compute_metrics(stored[LDP_COLUMNS], list(INCREMENTAL_METRICS))
+    changed, counts, sample = changed_rows(expected, stored, KEY_COLUMNS, columns, sample_rows=5)
+    if changed.any():
+        print("Abweichende Zeilen in ldp: " + ', '.join(f"{c} {n}" for c, n in counts.items() if n))
+        print(sample.to_string(index=False))
+    return not changed.any()
+
+
+# Vergleicht den gespeicherten Zustand und die in ldp geschriebenen Spalten mit
+# einem vollständigen Neuaufbau im Speicher
+def verify_incremental(engine, table='ldp', state_table=STATE_TABLE, rtol=1e-9, atol=1e-9):
+    state_ok = _verify_state(engine, table, state_table, rtol, atol)
+    columns_ok = _verify_columns(engine, table)
+    ok = state_ok and columns_ok
+    print("Zustand und ldp-Spalten stimmen mit dem Neuaufbau überein." if ok
+          else "Zustand oder ldp-Spalten weichen vom Neuaufbau ab.")
+    return ok
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inkrementelle Berechnung der Kennzahlen über einen Zustand je Business ID.")
+    parser.add_argument('--metrics', type=parse_metrics, default=None)
+    parser.add_argument('--full-rebuild', action='store_true', help="Zustand verwerfen und alles neu berechnen")
+    parser.add_argument('--verify', action='store_true', help="Zustand gegen einen Neuaufbau prüfen")
+    parser.add_argument('--table', default='ldp')
+    parser.add_argument('--state-table', default=STATE_TABLE)
+    args = parser.parse_args(argv)
+
+    from tci.engine import default_engine
+
+    engine = default_engine()
+
+    if args.verify:
+        verify_incremental(engine, args.table, args.state_table)
+    else:
+        run_incremental(engine, args.metrics, full_rebuild=args.full_rebuild,
+                        table=args.table, state_table=args.state_table)
+
+
+if __name__ == '__main__':
+    main()
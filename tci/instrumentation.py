@@ -0,0 +1,209 @@
+import json
+import os
+import time
+import tracemalloc
+from datetime import datetime
+
+import pandas as pd
+from sqlalchemy import event
+
+from tci.engine import pool_stats, pool_summary
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Umgebungsvariable für das Verzeichnis der JSON-Laufberichte
+REPORT_DIR_ENV = 'TCI_REPORT_DIR'
+
+# Umgebungsvariable zum Einschalten von tracemalloc (verlangsamt Python-lastige
+# Stufen wie das Aufbereiten der Parameterlisten deutlich)
+TRACE_MEMORY_ENV = 'TCI_TRACE_MEMORY'
+
+# Zeilen, die preview() von einem DataFrame ausgibt (Anfang und Ende)
+PREVIEW_ROWS = 10
+
+
+def statement_type(statement):
+    words = statement.lstrip(' (\r\n\t').split(None, 1)
+    return words[0].upper() if words else ''
+
+
+# Höchster Speicherverbrauch (RSS) des Prozesses bisher in MB
+def max_rss_mb():
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 2 ** 20 if os.uname().sysname == 'Darwin' else rss / 2 ** 10
+
+
+def _empty_stats():
+    return {'count': 0, 'seconds': 0.0, 'parameter_rows': 0, 'rowcount': 0}
+
+
+def _add_stats(stats, kind, seconds, parameter_rows, rowcount):
+    entry = stats.setdefault(kind, _empty_stats())
+    entry['count'] += 1
+    entry['seconds'] += seconds
+    entry['parameter_rows'] += parameter_rows
+    entry['rowcount'] += max(rowcount, 0)
+
+
+# Gekürzte Ausgabe eines DataFrames (statt alle Zeilen nach stdout zu schreiben)
+def preview(df, rows=PREVIEW_ROWS):
+    with pd.option_context('display.max_rows', rows, 'display.min_rows', rows):
+        return f"{df}\n[{len(df)} Zeilen x {len(df.columns)} Spalten]"
+
+
+# Messung eines Laufs: Statements je Typ (Anzahl, Zeit, gesendete Parameterzeilen,
+# betroffene Zeilen) über SQLAlchemy-Events sowie Wall-/CPU-Zeit und Höchststand
+# des Prozessspeichers je Stufe, mit trace_memory (bzw. TCI_TRACE_MEMORY=1)
+# zusätzlich die Speicherspitze je Stufe über tracemalloc. Stufen werden mit
+# `with run.stage('read'):` oder fortlaufend mit run.begin('read') ...
+# run.begin('compute') ... gemessen; run.finish() gibt die Zusammenfassung aus
+# und schreibt den JSON-Bericht.
+class RunReport:
+    def __init__(self, name, engine=None, trace_memory=None):
+        if trace_memory is None:
+            trace_memory = os.environ.get(TRACE_MEMORY_ENV, '') not in ('', '0')
+        self.name = name
+        self.started_at = datetime.now().isoformat(timespec='seconds')
+        self.stages = []
+        self.statements = {}
+        self.extra = {}
+        self._engines = []
+        self._current = None
+        self._started = time.perf_counter()
+        self._started_cpu = time.process_time()
+        self._own_tracing = trace_memory and not tracemalloc.is_tracing()
+        self.trace_memory = trace_memory
+        if self._own_tracing:
+            tracemalloc.start()
+        if engine is not None:
+            self.attach(engine)
+
+    # SQLAlchemy-Events an der Engine registrieren
+    def attach(self, engine):
+        event.listen(engine, 'before_cursor_execute', self._before_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_execute)
+        self._engines.append(engine)
+        return self
+
+    def detach(self):
+        for engine in self._engines:
+            event.remove(engine, 'before_cursor_execute', self._before_execute)
+            event.remove(engine, 'after_cursor_execute', self._after_execute)
+        self._engines = []
+
+    def _before_execute(self, connection, cursor, statement, parameters, context, executemany):
+        connection.info.setdefault('tci_started', []).append(time.perf_counter())
+
+    def _after_execute(self, connection, cursor, statement, parameters, context, executemany):
+        seconds = time.perf_counter() - connection.info['tci_started'].pop()
+        kind = statement_type(statement)
+        parameter_rows = len(parameters) if executemany and parameters is not None else int(bool(parameters))
+        rowcount = getattr(cursor, 'rowcount', -1)
+        _add_stats(self.statements, kind, seconds, parameter_rows, rowcount)
+        if self._current is not None:
+            _add_stats(self._current['statements'], kind, seconds, parameter_rows, rowcount)
+
+    def _start_stage(self, name):
+        self._current = {'name': name, 'statements': {}, '_wall': time.perf_counter(), '_cpu': time.process_time()}
+        if self.trace_memory and tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+            self._current['_memory'] = tracemalloc.get_traced_memory()[0]
+
+    def _end_stage(self):
+        stage = self._current
+        if stage is None:
+            return
+        self._current = None
+        stage['wall_seconds'] = time.perf_counter() - stage.pop('_wall')
+        stage['cpu_seconds'] = time.process_time() - stage.pop('_cpu')
+        stage['max_rss_mb'] = max_rss_mb()
+        start_memory = stage.pop('_memory', None)
+        if start_memory is not None:
+            stage['peak_memory_mb'] = tracemalloc.get_traced_memory()[1] / 2 ** 20
+            stage['memory_delta_mb'] = (tracemalloc.get_traced_memory()[0] - start_memory) / 2 ** 20
+        self.stages.append(stage)
+
+    # Beendet die laufende Stufe und beginnt die nächste
+    def begin(self, name):
+        self._end_stage()
+        self._start_stage(name)
+
+    def end(self):
+        self._end_stage()
+
+    def stage(self, name):
+        return _Stage(self, name)
+
+    def as_dict(self):
+        peaks = [s['peak_memory_mb'] for s in self.stages if 'peak_memory_mb' in s]
+        return {
+            'name': self.name,
+            'started_at': self.started_at,
+            'wall_seconds': time.perf_counter() - self._started,
+            'cpu_seconds': time.process_time() - self._started_cpu,
+            'peak_memory_mb': max(peaks) if peaks else None,
+            'max_rss_mb': max_rss_mb(),
+            'stages': self.stages,
+            'statements': self.statements,
+            **({'extra': self.extra} if self.extra else {}),
+        }
+
+    def summary(self):
+        data = self.as_dict()
+        stages = ', '.join(f"{s['name']} {s['wall_seconds']:.2f}s" for s in self.stages)
+        statements = ', '.join(f"{kind} {s['count']}" for kind, s in self.statements.items())
+        db_seconds = sum(s['seconds'] for s in self.statements.values())
+        line = f"{self.name}: {data['wall_seconds']:.2f}s ({stages})"
+        line += f", {sum(s['count'] for s in self.statements.values())} Statements ({statements}), DB {db_seconds:.2f}s"
+        if data['peak_memory_mb'] is not None:
+            line += f", Speicherspitze {data['peak_memory_mb']:.1f} MB"
+        if data['max_rss_mb'] is not None:
+            line += f", RSS max. {data['max_rss_mb']:.0f} MB"
+        return line
+
+    def write(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.as_dict(), f, indent=1)
+        return path
+
+    # Schließt den Lauf ab: Zusammenfassung ausgeben und, falls ein Pfad bzw.
+    # TCI_REPORT_DIR gesetzt ist, den Bericht als JSON speichern
+    def finish(self, path=None):
+        self._end_stage()
+        if self._engines:
+            self.extra['pool'] = pool_stats(self._engines[0])
+        self.detach()
+        print(self.summary())
+        if self.extra.get('pool') and pool_summary(self.extra['pool']):
+            print(pool_summary(self.extra['pool']))
+        report_dir = os.environ.get(REPORT_DIR_ENV)
+        if path is None and report_dir:
+            os.makedirs(report_dir, exist_ok=True)
+            stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            path = os.path.join(report_dir, f"{self.name}_{stamp}.json")
+        if path:
+            self.write(path)
+            print(f"Laufbericht gespeichert: {path}")
+        if self._own_tracing:
+            tracemalloc.stop()
+            self._own_tracing = False
+        return self.as_dict()
+
+
+class _Stage:
+    def __init__(self, report, name):
+        self.report = report
+        self.name = name
+
+    def __enter__(self):
+        self.report.begin(self.name)
+        return self.report
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.report.end()
+        return False
@@ -0,0 +1,241 @@
+from dataclasses import dataclass
+
+# Bewusst ohne pandas/numpy-Importe auf Modulebene, damit Auflisten und
+# Parsen der Jobs (z.B. durch einen Scheduler) billig bleiben.
+# Schlüssel wie tci.metrics.KEY_COLUMNS
+KEY_COLUMNS = ['Key Date', 'Business ID']
+GROUP_KEY_COLUMNS = ['Business ID']
+
+
+# Ein Job entspricht einem der bisherigen Skripte: welche Spalten er berechnet,
+# über welche Schlüssel zurückgeschrieben wird und (bei Vorhersagen) welche Polynomgrade
+# bzw. bis zu welchem Grad das Modell je Business ID ausgewählt wird
+@dataclass(frozen=True)
+class Job:
+    script: str
+    kind: str
+    columns: tuple = ()
+    keys: tuple = tuple(KEY_COLUMNS)
+    degrees: tuple = ()
+    max_degree: int = 0
+
+
+JOBS = {
+    'change': Job('Change(marker)/change.py', 'metric', ('Change',)),
+    'change_indicator': Job('Change(marker)/change_indicator.py', 'metric', ('Change Indicator',)),
+    'std_dev': Job('Abweichungen/std_dev.py', 'metric', ('Standard Deviation',), tuple(GROUP_KEY_COLUMNS)),
+    'volatility': Job('Abweichungen/Volatility.py', 'metric', ('Volatility',)),
+    'within_range': Job('Abweichung_marker/1std_dev_marker.py', 'metric', ('Within_Range',)),
+    'within_2std': Job('Abweichung_marker/2STD_Name.py', 'flag', ('Within_2Std_Range',)),
+    'steigung': Job('Rechnung Steigung/Steigung.py', 'metric', ('Steigung',), tuple(GROUP_KEY_COLUMNS)),
+    'steigung_trend': Job('Rechnung Steigung/Steigung_Trend.py', 'metric', ('SteigungTrend',), tuple(GROUP_KEY_COLUMNS)),
+    'rolling_volatility': Job('tci/rolling.py', 'rolling', ('Volatility_4Q', 'Volatility_8Q', 'Volatility_12Q')),
+    'rolling_range': Job('tci/rolling.py', 'rolling', ('Within_Range_4Q', 'Within_Range_8Q', 'Within_Range_12Q')),
+    'robust': Job('tci/robust.py', 'robust', ('Robust_Z', 'IQR_Score', 'Within_Robust_Range', 'Within_IQR_Range')),
+    'linear': Job('Predictions/linearRechnungen.py', 'forecast', degrees=(1,)),
+    'quadratic': Job('Predictions/QuadratischRechnungen.py', 'forecast', degrees=(1, 2)),
+    'best_fit': Job('tci/selection.py', 'forecast', max_degree=3),
+}
+
+FORECAST_HORIZON = 3
+
+
+def parse_jobs(value):
+    names = [name.strip() for name in value.split(',') if name.strip()] if isinstance(value, str) else list(value)
+    if names == ['all']:
+        return list(JOBS)
+    unknown = [name for name in names if name not in JOBS]
+    if unknown:
+        raise ValueError(f"Unbekannte(r) Job(s): {', '.join(unknown)} (verfügbar: {', '.join(JOBS)})")
+    return names
+
+
+def row_jobs(names):
+    return [name for name in names if JOBS[name].kind != 'forecast']
+
+
+def forecast_degrees(names):
+    return tuple(sorted({degree for name in names for degree in JOBS[name].degrees}))
+
+
+def selection_degree(names):
+    return max((JOBS[name].max_degree for name in names), default=0)
+
+
+# Modelle, die die gewählten Vorhersage-Jobs in die Vorhersagetabellen schreiben
+def forecast_models(names):
+    from tci.forecast import model_name
+    from tci.selection import SELECTION_MODEL
+
+    models = [model_name(degree) for degree in forecast_degrees(names)]
+    return models + [SELECTION_MODEL] if selection_degree(names) else models
+
+
+def row_columns(names):
+    return [column for name in row_jobs(names) for column in JOBS[name].columns]
+
+
+# Schlüssel beim Zurückschreiben: nur über 'Business ID', wenn alle gewählten
+# Jobs einen Wert je Business ID liefern, sonst über (Key Date, Business ID)
+def row_keys(names):
+    keys = {JOBS[name].keys for name in row_jobs(names)}
+    return list(keys.pop()) if len(keys) == 1 else list(KEY_COLUMNS)
+
+
+# Berechnet alle zeilenbezogenen Jobs gemeinsam (ein Sortieren/Gruppieren).
+# Reine Funktion: DataFrame (Key Date, Business ID, Value) rein, Ergebnis raus.
+# Mit fit_cache (tci.fit_cache.FitCache) werden Steigungen nur für geänderte Reihen neu berechnet.
+# Mit panel=True wird in der dichten Darstellung Business ID × Key Date gerechnet
+# (tci.panel), sofern die Daten dicht genug sind.
+def compute_rows(df, names, fit_cache=None, panel=False):
+    from tci.metrics import LdpFrame, compute_metrics
+
+    names = row_jobs(names)
+    if panel:
+        from tci.panel import dense_frame
+
+        frame = dense_frame(df, fit_cache=fit_cache)
+    else:
+        frame = LdpFrame(df, fit_cache=fit_cache)
+    metrics = [name for name in names if JOBS[name].kind == 'metric']
+    result = compute_metrics(frame, metrics) if metrics else frame.df[KEY_COLUMNS].copy()
+    if 'within_2std' in names:
+        from tci.bands import band_column, sigma_band_flags
+
+        mean, std = frame.value_stats
+        flags = sigma_band_flags(frame.value, thresholds=[2], mean=mean[frame.codes], std=std[frame.codes])
+        result['Within_2Std_Range'] = flags[band_column(2)].to_numpy()
+    rolling = [name for name in names if JOBS[name].kind == 'rolling']
+    if rolling:
+        from tci.rolling import rolling_metrics
+
+        windowed = rolling_metrics(frame, volatility='rolling_volatility' in rolling, bands='rolling_range' in rolling)
+        for column in windowed:
+            result[column] = windowed[column].to_numpy()
+    if 'robust' in names:
+        from tci.robust import robust_metrics
+
+        scores = robust_metrics(frame)
+        for column in scores:
+            result[column] = scores[column].to_numpy()
+    keys = row_keys(names)
+    if keys != KEY_COLUMNS:
+        result = result.drop_duplicates(subset=keys)[keys + row_columns(names)]
+    return result
+
+
+# Vorhersagen aller gewählten Vorhersage-Jobs (Polynomgrade zusammengefasst, dazu
+# ggf. das ausgewählte Modell 'auto'):
+# (Vorhersagezeilen, Koeffizienten je Business ID und Modell)
+def compute_forecasts(df, names, horizon=FORECAST_HORIZON, fit_cache=None):
+    import pandas as pd
+
+    from tci.forecast import forecast_outputs
+
+    outputs = []
+    degrees = forecast_degrees(names)
+    if degrees:
+        outputs.append(forecast_outputs(df, degrees=degrees, horizon=horizon, cache=fit_cache))
+    max_degree = selection_degree(names)
+    if max_degree:
+        from tci.selection import selection_outputs
+
+        outputs.append(selection_outputs(df, max_degree=max_degree, horizon=horizon))
+    if len(outputs) == 1:
+        return outputs[0]
+    return tuple(pd.concat(parts, ignore_index=True) for parts in zip(*outputs))
+
+
+# Abgeleitete Spalten, die zum Vergleich mitgelesen werden: mit changed_only alle
+# Spalten der Zeilen-Jobs (ensure_schema hat sie angelegt), im Probelauf nur die
+# vorhandenen, denn ein Probelauf ändert auch das Schema nicht
+def stored_columns(engine, names, table='ldp', changed_only=True, dry_run=False):
+    from tci.schema import column_exists, ensure_schema
+
+    columns = row_columns(names)
+    if not columns:
+        return []
+    if dry_run:
+        return [column for column in columns if column_exists(engine, table, column)]
+    ensure_schema(engine, table, columns)
+    return columns if changed_only else []
+
+
+# Gespeicherte Werte der Zeilen-Jobs (aus einem Auszug mit den Schlüsseln und
+# den Spalten stored) für tci.writeback.changed_rows; noch nicht angelegte
+# Spalten zählen als NULL
+def stored_values(df, names, stored):
+    current = df[KEY_COLUMNS + list(stored)].copy()
+    for column in row_columns(names):
+        if column not in stored:
+            current[column] = float('nan')
+    return current
+
+
+def write_summary(reports):
+    return [{'table': r.table, 'rows': r.rows, 'affected': r.affected, 'skipped': r.skipped,
+             'statements': r.statements, 'method': r.method} for r in reports]
+
+
+# Führt die gewählten Jobs in einem Prozess aus: Schema einmal prüfen, ldp einmal
+# lesen, alle Zeilen-Kennzahlen gemeinsam berechnen und mit einem Bulk-Update
+# schreiben, Vorhersagen in die Vorhersagetabellen der Quelle (tci.forecast_store).
+# Gibt den Laufbericht zurück.
+# Regressionen (Vorhersagen, Steigungen) laufen über den Fit-Cache in
+# fit_cache_dir bzw. TCI_FIT_CACHE_DIR/TCI_CACHE_DIR, falls gesetzt.
+# Mit changed_only werden die gespeicherten abgeleiteten Spalten in einer eigenen
+# Abfrage gelesen (ldp selbst weiter über den Snapshot-Cache) und
+# nur abweichende Zeilen geschrieben; dry_run schreibt nichts (auch keine
+# Vorhersagen) und berichtet nur, welche Zeilen sich ändern würden.
+def run_jobs(engine, names, table='ldp', method='auto', value_dtype='float64', horizon=FORECAST_HORIZON,
+             report_path=None, trace_memory=None, show=False, fit_cache_dir=None, panel=False,
+             changed_only=True, dry_run=False):
+    from tci.fit_cache import FitCache, default_fit_cache
+    from tci.instrumentation import RunReport, preview
+    from tci.loader import load_columns, load_ldp
+    from tci.writeback import bulk_update
+
+    names = parse_jobs(names)
+    run = RunReport(','.join(names) if len(names) <= 3 else f'{len(names)} Jobs', engine, trace_memory=trace_memory)
+    columns = row_columns(names)
+    forecasts = [name for name in names if JOBS[name].kind == 'forecast']
+    compare = columns and (changed_only or dry_run)
+
+    run.begin('schema')
+    stored = stored_columns(engine, names, table, changed_only, dry_run)
+
+    run.begin('read')
+    df = load_ldp(engine, table, value_dtype=value_dtype)
+    current = None
+    if compare:
+        current = stored_values(load_columns(engine, table, stored) if stored else df, names, stored)
+
+    run.begin('compute')
+    fit_cache = FitCache(fit_cache_dir) if fit_cache_dir else default_fit_cache()
+    rows = compute_rows(df, names, fit_cache, panel) if columns else None
+    records, models = compute_forecasts(df, forecasts, horizon, fit_cache) if forecasts else (None, None)
+    if fit_cache is not None and fit_cache.stats:
+        print(fit_cache.summary())
+        run.extra['fit_cache'] = fit_cache.stats
+    if show:
+        for result in (rows, records, models):
+            if result is not None:
+                print(preview(result))
+
+    run.begin('write')
+    reports = []
+    if rows is not None:
+        reports.append(bulk_update(engine, rows, row_keys(names), columns, table=table, method=method,
+                                   current=current, dry_run=dry_run))
+    if records is not None and dry_run:
+        print(f"Probelauf: {len(records)} Vorhersagen und {len(models)} Modelle nicht geschrieben.")
+    elif records is not None:
+        from tci.forecast_store import store_forecasts
+
+        reports.extend(store_forecasts(engine, records, models, source=table, model_names=forecast_models(names)))
+    for report in reports:
+        print(report)
+
+    run.extra.update({'jobs': names, 'table': table, 'rows': len(df), 'dry_run': dry_run,
+                      'writes': write_summary(reports)})
+    return run.finish(report_path)
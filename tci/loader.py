@@ -0,0 +1,111 @@
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from tci.engine import read_connection
+
+LDP_COLUMNS = ['Key Date', 'Business ID', 'Value']
+
+# Blockgröße beim Lesen, damit nie die ganze Tabelle als Python-Strings im Speicher liegt
+# (über einen serverseitigen Cursor, siehe tci.engine.read_connection)
+READ_CHUNK_ROWS = 200000
+
+
+def bytes_per_row(df):
+    return df.memory_usage(deep=True, index=True).sum() / max(len(df), 1)
+
+
+# Quartals-Ordinalzahl (Jahr * 4 + Quartal - 1) als kompakte Alternative zu datetime64
+def quarter_ordinal(dates):
+    dates = pd.DatetimeIndex(pd.to_datetime(dates))
+    return (dates.year * 4 + dates.quarter - 1).to_numpy(dtype=np.int32)
+
+
+# Quartalsende zu einer Ordinalzahl (Umkehrung von quarter_ordinal für Quartalsend-Daten)
+def quarter_end_dates(ordinals):
+    ordinals = np.asarray(ordinals)
+    first_days = pd.to_datetime(pd.DataFrame({'year': ordinals // 4, 'month': ordinals % 4 * 3 + 3, 'day': 1}))
+    return pd.DatetimeIndex(first_days + pd.offsets.MonthEnd(0))
+
+
+# Wandelt einen gelesenen Block in die kompakten Typen um
+def compact_frame(df, value_dtype='float64', key_date='datetime'):
+    df = df.copy()
+    df['Business ID'] = df['Business ID'].astype('category')
+    if key_date == 'quarter':
+        df['Key Date'] = quarter_ordinal(df['Key Date'])
+    else:
+        df['Key Date'] = pd.to_datetime(df['Key Date'])
+    df['Value'] = pd.to_numeric(df['Value']).astype(value_dtype)
+    return df
+
+
+# Liest nur die benötigten Spalten von ldp in kompakter Form:
+# 'Business ID' als Kategorie (die Kategorien sind die Lookup-Tabelle, die
+# Codes int8/16/32), 'Key Date' als datetime64 oder Quartals-Ordinalzahl
+# (key_date='quarter') und 'Value' als float32 oder float64.
+# In df.attrs stehen die Bytes je Zeile vor und nach der Umwandlung.
+# Mit cache_dir (oder der Umgebungsvariable TCI_CACHE_DIR) wird über den
+# lokalen Snapshot-Cache gelesen, siehe tci.cache.
+def load_ldp(engine, table='ldp', value_dtype='float64', key_date='datetime', columns=None, verbose=False,
+             cache_dir=None):
+    from tci.cache import default_cache_dir, load_cached
+
+    columns = columns or LDP_COLUMNS
+    cache_dir = cache_dir or default_cache_dir()
+    if cache_dir and columns == LDP_COLUMNS:
+        df = load_cached(engine, table, cache_dir, value_dtype, key_date, verbose=verbose)
+        df.attrs['bytes_per_row'] = bytes_per_row(df)
+        return df
+
+    sql = f"SELECT {', '.join(f'`{c}`' for c in columns)} FROM {table};"
+    chunks = []
+    raw_bytes = 0.0
+    raw_rows = 0
+    with read_connection(engine, READ_CHUNK_ROWS) as connection:
+        for chunk in pd.read_sql_query(sql, connection, chunksize=READ_CHUNK_ROWS):
+            raw_bytes += chunk.memory_usage(deep=True, index=True).sum()
+            raw_rows += len(chunk)
+            chunks.append(compact_frame(chunk, value_dtype, key_date))
+
+    if not chunks:
+        return pd.DataFrame(columns=columns)
+    business_ids = union_categoricals([c['Business ID'] for c in chunks], sort_categories=True)
+    for chunk in chunks:
+        chunk.drop(columns='Business ID', inplace=True)
+    df = pd.concat(chunks, ignore_index=True)
+    df['Business ID'] = business_ids
+    df = df[columns]
+
+    df.attrs['bytes_per_row_raw'] = raw_bytes / max(raw_rows, 1)
+    df.attrs['bytes_per_row'] = bytes_per_row(df)
+    if verbose:
+        print(memory_report(df))
+    return df
+
+
+# Liest weitere Spalten (z.B. gespeicherte Kennzahlen) mit den Schlüsseln
+# (Key Date, Business ID) in einer eigenen schmalen Abfrage, damit load_ldp für
+# (Key Date, Business ID, Value) beim Snapshot-Cache bleibt
+def load_columns(engine, table, columns):
+    keys = ['Key Date', 'Business ID']
+    sql = f"SELECT {', '.join(f'`{c}`' for c in keys + list(columns))} FROM {table};"
+    chunks = []
+    with read_connection(engine, READ_CHUNK_ROWS) as connection:
+        for chunk in pd.read_sql_query(sql, connection, chunksize=READ_CHUNK_ROWS):
+            chunk['Key Date'] = pd.to_datetime(chunk['Key Date'])
+            chunks.append(chunk)
+    if not chunks:
+        return pd.DataFrame(columns=keys + list(columns))
+    df = pd.concat(chunks, ignore_index=True)
+    df['Business ID'] = df['Business ID'].astype('category')
+    return df
+
+
+def memory_report(df):
+    before = df.attrs.get('bytes_per_row_raw')
+    after = df.attrs.get('bytes_per_row', bytes_per_row(df))
+    if before is None:
+        return f"Speicher je Zeile: {after:.1f} Bytes ({len(df)} Zeilen)"
+    return (f"Speicher je Zeile: {before:.1f} -> {after:.1f} Bytes "
+            f"({100 * (1 - after / before):.0f}% weniger, {len(df)} Zeilen)")
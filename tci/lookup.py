@@ -0,0 +1,258 @@
+import argparse
+import json
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import bindparam, text
+
+from tci.forecast import COEF_COLUMNS, future_quarters
+from tci.forecast_store import DEFAULT_SOURCE, forecast_tables
+
+# Anzahl Business IDs im LRU-Cache
+CACHE_SIZE = 10000
+
+# Sekunden, nach denen ein Cache-Eintrag neu gelesen wird (neue Läufe schreiben die Modelltabelle neu)
+MAX_AGE = 300
+
+DEFAULT_HORIZON = 3
+
+# Größter abfragbarer Horizont in Quartalen; größere Werte werden begrenzt
+MAX_HORIZON = 40
+
+# Höchstens so viele Business IDs je IN-Liste (SQLite erlaubt 32766 Parameter je Statement);
+# bis dahin kostet get_many genau eine Abfrage
+IN_BATCH = 10000
+
+HTTP_HOST = '127.0.0.1'
+HTTP_PORT = 8765
+
+
+# Vorhersagequartale je (letztes Key Date, Horizont); es gibt nur wenige verschiedene
+@lru_cache(maxsize=1024)
+def _future_dates(last_date, horizon):
+    return tuple(pd.Timestamp(d).date().isoformat() for d in future_quarters([last_date], horizon)[0])
+
+
+def clamp_horizon(horizon):
+    return min(max(int(horizon), 1), MAX_HORIZON)
+
+
+# Vergleichsschlüssel einer Business ID wie unter einer Collation ohne Groß-/
+# Kleinschreibung und mit PAD SPACE (MySQL-Standard): die Datenbank kann eine ID
+# in anderer Schreibweise zurückgeben als angefragt
+def _id_key(business_id):
+    return str(business_id).rstrip(' ').casefold()
+
+
+# Auswertung eines gespeicherten Modells: Koeffizienten, R² und die nächsten
+# `horizon` Quartale (x = Abschnitte, Abschnitte + 1, ...)
+def evaluate_model(row, horizon=DEFAULT_HORIZON):
+    degree = int(row['degree'])
+    coef = [float(row[column]) for column in COEF_COLUMNS[:degree + 1]]
+    x = row['Abschnitte'] + np.arange(horizon)
+    predicted = np.polynomial.polynomial.polyval(x, coef)
+    dates = _future_dates(row['Last Key Date'], horizon)
+    return {
+        'coefficients': coef,
+        'r2': float(row['Bestimmtheitsgrad']),
+        'forecast': [{'Key Date': d, 'x': int(xi), 'value': float(v)} for d, xi, v in zip(dates, x, predicted)],
+    }
+
+
+# Abfrage der Vorhersagen je Business ID aus der Modelltabelle (tci.forecast_store)
+# mit einem LRU-Cache davor. Gespeichert sind nur die Koeffizienten; die
+# Vorhersagen werden beim Abruf ausgewertet, daher ist jeder Horizont möglich.
+# get_many liest alle nicht gecachten IDs mit einer Abfrage (IN-Liste).
+# Unbekannte IDs werden ebenfalls gecacht (als leeres Ergebnis).
+class ForecastLookup:
+    def __init__(self, engine, table=forecast_tables()[1], cache_size=CACHE_SIZE, max_age=MAX_AGE):
+        self.engine = engine
+        self.table = table
+        self.cache_size = cache_size
+        self.max_age = max_age
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'queries': 0}
+
+    def _quote(self, name):
+        return self.engine.dialect.identifier_preparer.quote(name)
+
+    def _fetch(self, business_ids):
+        q = self._quote
+        query = text(f"SELECT * FROM {q(self.table)} WHERE {q('Business ID')} IN :ids").bindparams(
+            bindparam('ids', expanding=True))
+        models = {business_id: {} for business_id in business_ids}
+        rows = []
+        with self.engine.connect() as connection:
+            for start in range(0, len(business_ids), IN_BATCH):
+                result = connection.execute(query, {'ids': business_ids[start:start + IN_BATCH]})
+                with self._lock:
+                    self.stats['queries'] += 1
+                rows.extend(dict(row) for row in result.mappings())
+
+        # Zuerst exakt zuordnen; nur angefragte IDs ohne exakten Treffer erhalten
+        # die Zeilen über den normalisierten Schlüssel (Collation ohne Groß-/Kleinschreibung)
+        unmatched = {}
+        for row in rows:
+            row['Last Key Date'] = pd.Timestamp(row['Last Key Date'])
+            business_id = str(row['Business ID'])
+            if business_id in models:
+                models[business_id][row['model']] = row
+            else:
+                unmatched.setdefault(_id_key(business_id), []).append(row)
+        for business_id, found in models.items():
+            if not found:
+                for row in unmatched.get(_id_key(business_id), ()):
+                    found[row['model']] = row
+        return models
+
+    def _cached(self, business_id, now):
+        entry = self._cache.get(business_id)
+        if entry is None or (self.max_age is not None and now - entry[0] > self.max_age):
+            return None
+        self._cache.move_to_end(business_id)
+        return entry[1]
+
+    def _store(self, models, now):
+        for business_id, rows in models.items():
+            self._cache[business_id] = (now, rows)
+            self._cache.move_to_end(business_id)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    # Modellzeilen je Business ID: aus dem Cache oder mit einer Abfrage für alle fehlenden
+    def models(self, business_ids):
+        business_ids = [str(business_id) for business_id in dict.fromkeys(business_ids)]
+        now = time.monotonic()
+        with self._lock:
+            found = {business_id: self._cached(business_id, now) for business_id in business_ids}
+        missing = [business_id for business_id, rows in found.items() if rows is None]
+        if missing:
+            fetched = self._fetch(missing)
+            found.update(fetched)
+            with self._lock:
+                self._store(fetched, now)
+        with self._lock:
+            self.stats['hits'] += len(business_ids) - len(missing)
+            self.stats['misses'] += len(missing)
+        return found
+
+    # {Business ID: {Modell: {coefficients, r2, forecast}}}; unbekannte IDs ergeben {}.
+    # Der Horizont wird auf 1..MAX_HORIZON begrenzt.
+    def get_many(self, business_ids, horizon=DEFAULT_HORIZON, models=None):
+        horizon = clamp_horizon(horizon)
+        return {business_id: {name: evaluate_model(row, horizon) for name, row in rows.items()
+                              if models is None or name in models}
+                for business_id, rows in self.models(business_ids).items()}
+
+    def get(self, business_id, horizon=DEFAULT_HORIZON, models=None):
+        return self.get_many([business_id], horizon, models)[str(business_id)]
+
+    def cache_stats(self):
+        with self._lock:
+            return {**self.stats, 'cached': len(self._cache)}
+
+    def invalidate(self, business_ids=None):
+        with self._lock:
+            if business_ids is None:
+                self._cache.clear()
+            else:
+                for business_id in business_ids:
+                    self._cache.pop(str(business_id), None)
+
+
+# HTTP-Handler: GET /forecast?ids=A,B&horizon=4&model=linear und GET /forecast/<Business ID>;
+# GET /stats liefert die Cache-Statistik. Fehlerhafte Anfragen ergeben 400,
+# unbekannte Pfade und Business IDs (bei /forecast/<Business ID>) 404, Fehler
+# bei der Abfrage 500, jeweils mit {'error': ...}.
+def _handler(lookup):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status, payload):
+            body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            try:
+                status, payload = self._get()
+            except Exception as exc:
+                status, payload = 500, {'error': f'{type(exc).__name__}: {exc}'}
+            self._send(status, payload)
+
+        def _get(self):
+            url = urlparse(self.path)
+            params = parse_qs(url.query)
+            parts = [unquote(part) for part in url.path.split('/') if part]
+            if parts == ['stats']:
+                return 200, lookup.cache_stats()
+            if not parts or parts[0] != 'forecast' or len(parts) > 2:
+                return 404, {'error': 'Pfad nicht gefunden, erwartet /forecast oder /stats'}
+            ids = [parts[1]] if len(parts) == 2 else [i for value in params.get('ids', []) for i in value.split(',') if i]
+            if not ids:
+                return 400, {'error': "Keine Business ID angegeben (Parameter 'ids')"}
+            try:
+                horizon = int(params.get('horizon', [DEFAULT_HORIZON])[0])
+            except ValueError:
+                return 400, {'error': "'horizon' muss eine ganze Zahl sein"}
+            result = lookup.get_many(ids, horizon, params.get('model'))
+            if len(parts) == 2 and not result[ids[0]]:
+                return 404, {'error': f"Keine Vorhersage für Business ID {ids[0]}"}
+            return 200, result
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+# Startet den lokalen HTTP-Endpunkt (blockiert bis Strg+C)
+def serve(lookup, host=HTTP_HOST, port=HTTP_PORT):
+    server = ThreadingHTTPServer((host, port), _handler(lookup))
+    print(f"Vorhersage-Abfrage auf http://{host}:{server.server_port}/forecast?ids=...")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Vorhersagen je Business ID aus den gespeicherten Koeffizienten.")
+    parser.add_argument('ids', nargs='*', help="Business IDs (Ausgabe als JSON)")
+    parser.add_argument('--horizon', type=int, default=DEFAULT_HORIZON,
+                        help=f"Anzahl Quartale (Standard: 3, höchstens {MAX_HORIZON})")
+    parser.add_argument('--model', action='append', default=None, help="Nur dieses Modell (mehrfach möglich)")
+    parser.add_argument('--source', default=DEFAULT_SOURCE, help="Quelltabelle der Vorhersagen (Standard: ldp)")
+    parser.add_argument('--table', default=None, help="Modelltabelle (Standard: die der Quelle)")
+    parser.add_argument('--serve', action='store_true', help="Lokalen HTTP-Endpunkt starten")
+    parser.add_argument('--host', default=HTTP_HOST)
+    parser.add_argument('--port', type=int, default=HTTP_PORT)
+    parser.add_argument('--cache-size', type=int, default=CACHE_SIZE)
+    args = parser.parse_args(argv)
+    if not args.ids and not args.serve:
+        parser.error("Business IDs oder --serve angeben")
+
+    from tci.engine import default_engine
+
+    engine = default_engine()
+
+    lookup = ForecastLookup(engine, table=args.table or forecast_tables(args.source)[1], cache_size=args.cache_size)
+    if args.ids:
+        print(json.dumps(lookup.get_many(args.ids, args.horizon, args.model), ensure_ascii=False, indent=1))
+    if args.serve:
+        serve(lookup, args.host, args.port)
+
+
+if __name__ == '__main__':
+    main()
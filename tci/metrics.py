@@ -0,0 +1,163 @@
+from functools import cached_property
+
+import numpy as np
+import pandas as pd
+
+from tci.bands import sigma_band_flags
+from tci.fit_cache import series_hashes
+from tci.regression import linear_fit_by_codes
+
+KEY_COLUMNS = ['Key Date', 'Business ID']
+
+# Bezugsdatum für die `Days`-Achse der Steigungsberechnung
+REFERENCE_DATE = pd.Timestamp('2022-01-01')
+
+# Kennzahl -> (Spalte in ldp, SQL-Typ)
+METRICS = {
+    'change': ('Change', 'FLOAT'),
+    'change_indicator': ('Change Indicator', 'INT'),
+    'std_dev': ('Standard Deviation', 'FLOAT'),
+    'volatility': ('Volatility', 'FLOAT'),
+    'within_range': ('Within_Range', 'BOOLEAN'),
+    'steigung': ('Steigung', 'FLOAT'),
+    'steigung_trend': ('SteigungTrend', 'FLOAT'),
+}
+
+
+# Sortiert die Rohdaten einmal nach 'Business ID' und 'Key Date'
+def prepare_frame(df):
+    df = df[df['Business ID'].notna()].copy()
+    df['Key Date'] = pd.to_datetime(df['Key Date'])
+    df = df.sort_values(by=['Business ID', 'Key Date'], kind='mergesort')
+    return df.reset_index(drop=True)
+
+
+# Berechnet die Steigung je Gruppe (Zielvariable y über der Achse x)
+def group_slopes(x, y, codes, n_groups):
+    return linear_fit_by_codes(x, y, codes, n_groups)['slope']
+
+
+# Sortierter ldp-Auszug mit den einmal berechneten Gruppenschlüsseln.
+# Zwischenergebnisse (gefüllte Werte, Change, Gruppen-Std) werden nur einmal
+# berechnet und von allen Kennzahlen gemeinsam genutzt. Werte je Gruppe
+# (Mittelwert, Std, Steigung) bleiben Arrays je Gruppe und werden erst für
+# die Ausgabe auf die Zeilen verteilt. Mit fit_cache (tci.fit_cache.FitCache)
+# werden die Steigungen nur für geänderte Business IDs neu berechnet.
+class LdpFrame:
+    def __init__(self, df, prepared=False, fit_cache=None):
+        self.df = df if prepared else prepare_frame(df)
+        if prepared and self.df['Business ID'].isna().any():
+            # pd.factorize gäbe NULL-IDs den Code -1 (gehörte dann zur letzten Gruppe)
+            self.df = self.df[self.df['Business ID'].notna()].reset_index(drop=True)
+        self.codes, self.business_ids = pd.factorize(self.df['Business ID'])
+        self.n_groups = len(self.business_ids)
+        self.fit_cache = fit_cache
+
+    @cached_property
+    def value(self):
+        # float32 aus dem kompakten Loader bleibt erhalten
+        value = self.df['Value']
+        return value if value.dtype.kind == 'f' else value.astype(float)
+
+    @cached_property
+    def filled(self):
+        # Fülle NaN-Werte in 'Value' mit 0
+        return self.value.fillna(0)
+
+    @cached_property
+    def filled_groups(self):
+        return self.filled.groupby(self.codes, sort=False)
+
+    @cached_property
+    def days(self):
+        return (self.df['Key Date'] - REFERENCE_DATE).dt.days.to_numpy(dtype=float)
+
+    @cached_property
+    def change(self):
+        return self.filled_groups.diff().fillna(0)
+
+    @cached_property
+    def group_mean(self):
+        return self.filled_groups.mean().to_numpy()
+
+    @cached_property
+    def group_std(self):
+        return self.filled_groups.std().to_numpy()
+
+    @cached_property
+    def value_stats(self):
+        # Mittelwert und Std der ungefüllten Werte je Gruppe (NaN-Werte zählen nicht mit)
+        grouped = self.value.groupby(self.codes)
+        return (grouped.mean().reindex(range(self.n_groups)).to_numpy(),
+                grouped.std().reindex(range(self.n_groups)).to_numpy())
+
+    @cached_property
+    def series_hashes(self):
+        return series_hashes(self.codes, self.df['Key Date'].to_numpy(), self.value.to_numpy(dtype=float), self.n_groups)
+
+    # Steigung je Gruppe, mit Fit-Cache nur für Gruppen mit geänderter Reihe
+    def group_slopes(self, model, x, y, codes):
+        if self.fit_cache is None or not self.n_groups:
+            return group_slopes(x, y, codes, self.n_groups)
+
+        def compute(miss):
+            rows = miss[codes]
+            subset_codes = (np.cumsum(miss) - 1)[codes[rows]]
+            return group_slopes(x[rows], y[rows], subset_codes, int(miss.sum()))[:, None]
+
+        return self.fit_cache.get_or_compute(model, self.series_hashes, 1, compute)[:, 0]
+
+    def broadcast(self, per_group):
+        return pd.Series(np.asarray(per_group)[self.codes], index=self.df.index)
+
+    # Funktionen zur Berechnung der einzelnen Kennzahlen
+    def calculate_change(self):
+        return self.change
+
+    def calculate_change_indicator(self):
+        return np.sign(self.change).astype(int)
+
+    def calculate_std_dev(self):
+        # Wie std_dev.py: Standardabweichung der ungefüllten Werte
+        return self.broadcast(self.value_stats[1])
+
+    def calculate_volatility(self):
+        return self.broadcast(self.group_std)
+
+    def calculate_within_range(self):
+        flags = sigma_band_flags(self.filled, thresholds=[2], columns={2: 'Within_Range'},
+                                 mean=self.group_mean[self.codes], std=self.group_std[self.codes])
+        return flags['Within_Range']
+
+    def calculate_steigung(self):
+        mask = self.value.notna().to_numpy()
+        slopes = self.group_slopes('steigung', self.days[mask], self.value.to_numpy()[mask], self.codes[mask])
+        return self.broadcast(slopes)
+
+    def calculate_steigung_trend(self):
+        # Wie Steigung_Trend.py: Änderung der ungefüllten Werte, NaN-Änderungen entfallen
+        raw_change = self.value.groupby(self.codes, sort=False).diff().to_numpy()
+        mask = ~np.isnan(raw_change)
+        slopes = self.group_slopes('steigung_trend', self.days[mask], raw_change[mask], self.codes[mask])
+        return self.broadcast(slopes)
+
+
+# Kommagetrennte Kennzahlen für die --metrics-Option der Kommandozeilen
+def parse_metrics(value):
+    return [m.strip() for m in value.split(',') if m.strip()]
+
+
+# Berechnet die gewünschten Kennzahlen und gibt sie zusammen mit den Schlüsseln zurück
+def compute_metrics(frame, metrics=None):
+    metrics = list(metrics or METRICS)
+    unknown = [m for m in metrics if m not in METRICS]
+    if unknown:
+        raise ValueError(f"Unbekannte Kennzahl(en): {', '.join(unknown)}")
+    if not isinstance(frame, LdpFrame):
+        frame = LdpFrame(frame)
+
+    result = frame.df[KEY_COLUMNS].copy()
+    for name in metrics:
+        column, _ = METRICS[name]
+        result[column] = getattr(frame, f'calculate_{name}')()
+    return result
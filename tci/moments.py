@@ -0,0 +1,69 @@
+import numpy as np
+
+# Felder der zusammenführbaren Momente je Gruppe:
+# n, Mittelwerte von x und y sowie die zentrierten Summen Cxx, Cxy, Cyy
+# (Cyy entspricht M2 aus dem Welford-Verfahren)
+FIELDS = ('n', 'mean_x', 'mean_y', 'cxx', 'cxy', 'cyy')
+
+
+def empty_moments(n_groups):
+    return {name: np.zeros(n_groups) for name in FIELDS}
+
+
+# Berechnet die Momente je Gruppe für einen Block von Zeilen (zwei Durchläufe,
+# zentriert um den Gruppenmittelwert). Ohne x werden nur n, mean_y, cyy gefüllt.
+def moments_by_codes(codes, n_groups, y, x=None):
+    codes = np.asarray(codes, dtype=np.intp)
+    y = np.asarray(y, dtype=float)
+    x = np.zeros_like(y) if x is None else np.asarray(x, dtype=float)
+
+    n = np.bincount(codes, minlength=n_groups).astype(float)
+    safe_n = np.where(n > 0, n, 1.0)
+    mean_x = np.bincount(codes, weights=x, minlength=n_groups) / safe_n
+    mean_y = np.bincount(codes, weights=y, minlength=n_groups) / safe_n
+    dx = x - mean_x[codes]
+    dy = y - mean_y[codes]
+    return {
+        'n': n,
+        'mean_x': mean_x,
+        'mean_y': mean_y,
+        'cxx': np.bincount(codes, weights=dx * dx, minlength=n_groups),
+        'cxy': np.bincount(codes, weights=dx * dy, minlength=n_groups),
+        'cyy': np.bincount(codes, weights=dy * dy, minlength=n_groups),
+    }
+
+
+# Führt zwei Momentsätze gleicher Länge zusammen (Chan et al.)
+def merge_moments(a, b):
+    n = a['n'] + b['n']
+    safe_n = np.where(n > 0, n, 1.0)
+    dx = b['mean_x'] - a['mean_x']
+    dy = b['mean_y'] - a['mean_y']
+    weight = a['n'] * b['n'] / safe_n
+    return {
+        'n': n,
+        'mean_x': a['mean_x'] + dx * b['n'] / safe_n,
+        'mean_y': a['mean_y'] + dy * b['n'] / safe_n,
+        'cxx': a['cxx'] + b['cxx'] + dx * dx * weight,
+        'cxy': a['cxy'] + b['cxy'] + dx * dy * weight,
+        'cyy': a['cyy'] + b['cyy'] + dy * dy * weight,
+    }
+
+
+# Stichproben-Standardabweichung (ddof=1) aus den Momenten
+def moments_std(m):
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(m['n'] >= 2, np.sqrt(np.maximum(m['cyy'], 0.0) / (m['n'] - 1)), np.nan)
+
+
+def moments_mean(m):
+    return np.where(m['n'] > 0, m['mean_y'], np.nan)
+
+
+# Steigung der Regression y über x aus den Momenten (wie tci.regression:
+# ohne Streuung in x ist die Steigung 0, ohne Punkte NaN)
+def moments_slope(m):
+    degenerate = m['cxx'] <= np.finfo(float).eps * np.maximum(1.0, np.abs(m['mean_x'])) ** 2 * np.maximum(m['n'], 1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        slope = np.where(degenerate, 0.0, m['cxy'] / np.where(degenerate, 1.0, m['cxx']))
+    return np.where(m['n'] > 0, slope, np.nan)
@@ -0,0 +1,209 @@
+import argparse
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+from sqlalchemy import text
+
+from tci.instrumentation import RunReport
+from tci.jobs import (FORECAST_HORIZON, JOBS, compute_forecasts, compute_rows, forecast_models, parse_jobs,
+                      row_columns, row_keys, stored_columns, stored_values, write_summary)
+from tci.loader import LDP_COLUMNS, compact_frame
+from tci.writeback import bulk_update
+
+# Business IDs je Block
+BATCH_IDS = 2000
+
+# Höchstens so viele Blöcke warten zwischen Lesen und Rechnen bzw. Rechnen und
+# Schreiben; damit bleibt der Speicher unabhängig von der Tabellengröße
+QUEUE_DEPTH = 2
+
+# Wartezeit beim Blockieren an einer Warteschlange, bevor auf Abbruch geprüft wird
+POLL_SECONDS = 0.1
+
+_DONE = object()
+
+
+def _quote(engine, name):
+    return engine.dialect.identifier_preparer.quote(name)
+
+
+# Teilt die sortierten Business IDs in Bereiche (erste, letzte) zu je batch_ids IDs
+def business_id_ranges(engine, table='ldp', batch_ids=BATCH_IDS):
+    bid = _quote(engine, 'Business ID')
+    sql = f"SELECT DISTINCT {bid} FROM {_quote(engine, table)} WHERE {bid} IS NOT NULL ORDER BY {bid}"
+    with engine.connect() as connection:
+        ids = connection.execute(text(sql)).scalars().all()
+    return [(ids[start], ids[min(start + batch_ids, len(ids)) - 1]) for start in range(0, len(ids), batch_ids)]
+
+
+# Lückenlose Bereiche (after, upto] zu den Blöcken, erster und letzter offen;
+# darin löscht das Schreiben Vorhersagen verschwundener Business IDs
+def delete_ranges(ranges):
+    return [(ranges[i - 1][1] if i else None, last if i < len(ranges) - 1 else None)
+            for i, (first, last) in enumerate(ranges)]
+
+
+# Liest einen Bereich von Business IDs (Index auf Business ID, Key Date),
+# columns: zusätzlich zu lesende Spalten (z.B. gespeicherte Kennzahlen)
+def read_range(connection, table, first, last, value_dtype='float64', columns=()):
+    q = lambda name: _quote(connection.engine, name)
+    sql = (f"SELECT {', '.join(q(c) for c in LDP_COLUMNS + list(columns))} FROM {q(table)} "
+           f"WHERE {q('Business ID')} BETWEEN :first AND :last")
+    result = connection.execute(text(sql), {'first': first, 'last': last})
+    return compact_frame(pd.DataFrame(result.fetchall(), columns=list(result.keys())), value_dtype)
+
+
+# Gibt den Fehler eines beendeten Threads weiter
+def _check(future):
+    if future is not None and future.done() and future.exception() is not None:
+        future.result()
+
+
+# Blockierendes put/get, das bei Abbruch (stop gesetzt bzw. Gegenseite mit Fehler beendet) aufgibt
+def _put(items, item, stop, consumer=None):
+    while not stop.is_set():
+        try:
+            items.put(item, timeout=POLL_SECONDS)
+            return True
+        except queue.Full:
+            _check(consumer)
+    return False
+
+
+def _get(items, stop, producer=None):
+    while not stop.is_set():
+        try:
+            return items.get(timeout=POLL_SECONDS)
+        except queue.Empty:
+            _check(producer)
+    return _DONE
+
+
+# Lese-Thread: alle Bereiche nacheinander über eine eigene Verbindung
+def _reader(engine, table, ranges, value_dtype, columns, batches, stop, busy):
+    try:
+        with engine.connect() as connection:
+            for (first, last), bounds in zip(ranges, delete_ranges(ranges)):
+                started = time.perf_counter()
+                df = read_range(connection, table, first, last, value_dtype, columns)
+                busy['read'] += time.perf_counter() - started
+                if not _put(batches, (df, bounds), stop):
+                    return
+    finally:
+        _put(batches, _DONE, stop)
+
+
+# Schreib-Thread: Ergebnisse über eine zweite Verbindung aus dem Pool zurückschreiben
+def _writer(engine, names, table, method, dry_run, results, stop, busy, reports):
+    columns = row_columns(names)
+    keys = row_keys(names)
+    while True:
+        item = _get(results, stop)
+        if item is _DONE:
+            return
+        rows, current, forecasts, bounds = item
+        started = time.perf_counter()
+        if rows is not None:
+            reports.append(bulk_update(engine, rows, keys, columns, table=table, method=method, current=current,
+                                       dry_run=dry_run))
+        if forecasts is not None and not dry_run:
+            from tci.forecast_store import store_forecasts
+
+            records, models = forecasts
+            reports.extend(store_forecasts(engine, records, models, source=table, model_names=forecast_models(names),
+                                           id_range=bounds))
+        busy['write'] += time.perf_counter() - started
+
+
+# Führt die Jobs blockweise nach Business ID aus und überlappt die Stufen:
+# während Block N gerechnet wird, liest ein Thread Block N+1 und ein zweiter
+# schreibt Block N-1 über eine eigene Verbindung. Die Warteschlangen dazwischen
+# fassen höchstens `depth` Blöcke. Die Laufzeit nähert sich damit der
+# langsamsten Stufe statt der Summe aller Stufen; im Bericht stehen die
+# Arbeitszeiten je Stufe ('busy_seconds') neben der Gesamtzeit.
+# changed_only und dry_run wie in tci.jobs.run_jobs, je Block.
+def run_overlapped(engine, names, table='ldp', batch_ids=BATCH_IDS, depth=QUEUE_DEPTH, method='auto',
+                   value_dtype='float64', horizon=FORECAST_HORIZON, report_path=None, trace_memory=None,
+                   panel=False, changed_only=True, dry_run=False):
+    names = parse_jobs(names)
+    run = RunReport(f"overlap {','.join(names) if len(names) <= 3 else f'{len(names)} Jobs'}", engine,
+                    trace_memory=trace_memory)
+    columns = row_columns(names)
+    forecasts = [name for name in names if JOBS[name].kind == 'forecast']
+
+    compare = columns and (changed_only or dry_run)
+
+    run.begin('schema')
+    stored = stored_columns(engine, names, table, changed_only, dry_run)
+    ranges = business_id_ranges(engine, table, batch_ids)
+
+    run.begin('overlap')
+    batches = queue.Queue(maxsize=depth)
+    results = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+    busy = {'read': 0.0, 'compute': 0.0, 'write': 0.0}
+    reports = []
+    rows_read = 0
+    with ThreadPoolExecutor(max_workers=2, thread_name_prefix='tci-overlap') as executor:
+        reader = executor.submit(_reader, engine, table, ranges, value_dtype, stored, batches, stop, busy)
+        writer = executor.submit(_writer, engine, names, table, method, dry_run, results, stop, busy, reports)
+        try:
+            while True:
+                item = _get(batches, stop, reader)
+                if item is _DONE:
+                    break
+                df, bounds = item
+                started = time.perf_counter()
+                rows = compute_rows(df, names, panel=panel) if columns else None
+                current = stored_values(df, names, stored) if compare else None
+                outputs = compute_forecasts(df, forecasts, horizon) if forecasts else None
+                busy['compute'] += time.perf_counter() - started
+                rows_read += len(df)
+                if not _put(results, (rows, current, outputs, bounds), stop, writer):
+                    break
+            _put(results, _DONE, stop, writer)
+            reader.result()
+            writer.result()
+        except BaseException:
+            stop.set()
+            raise
+
+    if compare:
+        written = [r for r in reports if r.table == table]
+        skipped = sum(r.skipped for r in written)
+        print(f"{'Probelauf: ' if dry_run else ''}{sum(r.rows for r in written) - skipped} Zeilen "
+              f"{'würden geändert' if dry_run else 'geändert'}, {skipped} unverändert")
+    print(f"{rows_read} Zeilen in {len(ranges)} Blöcken, Arbeitszeit je Stufe: "
+          + ', '.join(f"{stage} {seconds:.2f}s" for stage, seconds in busy.items()))
+    run.extra.update({'jobs': names, 'table': table, 'rows': rows_read, 'batches': len(ranges), 'depth': depth,
+                      'busy_seconds': busy, 'dry_run': dry_run, 'writes': write_summary(reports)})
+    return run.finish(report_path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Führt Jobs blockweise aus; Lesen, Rechnen und Schreiben überlappen.")
+    parser.add_argument('jobs', type=parse_jobs, help="Kommagetrennte Jobs (siehe 'python -m tci list') oder 'all'")
+    parser.add_argument('--table', default='ldp')
+    parser.add_argument('--batch-ids', type=int, default=BATCH_IDS, help=f"Business IDs je Block (Standard: {BATCH_IDS})")
+    parser.add_argument('--depth', type=int, default=QUEUE_DEPTH,
+                        help=f"Blöcke je Warteschlange (Standard: {QUEUE_DEPTH})")
+    parser.add_argument('--method', choices=['auto', 'staging', 'executemany'], default='auto')
+    parser.add_argument('--report', default=None, help="JSON-Datei für den Laufbericht")
+    parser.add_argument('--write-all', action='store_true', help="Alle Zeilen schreiben, ohne Vergleich")
+    parser.add_argument('--dry-run', action='store_true', help="Nichts schreiben, nur Änderungen berichten")
+    args = parser.parse_args(argv)
+
+    from tci.engine import default_engine
+
+    engine = default_engine()
+
+    run_overlapped(engine, args.jobs, table=args.table, batch_ids=args.batch_ids, depth=args.depth,
+                   method=args.method, report_path=args.report, changed_only=not args.write_all,
+                   dry_run=args.dry_run)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,232 @@
+import argparse
+from functools import cached_property
+
+import numpy as np
+import pandas as pd
+
+from tci.metrics import REFERENCE_DATE, LdpFrame
+
+# Mindestanteil belegter Zellen (Business ID × Key Date); darunter ist das Panel
+# zu lückenhaft und es wird im Langformat gerechnet
+MIN_DENSITY = 0.3
+
+# Höchstzahl der Zellen je Matrix (8 Byte je Zelle, also rund 400 MB)
+MAX_CELLS = 50_000_000
+
+
+# Mittelwert und Stichproben-Std (ddof=1) je Zeile über die Zellen in mask
+def masked_mean_std(matrix, mask):
+    n = mask.sum(axis=1)
+    values = np.where(mask, matrix, 0.0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = values.sum(axis=1) / n
+        deviations = (values - mean[:, None]) * mask
+        std = np.where(n >= 2, np.sqrt(np.einsum('ij,ij->i', deviations, deviations) / (n - 1)), np.nan)
+    return mean, std
+
+
+# Steigung y über x (x: ein Wert je Spalte) je Zeile über die Zellen in mask,
+# gleiche Sonderfälle wie tci.regression.linear_fit_by_codes
+def masked_slopes(x, y, mask):
+    weights = mask.astype(float)
+    n = weights.sum(axis=1)
+    y = np.where(mask, y, 0.0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean_x = weights @ x / n
+        mean_y = y.sum(axis=1) / n
+        dx = (x - mean_x[:, None]) * weights
+        dy = (y - mean_y[:, None]) * weights
+        sxx = np.einsum('ij,ij->i', dx, dx)
+        sxy = np.einsum('ij,ij->i', dx, dy)
+        degenerate = sxx <= np.finfo(float).eps * np.maximum(1.0, np.abs(mean_x)) ** 2 * np.maximum(n, 1)
+        slope = np.where(degenerate, 0.0, sxy / np.where(degenerate, 1.0, sxx))
+    slope[n == 0] = np.nan
+    return slope
+
+
+# Dichte Darstellung des sortierten ldp-Auszugs: eine Zeile je Business ID, eine
+# Spalte je Key Date (bei Quartalsdaten: je Quartal), fehlende Zellen maskiert.
+# codes / date_codes bilden jede ldp-Zeile auf ihre Zelle ab (to_long), so dass
+# die Ergebnisse wie bei LdpFrame zeilenweise zurückgeschrieben werden. Die
+# gemeinsam genutzten Zwischenergebnisse (Change, Mittelwert/Std je Gruppe,
+# Steigungen) entstehen als Achsenoperationen auf der Matrix statt über
+# groupby; alle übrigen Kennzahlen (z.B. tci.rolling) erbt die Klasse unverändert.
+class PanelFrame(LdpFrame):
+    def __init__(self, df, prepared=False, fit_cache=None):
+        super().__init__(df, prepared, fit_cache)
+        self.date_codes, self.dates = pd.factorize(self.df['Key Date'], sort=True)
+        self.shape = (self.n_groups, len(self.dates))
+
+    @property
+    def cells(self):
+        return self.shape[0] * self.shape[1]
+
+    @property
+    def density(self):
+        return len(self.df) / self.cells if self.cells else 1.0
+
+    # Grund, warum das Panel nicht verwendet werden kann, oder None
+    def layout_problem(self, min_density=MIN_DENSITY, max_cells=MAX_CELLS):
+        if len(self.df) and self.date_codes.min() < 0:
+            return "Key Date fehlt"
+        same_cell = (self.codes[1:] == self.codes[:-1]) & (self.date_codes[1:] == self.date_codes[:-1])
+        if same_cell.any():
+            return f"{int(same_cell.sum())} doppelte (Business ID, Key Date)"
+        if self.cells > max_cells:
+            return f"{self.cells} Zellen (höchstens {max_cells})"
+        if self.density < min_density:
+            return f"Belegung {self.density:.0%} (mindestens {min_density:.0%})"
+        return None
+
+    # Jede Zelle belegt: die sortierten ldp-Zeilen sind dann genau die Matrix in
+    # Zeilenreihenfolge, Umwandlungen sind reshape/ravel statt Indexzugriffen
+    @cached_property
+    def complete(self):
+        return len(self.df) == self.cells and self.layout_problem(min_density=0.0) is None
+
+    def to_panel(self, values, fill=np.nan):
+        if self.complete:
+            return np.asarray(values, dtype=float).reshape(self.shape)
+        matrix = np.full(self.shape, fill, dtype=float)
+        matrix[self.codes, self.date_codes] = np.asarray(values, dtype=float)
+        return matrix
+
+    def to_long(self, matrix):
+        if self.complete:
+            return matrix.ravel()
+        return matrix[self.codes, self.date_codes]
+
+    @cached_property
+    def present(self):
+        if self.complete:
+            return np.ones(self.shape, dtype=bool)
+        mask = np.zeros(self.shape, dtype=bool)
+        mask[self.codes, self.date_codes] = True
+        return mask
+
+    @cached_property
+    def matrix(self):
+        return self.to_panel(self.value)
+
+    @cached_property
+    def filled_matrix(self):
+        if self.complete:
+            return np.nan_to_num(self.matrix)
+        return np.where(self.present, np.nan_to_num(self.matrix), np.nan)
+
+    @cached_property
+    def date_days(self):
+        return (self.dates - REFERENCE_DATE).days.to_numpy(dtype=float)
+
+    @cached_property
+    def previous(self):
+        # Spalte der vorherigen vorhandenen Zelle derselben Business ID (-1: keine)
+        columns = np.where(self.present, np.arange(self.shape[1]), -1)
+        last = np.maximum.accumulate(columns, axis=1)
+        previous = np.full(self.shape, -1)
+        previous[:, 1:] = last[:, :-1]
+        return previous
+
+    # Differenz zur vorherigen vorhandenen Zelle wie groupby().diff() im Langformat
+    def panel_diff(self, matrix):
+        if self.complete:
+            diff = np.empty(self.shape)
+            diff[:, :1] = np.nan
+            np.subtract(matrix[:, 1:], matrix[:, :-1], out=diff[:, 1:])
+            return diff
+        rows = np.arange(self.shape[0])[:, None]
+        before = matrix[rows, np.maximum(self.previous, 0)]
+        return np.where(self.previous >= 0, matrix - before, np.nan)
+
+    @cached_property
+    def change(self):
+        change = np.nan_to_num(self.panel_diff(self.filled_matrix))
+        return pd.Series(self.to_long(change), index=self.df.index)
+
+    @cached_property
+    def filled_stats(self):
+        return masked_mean_std(self.filled_matrix, self.present)
+
+    @cached_property
+    def group_mean(self):
+        return self.filled_stats[0]
+
+    @cached_property
+    def group_std(self):
+        return self.filled_stats[1]
+
+    @cached_property
+    def value_stats(self):
+        return masked_mean_std(self.matrix, ~np.isnan(self.matrix))
+
+    # Steigung je Business ID, mit Fit-Cache (gleiche Modelle wie LdpFrame) nur für geänderte Reihen
+    def panel_slopes(self, model, y):
+        mask = ~np.isnan(y)
+        if self.fit_cache is None or not self.n_groups:
+            return masked_slopes(self.date_days, y, mask)
+        compute = lambda miss: masked_slopes(self.date_days, y[miss], mask[miss])[:, None]
+        return self.fit_cache.get_or_compute(model, self.series_hashes, 1, compute)[:, 0]
+
+    def calculate_steigung(self):
+        return self.broadcast(self.panel_slopes('steigung', self.matrix))
+
+    def calculate_steigung_trend(self):
+        return self.broadcast(self.panel_slopes('steigung_trend', self.panel_diff(self.matrix)))
+
+    # Querschnitt je Key Date über alle Business IDs (ungefüllte Werte, NaN zählen nicht mit)
+    def date_summary(self):
+        valid = ~np.isnan(self.matrix)
+        count = valid.sum(axis=0)
+        mean, std = masked_mean_std(self.matrix.T, valid.T)
+        ordered = np.sort(self.matrix, axis=0)
+        lower = np.take_along_axis(ordered, np.maximum((count - 1) // 2, 0)[None], axis=0)[0]
+        upper = np.take_along_axis(ordered, np.maximum(count // 2, 0)[None], axis=0)[0]
+        empty = count == 0
+        return pd.DataFrame({
+            'Anzahl': count,
+            'Abdeckung': count / max(self.n_groups, 1),
+            'Mittelwert': mean,
+            'Median': np.where(empty, np.nan, (lower + upper) / 2),
+            'Standardabweichung': std,
+            'Minimum': np.where(empty, np.nan, np.where(valid, self.matrix, np.inf).min(axis=0)),
+            'Maximum': np.where(empty, np.nan, np.where(valid, self.matrix, -np.inf).max(axis=0)),
+        }, index=pd.Index(self.dates, name='Key Date'))
+
+
+# PanelFrame, wenn die Daten dicht genug sind, sonst LdpFrame (Langformat) auf
+# demselben sortierten Auszug
+def dense_frame(df, prepared=False, fit_cache=None, min_density=MIN_DENSITY, max_cells=MAX_CELLS):
+    frame = PanelFrame(df, prepared, fit_cache)
+    problem = frame.layout_problem(min_density, max_cells)
+    if problem is None:
+        return frame
+    print(f"Panel nicht verwendet ({problem}), rechne im Langformat.")
+    return LdpFrame(frame.df, prepared=True, fit_cache=fit_cache)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Querschnitt je Key Date über alle Business IDs (Panel-Darstellung).")
+    parser.add_argument('--table', default='ldp')
+    parser.add_argument('--csv', default=None, help="Ergebnis als CSV-Datei speichern statt ausgeben")
+    args = parser.parse_args(argv)
+
+    from tci.engine import default_engine
+
+    engine = default_engine()
+
+    from tci.loader import load_ldp
+
+    frame = PanelFrame(load_ldp(engine, args.table))
+    problem = frame.layout_problem(min_density=0.0, max_cells=MAX_CELLS)
+    print(f"Panel {frame.shape[0]} Business IDs × {frame.shape[1]} Key Dates, Belegung {frame.density:.0%}")
+    if problem is not None:
+        raise SystemExit(f"Panel nicht möglich: {problem}")
+    summary = frame.date_summary()
+    if args.csv:
+        summary.to_csv(args.csv)
+    else:
+        print(summary.to_string())
+
+
+if __name__ == '__main__':
+    main()
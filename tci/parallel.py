@@ -0,0 +1,104 @@
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+from sqlalchemy import text
+
+from tci.engine import default_engine, make_engine
+from tci.jobs import FORECAST_HORIZON, compute_forecasts, forecast_models
+from tci.metrics import KEY_COLUMNS, METRICS, compute_metrics, parse_metrics
+from tci.schema import ensure_schema
+from tci.writeback import bulk_update
+
+
+# Engine im Worker-Prozess (Engines lassen sich nicht zwischen Prozessen teilen),
+# über tci.engine.make_engine mit den Pool-Einstellungen aus der Umgebung.
+# SQLite bekommt dort CRC32 als Funktion, damit die Shard-Bedingung gleich bleibt.
+def engine_for(url):
+    return make_engine(url=url.render_as_string(hide_password=False))
+
+
+# WHERE-Bedingung für einen Shard: Business IDs per Hash auf n_shards verteilt
+def shard_predicate(n_shards, shard):
+    return f"MOD(CRC32(`Business ID`), {int(n_shards)}) = {int(shard)}"
+
+
+def read_shard(engine, n_shards, shard, table='ldp', columns="`Key Date`, `Business ID`, `Value`"):
+    sql = f"SELECT {columns} FROM {table} WHERE {shard_predicate(n_shards, shard)};"
+    return pd.read_sql_query(text(sql), engine)
+
+
+# Worker: Shard lesen, Kennzahlen berechnen und über die eigene Verbindung
+# zurückschreiben; Vorhersagen (je Business ID unabhängig) gehen an den
+# Hauptprozess, der sie einmal für alle Shards schreibt
+def _shard(url, n_shards, shard, metrics, forecasts, table, method, horizon):
+    engine = engine_for(url)
+    try:
+        started = time.perf_counter()
+        df = read_shard(engine, n_shards, shard, table)
+        read_seconds = time.perf_counter() - started
+        report = None
+        if metrics:
+            result = compute_metrics(df, metrics)
+            columns = [METRICS[name][0] for name in metrics]
+            report = bulk_update(engine, result, KEY_COLUMNS, columns, table=table, method=method)
+        outputs = compute_forecasts(df, forecasts, horizon) if forecasts and len(df) else None
+        return shard, len(df), read_seconds, report, outputs
+    finally:
+        engine.dispose()
+
+
+def _shards(workers, shards):
+    return shards or workers * 4
+
+
+# Kennzahlen und Vorhersagen (Jobs aus tci.jobs, forecasts) parallel in
+# Worker-Prozessen, je Shard eigene Abfrage, Verbindung und Rückschreibung;
+# höchstens `workers` Shards laufen gleichzeitig. Die Vorhersagen aller Shards
+# schreibt der Hauptprozess über tci.forecast_store.store_forecasts.
+def run_parallel(engine, metrics=None, workers=4, shards=None, table='ldp', method='auto', forecasts=(),
+                 horizon=FORECAST_HORIZON):
+    metrics = list(METRICS if metrics is None else metrics)
+    forecasts = list(forecasts)
+    if metrics:
+        ensure_schema(engine, table, [METRICS[name][0] for name in metrics])
+
+    n_shards = _shards(workers, shards)
+    started = time.perf_counter()
+    total_rows = 0
+    outputs = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_shard, engine.url, n_shards, shard, metrics, forecasts, table, method, horizon)
+                   for shard in range(n_shards)]
+        for future in futures:
+            shard, rows, read_seconds, report, shard_outputs = future.result()
+            total_rows += rows
+            if shard_outputs is not None:
+                outputs.append(shard_outputs)
+            print(f"Shard {shard}/{n_shards}: gelesen in {read_seconds:.2f}s"
+                  + (f", {report}" if report is not None else ''))
+
+    if forecasts and outputs:
+        from tci.forecast_store import store_forecasts
+
+        records, models = (pd.concat(parts, ignore_index=True) for parts in zip(*outputs))
+        for report in store_forecasts(engine, records, models, source=table, model_names=forecast_models(forecasts)):
+            print(report)
+    print(f"{total_rows} Zeilen in {n_shards} Shards mit {workers} Workern in {time.perf_counter() - started:.2f}s verarbeitet.")
+    return total_rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Berechnet die Kennzahlen parallel, aufgeteilt nach Business ID.")
+    parser.add_argument('--metrics', type=parse_metrics, default=None)
+    parser.add_argument('--workers', type=int, default=4, help="Anzahl Worker-Prozesse (Standard: 4)")
+    parser.add_argument('--shards', type=int, default=None, help="Anzahl Shards (Standard: 4 je Worker)")
+    parser.add_argument('--table', default='ldp')
+    args = parser.parse_args(argv)
+
+    run_parallel(default_engine(), args.metrics, workers=args.workers, shards=args.shards, table=args.table)
+
+
+if __name__ == '__main__':
+    main()
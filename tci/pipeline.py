@@ -0,0 +1,48 @@
+import argparse
+
+from tci.metrics import METRICS, parse_metrics
+
+
+# Alle (bzw. die gewählten) Kennzahlen in einem Durchlauf über tci.jobs.run_jobs,
+# gleichbedeutend mit `python -m tci run <Kennzahlen>`: einmal lesen, gemeinsam
+# rechnen, nur geänderte Zeilen schreiben (Fit-Cache und Probelauf wie dort).
+# Gibt den Laufbericht zurück.
+def run_pipeline(engine, metrics=None, table='ldp', method='auto', value_dtype='float64', trace_memory=None,
+                 report_path=None, changed_only=True, dry_run=False):
+    from tci.jobs import run_jobs
+
+    return run_jobs(engine, list(metrics or METRICS), table=table, method=method, value_dtype=value_dtype,
+                    trace_memory=trace_memory, report_path=report_path, changed_only=changed_only,
+                    dry_run=dry_run)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Berechnet alle Kennzahlen der Tabelle ldp in einem Durchlauf.")
+    parser.add_argument('--metrics', type=parse_metrics, default=None,
+                        help=f"Kommagetrennte Auswahl aus: {', '.join(METRICS)} (Standard: alle)")
+    parser.add_argument('--table', default='ldp')
+    parser.add_argument('--method', choices=['auto', 'staging', 'executemany'], default='auto')
+    parser.add_argument('--value-dtype', choices=['float64', 'float32'], default='float64',
+                        help="Genauigkeit von 'Value' im Speicher (Standard: float64)")
+    parser.add_argument('--report', default=None, help="JSON-Datei für den Laufbericht")
+    parser.add_argument('--trace-memory', action='store_true', default=None,
+                        help="Speicherspitzen je Stufe mit tracemalloc messen (langsamer)")
+    parser.add_argument('--write-all', action='store_true', help="Alle Zeilen schreiben, nicht nur geänderte")
+    parser.add_argument('--dry-run', action='store_true', help="Nichts schreiben, nur Änderungen berichten")
+    args = parser.parse_args(argv)
+
+    unknown = [m for m in args.metrics or [] if m not in METRICS]
+    if unknown:
+        parser.error(f"Unbekannte Kennzahl(en): {', '.join(unknown)}")
+
+    from tci.engine import default_engine
+
+    engine = default_engine()
+
+    run_pipeline(engine, args.metrics, table=args.table, method=args.method, value_dtype=args.value_dtype,
+                 trace_memory=args.trace_memory, report_path=args.report, changed_only=not args.write_all,
+                 dry_run=args.dry_run)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,175 @@
+import argparse
+import math
+import time
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+from tci.metrics import KEY_COLUMNS
+from tci.schema import ensure_schema
+from tci.writeback import JOIN_DIALECTS, WriteReport, staging_update_sql
+
+# Jobs (siehe tci.jobs), die sich als Fensterfunktionen in der Datenbank rechnen lassen
+PUSHDOWN_JOBS = ('change', 'change_indicator', 'std_dev', 'volatility', 'within_range', 'within_2std')
+
+DIALECTS = JOIN_DIALECTS + ('sqlite',)
+
+# Ausdruck je Ergebnisspalte über den Zwischenspalten
+#   f: Value mit 0 gefüllt, v: Value roh, prev_f: f der Vorzeile je Business ID,
+#   mean_f/sd_f und mean_v/sd_v: Mittelwert und Stichproben-Std je Business ID
+PUSHDOWN_COLUMNS = {
+    'change': ('Change', "COALESCE(f - prev_f, 0)"),
+    'change_indicator': ('Change Indicator', "CASE WHEN f - prev_f > 0 THEN 1 WHEN f - prev_f < 0 THEN -1 ELSE 0 END"),
+    'std_dev': ('Standard Deviation', "sd_v"),
+    'volatility': ('Volatility', "sd_f"),
+    'within_range': ('Within_Range', "CASE WHEN f >= mean_f - 2 * sd_f AND f <= mean_f + 2 * sd_f THEN 1 ELSE 0 END"),
+    'within_2std': ('Within_2Std_Range', "CASE WHEN v >= mean_v - 2 * sd_v AND v <= mean_v + 2 * sd_v THEN 1 ELSE 0 END"),
+}
+
+# Toleranz beim Abgleich der Gleitkomma-Spalten mit dem pandas-Pfad
+RTOL = 1e-9
+ATOL = 1e-9
+
+
+def _quote(engine, name):
+    return engine.dialect.identifier_preparer.quote(name)
+
+
+def _check_dialect(engine):
+    if engine.dialect.name not in DIALECTS:
+        raise ValueError(f"Push-down wird für den Dialekt '{engine.dialect.name}' nicht unterstützt "
+                         f"(nur {', '.join(DIALECTS)}).")
+
+
+def _sqrt(value):
+    return None if value is None or value < 0 else math.sqrt(value)
+
+
+# SQLite hat kein STDDEV_SAMP (und SQRT nur mit den Math-Funktionen), daher
+# wird die Std zweistufig aus den Abweichungen zum Mittelwert gebildet
+def _register_sqlite_functions(connection):
+    if connection.dialect.name == 'sqlite':
+        connection.connection.driver_connection.create_function('tci_sqrt', 1, _sqrt, deterministic=True)
+
+
+# SELECT mit Fensterfunktionen, das je (Business ID, Key Date) die gewünschten
+# Spalten liefert. MySQL 8 nutzt STDDEV_SAMP() OVER, SQLite eine zweite Stufe.
+def pushdown_select(engine, names, table='ldp'):
+    _check_dialect(engine)
+    q = lambda name: _quote(engine, name)
+    partition = "OVER (PARTITION BY bid)"
+    base = (f"SELECT {q('Business ID')} AS bid, {q('Key Date')} AS kd, {q('Value')} AS v, "
+            f"COALESCE({q('Value')}, 0) AS f FROM {q(table)} WHERE {q('Business ID')} IS NOT NULL")
+    windows = (f"bid, kd, v, f, LAG(f) OVER (PARTITION BY bid ORDER BY kd) AS prev_f, "
+               f"AVG(f) {partition} AS mean_f, AVG(v) {partition} AS mean_v")
+    if engine.dialect.name in JOIN_DIALECTS:
+        stats = (f"SELECT {windows}, STDDEV_SAMP(f) {partition} AS sd_f, STDDEV_SAMP(v) {partition} AS sd_v "
+                 f"FROM ({base}) AS b")
+    else:
+        moments = f"SELECT {windows} FROM ({base}) AS b"
+        stats = (f"SELECT m.*, "
+                 f"tci_sqrt(SUM((f - mean_f) * (f - mean_f)) {partition} / (COUNT(f) {partition} - 1)) AS sd_f, "
+                 f"tci_sqrt(SUM((v - mean_v) * (v - mean_v)) {partition} / (COUNT(v) {partition} - 1)) AS sd_v "
+                 f"FROM ({moments}) AS m")
+    columns = ', '.join(f"{expression} AS {q(column)}" for column, expression in
+                        (PUSHDOWN_COLUMNS[name] for name in names))
+    return f"SELECT bid AS {q('Business ID')}, kd AS {q('Key Date')}, {columns} FROM ({stats}) AS s"
+
+
+def _parse(names):
+    names = list(names or PUSHDOWN_JOBS)
+    unknown = [name for name in names if name not in PUSHDOWN_JOBS]
+    if unknown:
+        raise ValueError(f"Nicht als Push-down verfügbar: {', '.join(unknown)} (verfügbar: {', '.join(PUSHDOWN_JOBS)})")
+    return names
+
+
+# Berechnet die Spalten vollständig in der Datenbank: Ergebnis per
+# CREATE TEMPORARY TABLE ... AS SELECT (Fensterfunktionen) und ein mengenbasiertes
+# UPDATE ... JOIN/FROM in die Zieltabelle. Es werden keine Zeilen nach Python übertragen.
+def run_pushdown(engine, names=None, table='ldp'):
+    names = _parse(names)
+    columns = [PUSHDOWN_COLUMNS[name][0] for name in names]
+    ensure_schema(engine, table, columns)
+
+    report = WriteReport(table=table, columns=columns, method='pushdown')
+    staging = f'{table}_pushdown'
+    drop_sql = ('DROP TEMPORARY TABLE IF EXISTS' if engine.dialect.name in JOIN_DIALECTS else 'DROP TABLE IF EXISTS')
+    started = time.perf_counter()
+    with engine.begin() as connection:
+        _register_sqlite_functions(connection)
+        connection.execute(text(f"{drop_sql} {_quote(engine, staging)}"))
+        connection.execute(text(f"CREATE TEMPORARY TABLE {_quote(engine, staging)} AS {pushdown_select(engine, names, table)}"))
+        report.stages['select'] = time.perf_counter() - started
+        report.rows = connection.execute(text(f"SELECT COUNT(*) FROM {_quote(engine, staging)}")).scalar()
+
+        update_started = time.perf_counter()
+        result = connection.execute(text(staging_update_sql(engine, table, staging, KEY_COLUMNS, columns)))
+        report.affected = max(result.rowcount, 0)
+        report.stages['update'] = time.perf_counter() - update_started
+
+        connection.execute(text(f"{drop_sql} {_quote(engine, staging)}"))
+        report.statements = 5
+    report.seconds = time.perf_counter() - started
+    print(report)
+    return report
+
+
+# Liest das Ergebnis des Push-down-SELECT (ohne zu schreiben) als DataFrame
+def read_pushdown(engine, names=None, table='ldp'):
+    names = _parse(names)
+    with engine.connect() as connection:
+        _register_sqlite_functions(connection)
+        df = pd.read_sql_query(text(pushdown_select(engine, names, table)), connection)
+    df['Key Date'] = pd.to_datetime(df['Key Date'])
+    return df
+
+
+# Gleicht das Push-down-Ergebnis mit dem pandas-Pfad (tci.jobs.compute_rows) ab.
+# Gibt je Spalte die Anzahl abweichender Zeilen zurück.
+def verify_pushdown(engine, names=None, table='ldp'):
+    from tci.jobs import compute_rows
+    from tci.loader import load_ldp
+
+    names = _parse(names)
+    columns = [PUSHDOWN_COLUMNS[name][0] for name in names]
+    sql_result = read_pushdown(engine, names, table)
+    expected = compute_rows(load_ldp(engine, table), names)
+    if list(expected.columns[:len(KEY_COLUMNS)]) != KEY_COLUMNS:
+        # Jobs mit einem Wert je Business ID: auf die Zeilen verteilen
+        expected = sql_result[KEY_COLUMNS].merge(expected, on='Business ID', how='left')
+    expected = expected.assign(**{'Business ID': expected['Business ID'].astype(str)})
+    merged = sql_result.merge(expected, on=KEY_COLUMNS, how='outer', suffixes=('_sql', '_pandas'), indicator=True)
+
+    mismatches = {'missing_rows': int((merged['_merge'] != 'both').sum())}
+    for column in columns:
+        a = pd.to_numeric(merged[f'{column}_sql'], errors='coerce').to_numpy(dtype=float)
+        b = pd.to_numeric(merged[f'{column}_pandas'], errors='coerce').to_numpy(dtype=float)
+        mismatches[column] = int((~np.isclose(a, b, rtol=RTOL, atol=ATOL, equal_nan=True)).sum())
+    print(', '.join(f"{name}: {count}" for name, count in mismatches.items()))
+    return mismatches
+
+
+def main(argv=None):
+    from tci.jobs import parse_jobs
+
+    parser = argparse.ArgumentParser(description="Berechnet Kennzahlen per Fensterfunktionen direkt in der Datenbank.")
+    parser.add_argument('--jobs', type=parse_jobs, default=None,
+                        help=f"Kommagetrennte Auswahl aus: {', '.join(PUSHDOWN_JOBS)} (Standard: alle)")
+    parser.add_argument('--table', default='ldp')
+    parser.add_argument('--verify', action='store_true', help="Nur mit dem pandas-Pfad abgleichen, nichts schreiben")
+    args = parser.parse_args(argv)
+
+    from tci.engine import default_engine
+
+    engine = default_engine()
+
+    if args.verify:
+        verify_pushdown(engine, args.jobs, args.table)
+    else:
+        run_pushdown(engine, args.jobs, args.table)
+
+
+if __name__ == '__main__':
+    main()
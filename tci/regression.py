@@ -0,0 +1,41 @@
+import numpy as np
+
+
+def _group_sums(values, codes, n_groups):
+    return np.bincount(codes, weights=values, minlength=n_groups)
+
+
+# Lineare Regression y = intercept + slope * x für alle Gruppen gleichzeitig.
+# Statt eines LinearRegression-Objekts je Business ID werden die Summen
+# n, Σx, Σy, Σxy, Σx² (zentriert um den Gruppenmittelwert, für numerische
+# Stabilität) mit gruppierten Reduktionen über die ganze Spalte gebildet.
+# Gibt Arrays der Länge n_groups zurück: n, slope, intercept, r2.
+def linear_fit_by_codes(x, y, codes, n_groups):
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    codes = np.asarray(codes, dtype=np.intp)
+
+    n = np.bincount(codes, minlength=n_groups).astype(float)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean_x = _group_sums(x, codes, n_groups) / n
+        mean_y = _group_sums(y, codes, n_groups) / n
+    dx = x - mean_x[codes]
+    dy = y - mean_y[codes]
+    sxx = _group_sums(dx * dx, codes, n_groups)
+    sxy = _group_sums(dx * dy, codes, n_groups)
+    syy = _group_sums(dy * dy, codes, n_groups)
+
+    # Wie sklearn: ohne Streuung in x (z.B. nur ein Punkt) ist die Steigung 0
+    degenerate = sxx <= np.finfo(float).eps * np.maximum(1.0, np.abs(mean_x)) ** 2 * np.maximum(n, 1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        slope = np.where(degenerate, 0.0, sxy / np.where(degenerate, 1.0, sxx))
+        intercept = mean_y - slope * mean_x
+        ss_res = np.maximum(syy - slope * sxy, 0.0)
+        r2 = np.where(syy > 0, 1.0 - ss_res / np.where(syy > 0, syy, 1.0), 1.0)
+
+    empty = n == 0
+    slope[empty] = np.nan
+    intercept[empty] = np.nan
+    r2 = np.where(n < 2, np.nan, r2)
+    return {'n': n.astype(int), 'slope': slope, 'intercept': intercept, 'r2': r2}
+
@@ -0,0 +1,402 @@
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+# Robuste Kennzahlen je Business ID (ungefüllte Werte, NaN zählen nicht mit):
+# Median/MAD statt Mittelwert/Std und die Quartile für die Tukey-Grenzen
+ROBUST_COLUMNS = {
+    'Robust_Z': 'FLOAT',
+    'IQR_Score': 'FLOAT',
+    'Within_Robust_Range': 'BOOLEAN',
+    'Within_IQR_Range': 'BOOLEAN',
+}
+
+# MAD * MAD_SCALE schätzt die Std bei normalverteilten Werten
+MAD_SCALE = 1.4826
+
+# Grenze für |Robust_Z| (Iglewicz/Hoaglin) und Faktor der Tukey-Grenzen Q1 - k * IQR, Q3 + k * IQR
+ROBUST_Z_LIMIT = 3.5
+IQR_FENCE = 1.5
+
+# Gruppen bis zu dieser Größe werden exakt (sortiert) ausgewertet, größere über eine Skizze
+EXACT_MAX_ROWS = 4096
+
+# Kompression der Skizze: höchstens etwa SKETCH_COMPRESSION / 2 Zentroide nach dem Verdichten;
+# verdichtet wird erst ab SKETCH_BUFFER Zentroiden, bis dahin ist die Skizze exakt
+SKETCH_COMPRESSION = 200
+SKETCH_BUFFER = 5 * SKETCH_COMPRESSION
+
+SKETCH_VERSION = 2
+
+# Umgebungsvariable für die Datei mit den Skizzen; ohne sie
+# <TCI_CACHE_DIR bzw. SKETCH_DIR>/robust_sketches_<Tabelle>.npz
+SKETCH_PATH_ENV = 'TCI_SKETCH_PATH'
+SKETCH_FILE = 'robust_sketches_{table}.npz'
+SKETCH_DIR = os.path.join('~', '.cache', 'tci')
+
+STAT_FIELDS = ('n', 'median', 'mad', 'q1', 'q3')
+
+
+# Quantile je Gruppe, exakt und für alle Gruppen in einem Durchlauf: einmal nach
+# (Gruppe, Wert) sortieren, dann je Quantil zwei Indexzugriffe mit linearer
+# Interpolation (wie np.quantile). Sortiert wird über den ganzzahligen Schlüssel
+# Gruppe * n + Rang des Werts (zwei argsort, deutlich schneller als np.lexsort).
+# Gibt ein Array (n_groups, len(qs)) zurück.
+def grouped_quantiles(values, codes, n_groups, qs):
+    values = np.asarray(values, dtype=float)
+    codes = np.asarray(codes, dtype=np.intp)
+    valid = ~np.isnan(values)
+    values, codes = values[valid], codes[valid]
+    ranks = np.empty(len(values), dtype=np.int64)
+    ranks[np.argsort(values)] = np.arange(len(values))
+    values = values[np.argsort(codes.astype(np.int64) * len(values) + ranks)]
+    n = np.bincount(codes, minlength=n_groups)
+    starts = np.concatenate([[0], np.cumsum(n)[:-1]])
+
+    result = np.full((n_groups, len(qs)), np.nan)
+    has = n > 0
+    n, starts = n[has], starts[has]
+    for j, q in enumerate(qs):
+        position = (n - 1) * q
+        lower = np.floor(position).astype(np.intp)
+        upper = np.minimum(lower + 1, n - 1)
+        a = values[starts + lower]
+        b = values[starts + upper]
+        result[has, j] = a + (b - a) * (position - lower)
+    return result
+
+
+# Median, MAD und Quartile je Gruppe, exakt (zwei Sortierungen über alle Gruppen)
+def exact_robust_stats(values, codes, n_groups):
+    values = np.asarray(values, dtype=float)
+    codes = np.asarray(codes, dtype=np.intp)
+    quartiles = grouped_quantiles(values, codes, n_groups, (0.25, 0.5, 0.75))
+    median = quartiles[:, 1]
+    mad = grouped_quantiles(np.abs(values - median[codes]), codes, n_groups, (0.5,))[:, 0]
+    n = np.bincount(codes, weights=~np.isnan(values), minlength=n_groups)
+    return {'n': n, 'median': median, 'mad': mad, 'q1': quartiles[:, 0], 'q3': quartiles[:, 2]}
+
+
+# Stützstellen der Verteilungsfunktion aus gewichteten, sortierten Zentroiden:
+# Zentroidmitten, an den Rändern Minimum und Maximum (Anteile 0 und 1)
+def _centroid_knots(means, weights, low, high):
+    total = weights.sum()
+    centers = (np.cumsum(weights) - weights / 2) / total
+    return np.concatenate([[low], means, [high]]), np.concatenate([[0.0], centers, [1.0]])
+
+
+# Iterationen der Bisektion für den MAD aus der Skizze (Intervall halbiert sich je Schritt)
+MAD_ITERATIONS = 60
+
+
+# Zusammenführbare Quantil-Skizze mit beschränktem Speicher (t-digest, verdichtet
+# über die Skalenfunktion k1). Werte werden zunächst als Zentroide mit Gewicht 1
+# gesammelt; solange nicht verdichtet wurde, sind die Quantile exakt. Ab
+# SKETCH_BUFFER Zentroiden werden benachbarte Zentroide zusammengefasst, an den
+# Rändern feiner als in der Mitte. Zustand als Bytes über to_bytes/from_bytes.
+class QuantileSketch:
+    def __init__(self, compression=SKETCH_COMPRESSION):
+        self.compression = compression
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+        self.exact = True
+        self.low = np.inf
+        self.high = -np.inf
+
+    @classmethod
+    def from_values(cls, values, compression=SKETCH_COMPRESSION):
+        sketch = cls(compression)
+        sketch.add(values)
+        return sketch
+
+    @property
+    def count(self):
+        return float(self.weights.sum())
+
+    def add(self, values):
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        if len(values):
+            self.means = np.concatenate([self.means, values])
+            self.weights = np.concatenate([self.weights, np.ones(len(values))])
+            self.low = min(self.low, float(values.min()))
+            self.high = max(self.high, float(values.max()))
+            self._maybe_compress()
+        return self
+
+    def merge(self, other):
+        if len(other.means):
+            self.means = np.concatenate([self.means, other.means])
+            self.weights = np.concatenate([self.weights, other.weights])
+            self.exact = self.exact and other.exact
+            self.low = min(self.low, other.low)
+            self.high = max(self.high, other.high)
+            self._maybe_compress()
+        return self
+
+    def _maybe_compress(self):
+        if len(self.means) > SKETCH_BUFFER:
+            self.compress()
+
+    # Fasst benachbarte Zentroide zusammen: jeder Zentroid fällt nach der
+    # Skalenfunktion k1(q) = compression / (2π) * asin(2q - 1) an seiner
+    # Quantilmitte in eine Klasse der Breite 1
+    def compress(self):
+        order = np.argsort(self.means, kind='stable')
+        means, weights = self.means[order], self.weights[order]
+        total = weights.sum()
+        q = (np.cumsum(weights) - weights / 2) / total
+        k = self.compression / (2 * np.pi) * np.arcsin(np.clip(2 * q - 1, -1.0, 1.0))
+        bucket = np.floor(k - k.min()).astype(np.intp)
+        _, bucket = np.unique(bucket, return_inverse=True)
+        merged_weights = np.bincount(bucket, weights=weights)
+        self.means = np.bincount(bucket, weights=weights * means) / merged_weights
+        self.weights = merged_weights
+        self.exact = False
+
+    def quantiles(self, qs):
+        if not len(self.means):
+            return np.full(len(qs), np.nan)
+        if self.exact:
+            return np.quantile(self.means, qs)
+        points, shares = self._knots()
+        return np.interp(qs, shares, points)
+
+    def _knots(self):
+        order = np.argsort(self.means, kind='stable')
+        return _centroid_knots(self.means[order], self.weights[order], self.low, self.high)
+
+    # Median, MAD und Quartile. Verdichtet ist der MAD der kleinste Abstand d mit
+    # F(Median + d) - F(Median - d) = 1/2 auf der interpolierten Verteilungsfunktion F
+    def stats(self):
+        if not len(self.means):
+            return {'n': 0.0, 'median': np.nan, 'mad': np.nan, 'q1': np.nan, 'q3': np.nan}
+        q1, median, q3 = self.quantiles((0.25, 0.5, 0.75))
+        if self.exact:
+            mad = float(np.median(np.abs(self.means - median)))
+        else:
+            points, shares = self._knots()
+            low, high = 0.0, max(median - self.low, self.high - median)
+            for _ in range(MAD_ITERATIONS):
+                middle = (low + high) / 2
+                inside = np.interp(median + middle, points, shares) - np.interp(median - middle, points, shares)
+                low, high = (middle, high) if inside < 0.5 else (low, middle)
+            mad = high
+        return {'n': self.count, 'median': float(median), 'mad': mad, 'q1': float(q1), 'q3': float(q3)}
+
+    def to_array(self):
+        header = [self.compression, float(self.exact), self.low, self.high, len(self.means)]
+        return np.concatenate([header, self.means, self.weights])
+
+    @classmethod
+    def from_array(cls, array):
+        array = np.asarray(array, dtype=float)
+        sketch = cls(int(array[0]))
+        sketch.exact = bool(array[1])
+        sketch.low, sketch.high = float(array[2]), float(array[3])
+        size = int(array[4])
+        sketch.means = array[5:5 + size].copy()
+        sketch.weights = array[5 + size:5 + 2 * size].copy()
+        return sketch
+
+    def to_bytes(self):
+        return self.to_array().astype('<f8').tobytes()
+
+    @classmethod
+    def from_bytes(cls, data):
+        return cls.from_array(np.frombuffer(data, dtype='<f8'))
+
+
+# Median/MAD/Quartile je Gruppe: exakt für Gruppen bis exact_max_rows Werte,
+# über je eine Skizze für größere Gruppen
+def robust_stats(values, codes, n_groups, exact_max_rows=EXACT_MAX_ROWS):
+    values = np.asarray(values, dtype=float)
+    codes = np.asarray(codes, dtype=np.intp)
+    sizes = np.bincount(codes, weights=~np.isnan(values), minlength=n_groups)
+    large = sizes > exact_max_rows
+    if not large.any():
+        return exact_robust_stats(values, codes, n_groups)
+
+    stats = exact_robust_stats(np.where(large[codes], np.nan, values), codes, n_groups)
+    rows = np.flatnonzero(large[codes])
+    rows = rows[np.argsort(codes[rows], kind='stable')]
+    groups, starts = np.unique(codes[rows], return_index=True)
+    for group, part in zip(groups, np.split(rows, starts[1:])):
+        for field, value in QuantileSketch.from_values(values[part]).stats().items():
+            stats[field][group] = value
+    return stats
+
+
+# Robuste Scores und Markierungen je Zeile aus den Kennzahlen je Gruppe
+# (stats: Arrays je Gruppe, codes: Gruppe je Zeile):
+#   Robust_Z            (Wert - Median) / (1.4826 * MAD)
+#   IQR_Score           Abstand unter Q1 bzw. über Q3 in IQR, 0 dazwischen
+#   Within_Robust_Range |Wert - Median| <= 3.5 * 1.4826 * MAD
+#   Within_IQR_Range    Q1 - 1.5 * IQR <= Wert <= Q3 + 1.5 * IQR
+# Ohne Streuung (MAD bzw. IQR 0) ist der Score für abweichende Werte NaN und die
+# Markierung False. NaN-Werte ergeben NaN bzw. False.
+def robust_scores(values, codes, stats, index=None):
+    values = np.asarray(values, dtype=float)
+    median = stats['median'][codes]
+    scale = MAD_SCALE * stats['mad'][codes]
+    q1 = stats['q1'][codes]
+    q3 = stats['q3'][codes]
+    iqr = q3 - q1
+    deviation = values - median
+    outside = np.where(values > q3, values - q3, np.where(values < q1, values - q1, 0.0))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        robust_z = np.where(deviation == 0, 0.0, deviation / np.where(scale > 0, scale, np.nan))
+        iqr_score = np.where(outside == 0, 0.0, outside / np.where(iqr > 0, iqr, np.nan))
+        within_robust = np.abs(deviation) <= ROBUST_Z_LIMIT * scale
+        within_iqr = (values >= q1 - IQR_FENCE * iqr) & (values <= q3 + IQR_FENCE * iqr)
+    return pd.DataFrame({
+        'Robust_Z': np.where(np.isnan(values), np.nan, robust_z),
+        'IQR_Score': np.where(np.isnan(values), np.nan, iqr_score),
+        'Within_Robust_Range': within_robust,
+        'Within_IQR_Range': within_iqr,
+    }, index=index)
+
+
+# Robuste Scores für einen sortierten ldp-Auszug (tci.metrics.LdpFrame)
+def robust_metrics(frame, exact_max_rows=EXACT_MAX_ROWS):
+    values = frame.value.to_numpy(dtype=float)
+    stats = robust_stats(values, frame.codes, frame.n_groups, exact_max_rows)
+    return robust_scores(values, frame.codes, stats, index=frame.df.index)
+
+
+def default_sketch_path(table='ldp'):
+    from tci.cache import default_cache_dir
+
+    if os.environ.get(SKETCH_PATH_ENV):
+        return os.environ[SKETCH_PATH_ENV]
+    directory = default_cache_dir() or os.path.expanduser(SKETCH_DIR)
+    return os.path.join(directory, SKETCH_FILE.format(table=table))
+
+
+# Skizzen je Business ID als eine Datei (npz): Tabelle, IDs, Watermark (letztes
+# Key Date) und alle Skizzen hintereinander (to_array) mit Offsets. update() fügt
+# neue Zeilen in die Skizzen ein, so dass zwischen zwei Läufen nur neue Daten
+# gelesen werden. Skizzen einer anderen Tabelle werden nicht geladen.
+class SketchStore:
+    def __init__(self, path, table='ldp', compression=SKETCH_COMPRESSION):
+        self.path = path
+        self.table = table
+        self.compression = compression
+        self.sketches = {}
+        self.watermark = None
+        if os.path.exists(path):
+            self.load()
+
+    def load(self):
+        with np.load(self.path, allow_pickle=False) as data:
+            if int(data['version']) != SKETCH_VERSION:
+                print(f"Skizzen in {self.path} haben eine andere Version, beginne neu.")
+                return
+            if str(data['table']) != self.table:
+                raise ValueError(f"Skizzen in {self.path} gehören zur Tabelle {data['table']}, nicht zu {self.table} "
+                                 f"(anderen Pfad wählen oder --full-rebuild)")
+            offsets = data['offsets']
+            flat = data['sketches']
+            self.sketches = {business_id: QuantileSketch.from_array(flat[offsets[i]:offsets[i + 1]])
+                             for i, business_id in enumerate(data['business_ids'].tolist())}
+            watermark = data['watermark'][0]
+            self.watermark = None if np.isnat(watermark) else pd.Timestamp(watermark)
+
+    def save(self):
+        arrays = [sketch.to_array() for sketch in self.sketches.values()]
+        offsets = np.concatenate([[0], np.cumsum([len(array) for array in arrays], dtype=np.int64)])
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + '.tmp.npz'
+        np.savez(tmp_path, version=SKETCH_VERSION, table=self.table, business_ids=np.array(list(self.sketches), dtype=str),
+                 offsets=offsets, sketches=np.concatenate(arrays) if arrays else np.empty(0),
+                 watermark=np.array([self.watermark if self.watermark is not None else 'NaT'], dtype='datetime64[ns]'))
+        os.replace(tmp_path, self.path)
+
+    # Fügt die Zeilen (Business ID, Key Date, Value) ein; gibt die betroffenen Business IDs zurück
+    def update(self, df):
+        df = df[df['Business ID'].notna()]
+        if df.empty:
+            return []
+        key_dates = pd.to_datetime(df['Key Date'])
+        values = df['Value'].to_numpy(dtype=float)
+        affected = []
+        for business_id, rows in df.groupby(df['Business ID'].astype(str), sort=False).indices.items():
+            sketch = self.sketches.get(business_id)
+            if sketch is None:
+                sketch = self.sketches[business_id] = QuantileSketch(self.compression)
+            sketch.add(values[rows])
+            affected.append(business_id)
+        latest = key_dates.max()
+        if pd.notna(latest) and (self.watermark is None or latest > self.watermark):
+            self.watermark = latest
+        return affected
+
+    # Kennzahlen (STAT_FIELDS) je Business ID als Arrays in der Reihenfolge von business_ids
+    def stats(self, business_ids):
+        rows = [self.sketches[business_id].stats() if business_id in self.sketches else QuantileSketch().stats()
+                for business_id in business_ids]
+        return {field: np.array([row[field] for row in rows], dtype=float) for field in STAT_FIELDS}
+
+
+# Inkrementeller Lauf über die Skizzen: nur Zeilen nach dem Watermark lesen, in
+# die Skizzen einfügen und die Scores aller Zeilen der betroffenen Business IDs
+# neu schreiben (Median und MAD ändern sich für die ganze Gruppe).
+# Voraussetzung wie bei tci.incremental: neue Daten kommen nur mit späterem Key Date hinzu.
+def run_robust_incremental(engine, table='ldp', path=None, full_rebuild=False, method='auto'):
+    from tci.incremental import read_delta, read_rows_for_ids
+    from tci.metrics import KEY_COLUMNS
+    from tci.schema import ensure_schema
+    from tci.writeback import bulk_update
+
+    path = path or default_sketch_path(table)
+    ensure_schema(engine, table, ROBUST_COLUMNS)
+    started = time.perf_counter()
+    if full_rebuild and os.path.exists(path):
+        os.remove(path)
+    store = SketchStore(path, table)
+    watermark = store.watermark
+    delta = read_delta(engine, watermark, table)
+    print(f"Watermark: {watermark}, neue Zeilen: {len(delta)}")
+    if delta.empty:
+        return store, None
+
+    affected = store.update(delta)
+    history = delta if watermark is None else read_rows_for_ids(engine, affected, table)
+    history = history[history['Business ID'].notna()].reset_index(drop=True)
+    codes, business_ids = pd.factorize(history['Business ID'].astype(str))
+    stats = store.stats(list(business_ids))
+    scores = robust_scores(history['Value'].to_numpy(dtype=float), codes, stats)
+    result = pd.concat([history[KEY_COLUMNS], scores], axis=1)
+    print(f"Betroffene Business IDs: {len(affected)}, Skizzen aktualisiert in {time.perf_counter() - started:.2f}s")
+
+    report = bulk_update(engine, result, KEY_COLUMNS, list(ROBUST_COLUMNS), table=table, method=method)
+    store.save()
+    print(report)
+    return store, report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Robuste Scores (Median/MAD, IQR) inkrementell über Quantil-Skizzen je Business ID.")
+    parser.add_argument('--table', default='ldp')
+    parser.add_argument('--sketches', default=None,
+                        help=f"Datei mit den Skizzen (Standard: {SKETCH_PATH_ENV} bzw. "
+                             f"<TCI_CACHE_DIR oder {SKETCH_DIR}>/{SKETCH_FILE})")
+    parser.add_argument('--full-rebuild', action='store_true', help="Skizzen verwerfen und alles neu einlesen")
+    parser.add_argument('--method', choices=['auto', 'staging', 'executemany'], default='auto')
+    args = parser.parse_args(argv)
+
+    from tci.engine import default_engine
+
+    engine = default_engine()
+
+    run_robust_incremental(engine, args.table, args.sketches, full_rebuild=args.full_rebuild, method=args.method)
+
+
+if __name__ == '__main__':
+    main()
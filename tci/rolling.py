@@ -0,0 +1,143 @@
+import numpy as np
+import pandas as pd
+
+from tci.bands import sigma_band_flags
+
+# Fensterlängen in Quartalen für die rollierende Volatilität und die Bänder
+ROLLING_WINDOWS = (4, 8, 12)
+
+# Abstand der Gruppen im Sortierschlüssel von window_begins (größer als jede Quartalsspanne)
+GROUP_STRIDE = 1 << 32
+
+# Breite der rollierenden Bänder in Standardabweichungen (wie Within_Range)
+ROLLING_BAND_K = 2
+
+# Relative Auflösung der Fenster-Std gegenüber dem Betrag der Fensterwerte
+# (Vielfaches der Maschinengenauigkeit); darunter gilt das Fenster als konstant
+RESOLUTION = 64 * np.finfo(float).eps
+
+
+def volatility_column(window):
+    return f'Volatility_{window}Q'
+
+
+def range_column(window):
+    return f'Within_Range_{window}Q'
+
+
+# Spalte in ldp -> SQL-Typ, für tci.schema
+ROLLING_COLUMNS = {
+    **{volatility_column(w): 'FLOAT' for w in ROLLING_WINDOWS},
+    **{range_column(w): 'BOOLEAN' for w in ROLLING_WINDOWS},
+}
+
+
+# Erste Zeile der jeweiligen Gruppe für jede Zeile sowie die Gruppenanfänge.
+# Voraussetzung: die Zeilen einer Gruppe liegen zusammenhängend (ldp nach
+# Business ID, Key Date sortiert, siehe tci.metrics.prepare_frame).
+def group_first_rows(codes):
+    codes = np.asarray(codes)
+    positions = np.arange(len(codes))
+    boundary = np.ones(len(codes), dtype=bool)
+    boundary[1:] = codes[1:] != codes[:-1]
+    return np.maximum.accumulate(np.where(boundary, positions, 0)), np.flatnonzero(boundary)
+
+
+# Erste Zeile des Fensters je Zeile, wenn das Fenster über Quartale statt Zeilen
+# läuft: die früheste Zeile derselben Gruppe, deren Quartal (periods, z.B.
+# tci.loader.quarter_ordinal) höchstens window - 1 Quartale vor dem der Zeile
+# liegt. Fehlende Quartale verkürzen das Fenster also, statt es zu verlängern.
+# Gruppe und Quartal bilden einen aufsteigenden Schlüssel, so dass ein
+# np.searchsorted für alle Zeilen reicht.
+def window_begins(periods, starts, window):
+    periods = np.asarray(periods, dtype=np.int64)
+    if len(periods) == 0:
+        return np.empty(0, dtype=np.intp)
+    group = np.zeros(len(periods), dtype=np.int64)
+    group[starts[1:]] = 1
+    key = np.cumsum(group) * GROUP_STRIDE + (periods - periods.min())
+    return np.searchsorted(key, key - (window - 1), side='left')
+
+
+# Je Versatz 0, 1, ... vom Fensterende: für jede Zeile die Zeile mit diesem
+# Versatz und ob sie noch im Fenster (ab begin) liegt und einen Wert hat
+def window_rows(begin, valid):
+    end = np.arange(len(begin))
+    for offset in range(int((end - begin).max()) + 1 if len(end) else 0):
+        rows = np.maximum(end - offset, 0)
+        yield rows, (rows >= begin) & (end >= offset) & valid[rows]
+
+
+# Rollierender Mittelwert und Stichproben-Std (ddof=1) je Gruppe für mehrere
+# Fensterlängen. Das Fenster endet an der Zeile und wird am Gruppenanfang
+# abgeschnitten; mit periods (Quartal je Zeile, je Gruppe aufsteigend) umfasst es
+# die letzten window Quartale, sonst die letzten window Zeilen. Da ein Fenster
+# höchstens wenige Zeilen hat, wird je Versatz innerhalb des Fensters über alle
+# Zeilen gleichzeitig summiert, in zwei Durchläufen: erst Anzahl und Summe
+# (Fenstermittelwert), dann die Abweichungsquadrate vom Fenstermittelwert. Die
+# Varianz entsteht so aus zentrierten Werten und bleibt auch bei großem Niveau
+# gegenüber der Streuung (z.B. Werte um 1e9 mit Trend) genau und nie negativ.
+# Die Werte werden vorher zusätzlich um den Gruppenmittelwert zentriert. NaN-Werte
+# zählen nicht mit; mit weniger als min_periods Werten (Standard: die
+# Fensterlänge, wie pandas rolling) ist das Ergebnis NaN. Gibt
+# {Fensterlänge: (mean, std)} zurück.
+def rolling_mean_std(values, codes, windows=ROLLING_WINDOWS, min_periods=None, periods=None):
+    values = np.asarray(values, dtype=float)
+    codes = np.asarray(codes, dtype=np.intp)
+    first, starts = group_first_rows(codes)
+    valid = ~np.isnan(values)
+
+    n_groups = int(codes.max()) + 1 if len(codes) else 0
+    count = np.bincount(codes, weights=valid, minlength=n_groups)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        center = np.nan_to_num(np.bincount(codes, weights=np.where(valid, values, 0.0), minlength=n_groups) / count)
+    y = np.where(valid, values - center[codes], 0.0)
+
+    end = np.arange(len(values))
+    result = {}
+    for window in windows:
+        begin = end - window + 1 if periods is None else window_begins(periods, starts, window)
+        begin = np.maximum(first, begin)
+        n = np.zeros(len(values))
+        s = np.zeros(len(values))
+        for rows, inside in window_rows(begin, valid):
+            n += inside
+            s += np.where(inside, y[rows], 0.0)
+        required = max(window if min_periods is None else min_periods, 1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            window_mean = s / n
+            squares = np.zeros(len(values))
+            scale = np.zeros(len(values))
+            for rows, inside in window_rows(begin, valid):
+                squares += np.where(inside, y[rows] - window_mean, 0.0) ** 2
+                scale += np.where(inside, y[rows], 0.0) ** 2
+            # Abweichungen unterhalb der Rundungsgenauigkeit der Fensterwerte
+            # (z.B. konstantes Fenster) sind 0, wie bei pandas rolling
+            squares = np.where(squares > RESOLUTION ** 2 * scale, squares, 0.0)
+            mean = np.where(n >= required, window_mean + center[codes], np.nan)
+            std = np.where((n >= required) & (n >= 2), np.sqrt(squares / (n - 1)), np.nan)
+        result[window] = (mean, std)
+    return result
+
+
+# Rollierende Volatilität (Std der mit 0 gefüllten Werte, wie Volatility.py)
+# und die Markierung innerhalb Mittelwert ± 2 * Std (wie Within_Range) je
+# Fensterlänge, jeweils als eigene Spalte. frame: tci.metrics.LdpFrame.
+# Die Fenster laufen über die Quartale von 'Key Date'; fehlt für ein Quartal die
+# Zeile, hat das Fenster einen Wert weniger (und ist mit min_periods=None NaN).
+def rolling_metrics(frame, windows=ROLLING_WINDOWS, volatility=True, bands=True, min_periods=None):
+    from tci.loader import quarter_ordinal
+
+    periods = quarter_ordinal(frame.df['Key Date'])
+    stats = rolling_mean_std(frame.filled.to_numpy(dtype=float), frame.codes, windows, min_periods, periods)
+    result = pd.DataFrame(index=frame.df.index)
+    if volatility:
+        for window in windows:
+            result[volatility_column(window)] = stats[window][1]
+    if bands:
+        for window in windows:
+            mean, std = stats[window]
+            flags = sigma_band_flags(frame.filled, thresholds=[ROLLING_BAND_K],
+                                     columns={ROLLING_BAND_K: range_column(window)}, mean=mean, std=std)
+            result[range_column(window)] = flags[range_column(window)]
+    return result
@@ -0,0 +1,159 @@
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import OperationalError, ProgrammingError
+
+from tci.metrics import METRICS
+from tci.robust import ROBUST_COLUMNS
+from tci.rolling import ROLLING_COLUMNS
+
+# Alle abgeleiteten Spalten von ldp mit ihrem SQL-Typ
+DERIVED_COLUMNS = dict(METRICS.values())
+DERIVED_COLUMNS['Within_2Std_Range'] = 'BOOLEAN'
+DERIVED_COLUMNS.update(ROLLING_COLUMNS)
+DERIVED_COLUMNS.update(ROBUST_COLUMNS)
+
+# Schlüssel der zeilenweisen Updates; dafür muss ein Index existieren
+KEY_INDEX_COLUMNS = ['Business ID', 'Key Date']
+
+# Präfixlänge für Indizes auf TEXT-Spalten unter MySQL
+MYSQL_TEXT_PREFIX = 191
+
+# Schema-Informationen je (Datenbank, Tabelle), einmal pro Lauf gelesen
+_schemas = {}
+
+# Fehler bei ALTER TABLE/CREATE INDEX, z.B. weil ein anderer Prozess die Spalte
+# bzw. den Index inzwischen angelegt hat (MySQL: ProgrammingError, SQLite: OperationalError)
+DDL_ERRORS = (OperationalError, ProgrammingError)
+
+
+# Schema-Verwaltung für eine Tabelle: liest Spalten und Indizes einmal,
+# ergänzt fehlende abgeleitete Spalten in einem einzigen ALTER TABLE und
+# legt bei Bedarf den Index auf (Business ID, Key Date) an
+class SchemaManager:
+    def __init__(self, engine, table='ldp'):
+        self.engine = engine
+        self.table = table
+        self._columns = None
+        self._indexes = None
+
+    def _quote(self, name):
+        return self.engine.dialect.identifier_preparer.quote(name)
+
+    @property
+    def columns(self):
+        if self._columns is None:
+            self._columns = {c['name']: c for c in inspect(self.engine).get_columns(self.table)}
+        return self._columns
+
+    @property
+    def indexes(self):
+        if self._indexes is None:
+            inspector = inspect(self.engine)
+            indexes = [index['column_names'] for index in inspector.get_indexes(self.table)]
+            primary_key = inspector.get_pk_constraint(self.table).get('constrained_columns')
+            if primary_key:
+                indexes.append(primary_key)
+            self._indexes = indexes
+        return self._indexes
+
+    def invalidate(self):
+        self._columns = None
+        self._indexes = None
+
+    def column_exists(self, column):
+        return column in self.columns
+
+    def missing_columns(self, columns=None):
+        columns = DERIVED_COLUMNS if columns is None else columns
+        return [c for c in columns if c not in self.columns]
+
+    def _add_columns(self, missing, types):
+        additions = [f"ADD COLUMN {self._quote(c)} {types[c]}" for c in missing]
+        if self.engine.dialect.name == 'sqlite':
+            statements = [f"ALTER TABLE {self._quote(self.table)} {a}" for a in additions]
+        else:
+            statements = [f"ALTER TABLE {self._quote(self.table)} {', '.join(additions)}"]
+        with self.engine.begin() as connection:
+            for statement in statements:
+                connection.execute(text(statement))
+
+    # Fügt alle fehlenden Spalten mit einem ALTER TABLE hinzu (SQLite kennt nur
+    # eine Spalte je ALTER TABLE, dort wird je Spalte ein Statement gesendet).
+    # Schlägt das fehl, wird das Schema neu gelesen und nur für die weiterhin
+    # fehlenden Spalten ein zweites Mal versucht (ein anderer Prozess kann
+    # einzelne Spalten inzwischen angelegt haben).
+    # columns: Liste deklarierter Spalten oder dict Spalte -> SQL-Typ
+    def ensure_columns(self, columns=None):
+        types = columns if isinstance(columns, dict) else DERIVED_COLUMNS
+        missing = self.missing_columns(columns)
+        for attempt in range(2):
+            if not missing:
+                return []
+            try:
+                self._add_columns(missing, types)
+            except DDL_ERRORS as e:
+                self._columns = None
+                missing = self.missing_columns(missing)
+                if attempt and missing:
+                    print(f"Fehler beim Hinzufügen der Spalten {', '.join(missing)}: {e}")
+                    return []
+                continue
+            print(f"Spalten hinzugefügt: {', '.join(missing)}")
+            self._columns = None
+            return missing
+        return []
+
+    def has_key_index(self):
+        return any(columns[:len(KEY_INDEX_COLUMNS)] == KEY_INDEX_COLUMNS for columns in self.indexes)
+
+    # Legt den Index auf (Business ID, Key Date) an, damit die UPDATEs über
+    # diese Schlüssel Index-Lookups statt Tabellenscans sind
+    def ensure_key_index(self):
+        if self.has_key_index():
+            return False
+        parts = []
+        for column in KEY_INDEX_COLUMNS:
+            part = self._quote(column)
+            column_type = self.columns[column]['type']
+            if self.engine.dialect.name in ('mysql', 'mariadb') and getattr(column_type, 'length', None) is None \
+                    and column_type.__class__.__name__.upper().endswith('TEXT'):
+                part += f"({MYSQL_TEXT_PREFIX})"
+            parts.append(part)
+        name = self._quote(f"idx_{self.table}_business_id_key_date")
+        try:
+            with self.engine.begin() as connection:
+                connection.execute(text(f"CREATE INDEX {name} ON {self._quote(self.table)} ({', '.join(parts)})"))
+            print(f"Index {name} auf {self.table} angelegt.")
+        except DDL_ERRORS as e:
+            self._indexes = None
+            if not self.has_key_index():
+                print(f"Fehler beim Anlegen des Index: {e}")
+            return False
+        self._indexes = None
+        return True
+
+
+def get_schema(engine, table='ldp'):
+    key = (str(engine.url), table)
+    if key not in _schemas:
+        _schemas[key] = SchemaManager(engine, table)
+    return _schemas[key]
+
+
+# Stellt sicher, dass die abgeleiteten Spalten (Standard: alle) und der
+# Schlüsselindex existieren
+def ensure_schema(engine, table='ldp', columns=None, key_index=True):
+    schema = get_schema(engine, table)
+    added = schema.ensure_columns(columns)
+    if key_index:
+        schema.ensure_key_index()
+    return added
+
+
+# Funktion, um zu prüfen, ob eine Spalte in der Tabelle existiert
+def column_exists(engine, table_name, column_name):
+    return get_schema(engine, table_name).column_exists(column_name)
+
+
+# Fügt die Spalte hinzu, falls sie noch nicht existiert
+def add_column_if_not_exists(engine, table_name, column_name, column_type):
+    return bool(get_schema(engine, table_name).ensure_columns({column_name: column_type}))
@@ -0,0 +1,161 @@
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from tci.forecast import (COEF_COLUMNS, MAX_MODEL_DEGREE, MIN_POINTS, MODEL_KEY_COLUMNS, MODEL_VALUE_COLUMNS,
+                          RECORD_KEY_COLUMNS, TIME_COLUMN, evaluate_polynomial, future_quarters)
+
+# Höchster Polynomgrad der Modellauswahl (Grade 1..MAX_DEGREE)
+MAX_DEGREE = 3
+
+# Modellname der ausgewählten Polynome in der Vorhersage- und der Modelltabelle
+SELECTION_MODEL = 'auto'
+
+# Anzahl zwischengespeicherter Pseudo-Inversen (je Reihenlänge und Grad)
+PINV_CACHE_SIZE = 1024
+
+# Ein höherer Grad wird nur gewählt, wenn er das adjustierte R² um mehr als diesen Wert verbessert
+ADJUSTED_R2_TOLERANCE = 1e-9
+
+
+# Vandermonde-Matrix [1, x, x², ...] für die Zeitachse x = 0..length-1
+def vandermonde(length, degree):
+    return np.vander(np.arange(length, dtype=float), degree + 1, increasing=True)
+
+
+# Pseudo-Inverse der Designmatrix je (Länge, Grad). Einmal berechnet, gilt sie
+# für alle Business IDs mit derselben Reihenlänge (ohne NaN-Werte).
+@lru_cache(maxsize=PINV_CACHE_SIZE)
+def design_pinv(length, degree):
+    return np.linalg.pinv(vandermonde(length, degree))
+
+
+# Pseudo-Inversen für Reihen mit Lücken, als Stapel (g, degree + 1, length): die
+# Zeilen der NaN-Werte werden in der Designmatrix auf 0 gesetzt und fallen so aus
+# dem Fit heraus
+def masked_pinv(valid, degree):
+    return np.linalg.pinv(vandermonde(valid.shape[1], degree)[None] * valid[:, :, None])
+
+
+# R² wie tci.forecast.r2_by_codes (als Anteil, nicht in Prozent)
+def _r2(ss_res, ss_tot):
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(ss_tot > 0, 1.0 - ss_res / np.where(ss_tot > 0, ss_tot, 1.0),
+                        np.where(ss_res <= np.finfo(float).eps * np.maximum(ss_tot, 1.0), 1.0, 0.0))
+
+
+# Wählt für einen Stapel von Reihen gleicher Länge (block: g × length, NaN als 0,
+# valid: gültige Werte) den Grad mit dem besten adjustierten R². Je Grad ist der
+# Fit eine Matrixmultiplikation des Stapels mit der Pseudo-Inversen; ohne Lücken
+# (gapped=False) ist das die gecachte design_pinv. Ein Grad kommt nur in Frage,
+# wenn mindestens Grad + 2 Werte vorliegen (sonst ist das adjustierte R² nicht
+# definiert); Reihen mit 2 Werten bekommen die Gerade.
+def _select_stack(block, valid, gapped, max_degree):
+    g, length = block.shape
+    m = valid.sum(axis=1)
+    y_mean = block.sum(axis=1) / m
+    ss_tot = (np.where(valid, block - y_mean[:, None], 0.0) ** 2).sum(axis=1)
+
+    best = {'degree': np.zeros(g, dtype=int), 'adjusted': np.full(g, np.nan), 'r2': np.full(g, np.nan),
+            'coef': np.zeros((g, max_degree + 1))}
+    for degree in range(1, max_degree + 1):
+        eligible = m >= (MIN_POINTS if degree == 1 else degree + 2)
+        if not eligible.any():
+            break
+        if gapped:
+            coef = np.einsum('gkl,gl->gk', masked_pinv(valid, degree), block)
+        else:
+            coef = block @ design_pinv(length, degree).T
+        fitted = coef @ vandermonde(length, degree).T
+        r2 = _r2((np.where(valid, block - fitted, 0.0) ** 2).sum(axis=1), ss_tot)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            adjusted = np.where(m > degree + 1, 1.0 - (1.0 - r2) * (m - 1) / (m - degree - 1), np.nan)
+        better = eligible if degree == 1 else eligible & (adjusted > best['adjusted'] + ADJUSTED_R2_TOLERANCE)
+        best['degree'][better] = degree
+        best['adjusted'][better] = adjusted[better]
+        best['r2'][better] = r2[better]
+        best['coef'][better] = 0.0
+        best['coef'][better, :degree + 1] = coef[better]
+    return best
+
+
+# Modellauswahl für alle Business IDs: Polynome vom Grad 1..max_degree über
+# x = 0..len(Gruppe)-1, gewählt nach adjustiertem R². Die Gruppen werden nach
+# Reihenlänge gestapelt; je Stapel und Grad genügt eine Matrixmultiplikation mit
+# der gecachten Pseudo-Inversen (Reihen mit NaN-Werten: ein gemeinsamer Aufruf
+# von masked_pinv je Länge). Erwartet nach (Business ID, Key Date) sortierte
+# Arrays. Rückgabe je Gruppe: degree (0 ohne gültige Regression), coef
+# (n_groups, max_degree + 1), r2 und adjusted (Anteile).
+def select_models(codes, values, n_groups, max_degree=MAX_DEGREE):
+    codes = np.asarray(codes, dtype=np.intp)
+    values = np.asarray(values, dtype=float)
+    sizes = np.bincount(codes, minlength=n_groups)
+    starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+
+    result = {'degree': np.zeros(n_groups, dtype=int), 'coef': np.full((n_groups, max_degree + 1), np.nan),
+              'r2': np.full(n_groups, np.nan), 'adjusted': np.full(n_groups, np.nan)}
+    for length in np.unique(sizes[sizes > 0]):
+        groups = np.flatnonzero(sizes == length)
+        block = values[starts[groups][:, None] + np.arange(length)]
+        valid = ~np.isnan(block)
+        block = np.where(valid, block, 0.0)
+        usable = valid.sum(axis=1) >= MIN_POINTS
+        complete = valid.all(axis=1)
+        for subset, gapped in ((complete & usable, False), (~complete & usable, True)):
+            if subset.any():
+                best = _select_stack(block[subset], valid[subset], gapped, max_degree)
+                for key in result:
+                    result[key][groups[subset]] = best[key]
+    result['coef'][result['degree'] == 0] = np.nan
+    return result
+
+
+# Vorhersagezeilen und Modellzeilen (Formate wie tci.forecast.forecast_outputs)
+# für das je Business ID ausgewählte Polynom, Modellname SELECTION_MODEL
+def selection_outputs(df, max_degree=MAX_DEGREE, horizon=3):
+    if max_degree > MAX_MODEL_DEGREE:
+        raise ValueError(f"Modelltabelle speichert Polynome bis Grad {MAX_MODEL_DEGREE}, nicht {max_degree}.")
+    df = df[df['Business ID'].notna()].copy()
+    df['Key Date'] = pd.to_datetime(df['Key Date'])
+    df = df.sort_values(by=['Business ID', 'Key Date'], kind='mergesort').reset_index(drop=True)
+    codes, business_ids = pd.factorize(df['Business ID'])
+    n_groups = len(business_ids)
+    business_ids = np.asarray(business_ids).astype(str)
+
+    selected = select_models(codes, df['Value'].to_numpy(dtype=float), n_groups, max_degree)
+    sizes = np.bincount(codes, minlength=n_groups)
+    x = np.arange(len(codes)) - np.concatenate([[0], np.cumsum(sizes)[:-1]])[codes]
+    r2_percent = selected['r2'] * 100
+    valid = selected['degree'] > 0
+    last_dates = df['Key Date'].groupby(codes).max().reindex(range(n_groups)).to_numpy()
+
+    valid_groups = np.flatnonzero(valid)
+    future_codes = np.repeat(valid_groups, horizon)
+    future_x = sizes[future_codes] + np.tile(np.arange(horizon), len(valid_groups))
+    existing = pd.DataFrame({'Business ID': business_ids[codes], 'Key Date': df['Key Date'].to_numpy(),
+                             TIME_COLUMN: x, 'PredictedValue': evaluate_polynomial(selected['coef'], codes, x),
+                             'Bestimmtheitsgrad': r2_percent[codes], '_order': codes})
+    future = pd.DataFrame({'Business ID': business_ids[future_codes],
+                           'Key Date': future_quarters(last_dates[valid_groups], horizon).reshape(-1),
+                           TIME_COLUMN: future_x,
+                           'PredictedValue': evaluate_polynomial(selected['coef'], future_codes, future_x),
+                           'Bestimmtheitsgrad': r2_percent[future_codes], '_order': future_codes})
+    records = pd.concat([existing, future], ignore_index=True).sort_values(by='_order', kind='mergesort')
+    records = records[records['Key Date'].notna()].drop(columns='_order')
+    records.insert(2, 'model', SELECTION_MODEL)
+    records = records.drop_duplicates(subset=RECORD_KEY_COLUMNS, keep='last').reset_index(drop=True)
+
+    models = pd.DataFrame({'Business ID': business_ids[valid], 'model': SELECTION_MODEL,
+                           'degree': selected['degree'][valid]})
+    for k, column in enumerate(COEF_COLUMNS):
+        models[column] = selected['coef'][valid, k] if k <= max_degree else 0.0
+    models['Bestimmtheitsgrad'] = r2_percent[valid]
+    models['Abschnitte'] = sizes[valid]
+    models['Last Key Date'] = pd.to_datetime(last_dates[valid])
+    models = models[MODEL_KEY_COLUMNS + MODEL_VALUE_COLUMNS]
+
+    counts = np.bincount(selected['degree'][valid], minlength=max_degree + 1)[1:]
+    print("Modellauswahl (adjustiertes R²): " + ', '.join(f"Grad {d}: {n}" for d, n in enumerate(counts, start=1))
+          + f", {int((~valid).sum())} ohne Regression")
+    return records, models
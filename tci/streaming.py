@@ -0,0 +1,111 @@
+import argparse
+import os
+import tempfile
+import time
+
+import pandas as pd
+from sqlalchemy import text
+
+from tci.metrics import KEY_COLUMNS, METRICS, LdpFrame, compute_metrics, parse_metrics
+from tci.schema import ensure_schema
+from tci.writeback import bulk_update
+
+# Zeilen im ersten Block, bevor die Blockgröße aus dem Speicherbudget abgeleitet wird
+INITIAL_CHUNK_ROWS = 10000
+MIN_CHUNK_ROWS = 1000
+
+# Faktor für Zwischenergebnisse je Zeile (Kopien beim Rechnen, Parameterlisten beim Schreiben)
+WORK_FACTOR = 12
+
+
+# Blockgröße aus dem Speicherbudget und dem gemessenen Speicherbedarf je Zeile
+def chunk_rows_for_budget(memory_budget_mb, bytes_per_row):
+    budget = memory_budget_mb * 1024 * 1024
+    return max(MIN_CHUNK_ROWS, int(budget / max(bytes_per_row * WORK_FACTOR, 1)))
+
+
+# Liest ldp sortiert nach (Business ID, Key Date) über einen serverseitigen Cursor
+# und liefert Blöcke, die nur vollständige Business IDs enthalten. Die Zeilen der
+# letzten, evtl. unvollständigen Gruppe eines Blocks werden in den nächsten übertragen.
+def stream_ldp(engine, table='ldp', memory_budget_mb=256, chunk_rows=None):
+    sql = text(f"SELECT `Key Date`, `Business ID`, `Value` FROM {table} WHERE `Business ID` IS NOT NULL "
+               f"ORDER BY `Business ID`, `Key Date`;")
+    size = chunk_rows or INITIAL_CHUNK_ROWS
+    carry = None
+    with engine.connect().execution_options(stream_results=True, max_row_buffer=size) as connection:
+        result = connection.execute(sql)
+        columns = list(result.keys())
+        while True:
+            rows = result.fetchmany(size)
+            if not rows:
+                break
+            chunk = pd.DataFrame(rows, columns=columns)
+            if chunk_rows is None:
+                size = chunk_rows_for_budget(memory_budget_mb, chunk.memory_usage(deep=True).sum() / len(chunk))
+            if carry is not None:
+                chunk = pd.concat([carry, chunk], ignore_index=True)
+
+            # Letzte Gruppe zurückhalten, sie kann im nächsten Block weitergehen
+            last_id = chunk['Business ID'].iloc[-1]
+            tail = (chunk['Business ID'] == last_id).to_numpy()
+            carry = chunk[tail]
+            if (~tail).any():
+                yield chunk[~tail].reset_index(drop=True)
+        if carry is not None and len(carry):
+            yield carry.reset_index(drop=True)
+
+
+# Berechnet die Kennzahlen blockweise. Zurückgeschrieben wird erst, wenn der
+# Lesecursor ganz gelesen ist: während des Lesens kein UPDATE auf dieselbe Tabelle
+# über eine zweite Verbindung (SQLite: "database is locked", MySQL: langes Lesen
+# parallel zu den Updates). Bis dahin liegen die Ergebnisblöcke in einem
+# temporären Verzeichnis (spill_dir, Standard: das des Systems), nicht im Speicher.
+# Der Speicherbedarf hängt vom Budget ab, nicht von der Tabellengröße; eine
+# Business ID wird aber immer ganz in einem Block gerechnet (Gruppenkennzahlen
+# wie Standard Deviation brauchen alle Werte), die größte Gruppe setzt also die Untergrenze.
+def run_streaming(engine, metrics=None, table='ldp', memory_budget_mb=256, chunk_rows=None, method='auto',
+                  spill_dir=None):
+    metrics = list(metrics or METRICS)
+    columns = [METRICS[name][0] for name in metrics]
+    ensure_schema(engine, table, columns)
+
+    started = time.perf_counter()
+    total_rows = 0
+    with tempfile.TemporaryDirectory(prefix='tci_streaming_', dir=spill_dir) as directory:
+        paths = []
+        for chunk in stream_ldp(engine, table, memory_budget_mb, chunk_rows):
+            chunk['Key Date'] = pd.to_datetime(chunk['Key Date'])
+            result = compute_metrics(LdpFrame(chunk, prepared=True), metrics)
+            paths.append(os.path.join(directory, f'{len(paths):06d}.pkl'))
+            result.to_pickle(paths[-1])
+        print(f"{len(paths)} Blöcke gelesen und berechnet in {time.perf_counter() - started:.2f}s.")
+
+        for block, path in enumerate(paths, start=1):
+            report = bulk_update(engine, pd.read_pickle(path), KEY_COLUMNS, columns, table=table, method=method)
+            total_rows += report.rows
+            print(f"Block {block}: {report}")
+
+    print(f"{total_rows} Zeilen in {len(paths)} Blöcken in {time.perf_counter() - started:.2f}s verarbeitet.")
+    return total_rows, len(paths)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Berechnet die Kennzahlen blockweise mit begrenztem Speicher.")
+    parser.add_argument('--metrics', type=parse_metrics, default=None)
+    parser.add_argument('--memory-budget', type=int, default=256,
+                        help="Speicherbudget je Block in MB (Standard: 256); eine Business ID liegt immer ganz "
+                             "in einem Block, bei sehr großen Gruppen wird das Budget überschritten")
+    parser.add_argument('--chunk-rows', type=int, default=None, help="Feste Blockgröße statt Budget")
+    parser.add_argument('--table', default='ldp')
+    args = parser.parse_args(argv)
+
+    from tci.engine import default_engine
+
+    engine = default_engine()
+
+    run_streaming(engine, args.metrics, table=args.table, memory_budget_mb=args.memory_budget,
+                  chunk_rows=args.chunk_rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+from tci.loader import quarter_end_dates, quarter_ordinal
+
+# Erstes Quartal der synthetischen Zeitreihen
+START_DATE = '2015-03-31'
+
+INSERT_CHUNK_ROWS = 100000
+
+
+# Länge der Zeitreihe je Business ID. skew=0: alle IDs haben `quarters` Werte,
+# größere Werte erzeugen viele kurze und wenige lange Zeitreihen.
+def group_sizes(n_ids, quarters, skew=0.0, rng=None):
+    rng = rng or np.random.default_rng()
+    if skew <= 0:
+        return np.full(n_ids, quarters, dtype=np.int64)
+    sizes = np.ceil(quarters * rng.random(n_ids) ** skew)
+    return np.clip(sizes, 1, quarters).astype(np.int64)
+
+
+# Synthetische ldp-Daten (Key Date, Business ID, Value) im Format der Produktionstabelle:
+# je Business ID eine zusammenhängende Folge von Quartalsenden mit einem Random Walk
+# als Wert, ein Anteil nan_ratio der Werte fehlt. Mit rows wird die Anzahl der IDs
+# so gewählt (und die letzte Zeitreihe gekürzt), dass genau rows Zeilen entstehen.
+def generate_ldp(n_ids=1000, quarters=12, nan_ratio=0.1, skew=0.0, rows=None, seed=0, shuffle=True):
+    rng = np.random.default_rng(seed)
+    if rows is not None:
+        mean_size = quarters / (1.0 + max(skew, 0.0))
+        n_ids = max(1, int(np.ceil(rows / mean_size * 1.1)) + 10)
+    sizes = group_sizes(n_ids, quarters, skew, rng)
+    if rows is not None:
+        while sizes.sum() < rows:
+            sizes = np.concatenate([sizes, group_sizes(n_ids, quarters, skew, rng)])
+        ends = np.cumsum(sizes)
+        n_ids = int(np.searchsorted(ends, rows)) + 1
+        sizes = sizes[:n_ids]
+        sizes[-1] -= int(ends[n_ids - 1] - rows)
+
+    codes = np.repeat(np.arange(n_ids), sizes)
+    starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    position = np.arange(len(codes)) - starts[codes]
+
+    # Zeitreihen enden zu verschiedenen Zeitpunkten innerhalb des Zeitraums
+    offsets = rng.integers(0, quarters - sizes + 1)
+    ordinals = quarter_ordinal([START_DATE])[0] + offsets[codes] + position
+
+    steps = rng.normal(5.0, 20.0, len(codes))
+    walk = np.cumsum(steps)
+    level = rng.normal(1000.0, 300.0, n_ids)
+    values = level[codes] + walk - (walk[starts] - steps[starts])[codes]
+    values[rng.random(len(codes)) < nan_ratio] = np.nan
+
+    width = len(str(max(n_ids - 1, 1)))
+    business_ids = pd.Categorical.from_codes(codes, categories=[f'B{i:0{width}d}' for i in range(n_ids)])
+    df = pd.DataFrame({
+        'Key Date': quarter_end_dates(ordinals),
+        'Business ID': business_ids,
+        'Value': values,
+    })
+    if shuffle:
+        df = df.iloc[rng.permutation(len(df))].reset_index(drop=True)
+    return df
+
+
+# Schreibt die Daten in eine neue Tabelle (vorhandene wird ersetzt); Key Date als
+# 'YYYY-MM-DD HH:MM:SS' wie beim Binden von datetime-Werten über SQLAlchemy
+def load_table(engine, df, table='ldp'):
+    with engine.begin() as connection:
+        connection.execute(text(f"DROP TABLE IF EXISTS {table}"))
+        connection.execute(text(f"CREATE TABLE {table} (`Key Date` DATETIME, `Business ID` VARCHAR(191), `Value` FLOAT)"))
+    for start in range(0, len(df), INSERT_CHUNK_ROWS):
+        chunk = df.iloc[start:start + INSERT_CHUNK_ROWS].copy()
+        chunk['Key Date'] = chunk['Key Date'].dt.strftime('%Y-%m-%d %H:%M:%S')
+        chunk['Business ID'] = chunk['Business ID'].astype(str)
+        chunk.to_sql(table, engine, if_exists='append', index=False)
+
+
+# Legt eine SQLite-Datei mit synthetischer ldp-Tabelle an und gibt die Engine zurück
+def synthetic_sqlite(path, table='ldp', **options):
+    from tci.parallel import engine_for
+    from sqlalchemy.engine import make_url
+
+    engine = engine_for(make_url(f'sqlite:///{path}'))
+    load_table(engine, generate_ldp(**options), table)
+    return engine
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Erzeugt synthetische ldp-Daten in einer SQLite-Datei.")
+    parser.add_argument('path', help="Pfad der SQLite-Datei")
+    parser.add_argument('--rows', type=int, default=None, help="Genaue Zeilenzahl (bestimmt die Anzahl IDs)")
+    parser.add_argument('--ids', type=int, default=1000, help="Anzahl Business IDs (Standard: 1000)")
+    parser.add_argument('--quarters', type=int, default=12, help="Quartale je Business ID (Standard: 12)")
+    parser.add_argument('--nan-ratio', type=float, default=0.1, help="Anteil fehlender Werte (Standard: 0.1)")
+    parser.add_argument('--skew', type=float, default=0.0, help="Schiefe der Gruppengrößen (Standard: 0)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--table', default='ldp')
+    args = parser.parse_args(argv)
+
+    synthetic_sqlite(args.path, args.table, n_ids=args.ids, quarters=args.quarters, nan_ratio=args.nan_ratio,
+                     skew=args.skew, rows=args.rows, seed=args.seed)
+    print(f"Tabelle {args.table} in {args.path} angelegt.")
+
+
+if __name__ == '__main__':
+    main()
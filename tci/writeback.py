@@ -0,0 +1,418 @@
+import time
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+# Dialekte, die ein mengenbasiertes UPDATE mit JOIN bzw. FROM beherrschen
+JOIN_DIALECTS = ('mysql', 'mariadb')
+FROM_DIALECTS = ('sqlite', 'postgresql')
+
+# Toleranz beim Vergleich mit den gespeicherten Werten (siehe changed_rows).
+# FLOAT ist in MySQL einfach genau (etwa 7 Stellen), daher relativ 1e-6.
+DIFF_RTOL = 1e-6
+DIFF_ATOL = 1e-9
+
+# Anzahl geänderter Zeilen, die ein Probelauf beispielhaft ausgibt
+DIFF_SAMPLE_ROWS = 10
+
+
+# Bericht über einen Schreibvorgang (Zeilen, Statements, Laufzeit)
+@dataclass
+class WriteReport:
+    table: str
+    columns: list
+    rows: int = 0
+    affected: int = 0
+    statements: int = 0
+    method: str = ''
+    seconds: float = 0.0
+    stages: dict = field(default_factory=dict)
+    # Nur bei Vergleich mit den gespeicherten Werten: unveränderte (nicht gesendete)
+    # Zeilen, geänderte Zeilen je Spalte und Beispiele (Probelauf)
+    skipped: int = 0
+    changes: dict = None
+    sample: pd.DataFrame = None
+    # Nur bei bulk_upsert mit DeleteScope: gelöschte, im Ergebnis fehlende Zeilen
+    deleted: int = 0
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def __str__(self):
+        if self.method == 'dry-run':
+            summary = (f"{self.table} (Probelauf): {self.rows - self.skipped} von {self.rows} Zeilen würden geändert"
+                       + (": " + ', '.join(f"{c} {n}" for c, n in self.changes.items()) if self.changes else ''))
+            if self.sample is not None and len(self.sample):
+                summary += f"\n{self.sample.to_string(index=False)}"
+            return summary
+        skipped = f", {self.skipped} unverändert übersprungen" if self.changes is not None else ''
+        deleted = f", {self.deleted} gelöscht" if self.deleted else ''
+        return (f"{self.table}: {', '.join(self.columns)} -> {self.rows} Zeilen "
+                f"({self.affected} betroffen{skipped}{deleted}) via {self.method} in {self.seconds:.2f}s, "
+                f"{self.statements} Statements, {self.rows_per_second:.0f} Zeilen/s")
+
+
+# Bereich, in dem bulk_upsert Zeilen löscht, die im neuen Ergebnis fehlen:
+# values beschränkt Spalten auf Wertelisten (z.B. die geschriebenen Modelle),
+# range eine Spalte auf after < Wert <= upto (None: offen), z.B. einen Block
+# Business IDs in tci.overlap
+@dataclass(frozen=True)
+class DeleteScope:
+    values: dict = field(default_factory=dict)
+    range: tuple = None
+
+
+def _quote(engine, name):
+    return engine.dialect.identifier_preparer.quote(name)
+
+
+# Wandelt die Zeilen spaltenweise in Tupel aus Python-Werten um (NaN -> None),
+# damit jeder Treiber sie ohne weitere Verarbeitung binden kann
+def _records(df, columns):
+    values = []
+    for column in columns:
+        series = df[column]
+        if pd.api.types.is_datetime64_any_dtype(series):
+            items = list(series.dt.to_pydatetime())
+        else:
+            items = series.tolist()
+        missing = series.isna().to_numpy()
+        if missing.any():
+            items = [None if m else v for v, m in zip(items, missing)]
+        values.append(items)
+    return list(zip(*values))
+
+
+# Platzhalter für n Parameter im Stil des Treibers (z.B. '?' für sqlite3,
+# '%s' für pymysql/mysqlclient/psycopg2). Die Statements werden über
+# exec_driver_sql direkt an cursor.executemany übergeben; das spart die
+# Parameterverarbeitung von SQLAlchemy je Zeile.
+def _placeholders(engine, n):
+    paramstyle = engine.dialect.paramstyle
+    if paramstyle == 'qmark':
+        return ['?'] * n
+    if paramstyle == 'numeric':
+        return [f':{i + 1}' for i in range(n)]
+    return ['%s'] * n
+
+
+# Werte als float-Array (bool/int/Decimal/None aus der Datenbank), None wenn nicht numerisch
+def _as_float(series):
+    if pd.api.types.is_bool_dtype(series) or pd.api.types.is_numeric_dtype(series):
+        return series.to_numpy(dtype=float, na_value=np.nan)
+    converted = pd.to_numeric(series, errors='coerce')
+    if converted.isna().sum() != series.isna().sum():
+        return None
+    return converted.to_numpy(dtype=float)
+
+
+def _differs(new, stored, rtol, atol):
+    a, b = _as_float(new), _as_float(stored)
+    if a is None or b is None:
+        return ~((new == stored) | (new.isna() & stored.isna())).to_numpy()
+    return ~np.isclose(a, b, rtol=rtol, atol=atol, equal_nan=True)
+
+
+# Vergleicht neue Ergebnisse (df) mit den gespeicherten Werten (current: Schlüssel-
+# und Wertspalten, wie aus der Tabelle gelesen). Zahlen und Bools werden als float
+# mit Toleranz verglichen, NaN und NULL gelten als gleich. Hat ein Schlüssel mehrere
+# gespeicherte Zeilen (z.B. nur Business ID bei Werten je Gruppe), genügt eine
+# abweichende. Gibt zurück: Maske der geänderten Zeilen von df, Anzahl geänderter
+# Zeilen je Spalte und bis zu sample_rows Beispiele (neuer und gespeicherter Wert).
+def changed_rows(df, current, key_columns, value_columns, rtol=DIFF_RTOL, atol=DIFF_ATOL, sample_rows=0):
+    left = df[key_columns + value_columns].reset_index(drop=True)
+    left['_row'] = np.arange(len(left))
+    merged = left.merge(current[key_columns + value_columns], on=key_columns, how='left', suffixes=('', ' (alt)'))
+    rows = merged['_row'].to_numpy()
+
+    changed = np.zeros(len(left), dtype=bool)
+    differs_any = np.zeros(len(merged), dtype=bool)
+    counts = {}
+    for column in value_columns:
+        differs = _differs(merged[column], merged[f'{column} (alt)'], rtol, atol)
+        per_row = np.zeros(len(left), dtype=bool)
+        np.logical_or.at(per_row, rows, differs)
+        counts[column] = int(per_row.sum())
+        changed |= per_row
+        differs_any |= differs
+
+    sample = None
+    if sample_rows:
+        sample = merged[differs_any].drop_duplicates(subset='_row').head(sample_rows)
+        sample = sample[key_columns + [c for column in value_columns for c in (f'{column} (alt)', column)]]
+    return changed, counts, sample
+
+
+def _batches(records, batch_size):
+    for start in range(0, len(records), batch_size):
+        yield records[start:start + batch_size]
+
+
+# Bedingung für einen Schlüsselvergleich. SQLite speichert Datumswerte als Text,
+# je nach Schreiber mit oder ohne Mikrosekunden ('2020-03-31 00:00:00.000000'
+# bzw. '2020-03-31 00:00:00'); ein Textvergleich fände dann keine Zeile. Dort
+# werden Datumsschlüssel daher über julianday() verglichen.
+def _key_equals(engine, left, right, date=False):
+    if date and engine.dialect.name == 'sqlite':
+        return f"julianday({left}) = julianday({right})"
+    return f"{left} = {right}"
+
+
+# Mengenbasiertes UPDATE der Zieltabelle aus einer Staging-Tabelle mit denselben
+# Spaltennamen: UPDATE ... JOIN (MySQL/MariaDB) bzw. UPDATE ... FROM (SQLite/PostgreSQL).
+# date_columns: Schlüsselspalten mit Datumswerten (siehe _key_equals)
+def staging_update_sql(engine, table, staging, key_columns, value_columns, date_columns=()):
+    target = _quote(engine, table)
+    staging = _quote(engine, staging)
+    keys = [(_quote(engine, c), c in date_columns) for c in key_columns]
+    values = [_quote(engine, c) for c in value_columns]
+    if engine.dialect.name in JOIN_DIALECTS:
+        return (
+            f"UPDATE {target} AS t JOIN {staging} AS s ON "
+            + ' AND '.join(_key_equals(engine, f"t.{k}", f"s.{k}", date) for k, date in keys)
+            + " SET " + ', '.join(f"t.{v} = s.{v}" for v in values)
+        )
+    return (
+        f"UPDATE {target} SET " + ', '.join(f"{v} = s.{v}" for v in values)
+        + f" FROM {staging} AS s WHERE "
+        + ' AND '.join(_key_equals(engine, f"{target}.{k}", f"s.{k}", date) for k, date in keys)
+    )
+
+
+# Schreibt über eine temporäre Staging-Tabelle und ein einziges UPDATE ... JOIN
+def _update_via_staging(connection, engine, table, records, key_columns, value_columns, batch_size, report,
+                        date_columns=()):
+    dialect = engine.dialect.name
+    columns = key_columns + value_columns
+    staging = _quote(engine, f'{table}_staging')
+    target = _quote(engine, table)
+    quoted = [_quote(engine, c) for c in columns]
+
+    # Temporäre Tabelle mit den Spaltentypen der Zieltabelle anlegen
+    # (TEMPORARY löst in MySQL keinen impliziten Commit aus)
+    drop_sql = 'DROP TEMPORARY TABLE IF EXISTS' if dialect in JOIN_DIALECTS else 'DROP TABLE IF EXISTS'
+    connection.execute(text(f"{drop_sql} {staging}"))
+    connection.execute(text(
+        f"CREATE TEMPORARY TABLE {staging} AS SELECT {', '.join(quoted)} FROM {target} WHERE 1 = 0"
+    ))
+    report.statements += 2
+
+    started = time.perf_counter()
+    insert_sql = f"INSERT INTO {staging} ({', '.join(quoted)}) VALUES ({', '.join(_placeholders(engine, len(columns)))})"
+    for batch in _batches(records, batch_size):
+        connection.exec_driver_sql(insert_sql, batch)
+        report.statements += 1
+    report.stages['staging'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    update_sql = staging_update_sql(engine, table, f'{table}_staging', key_columns, value_columns)
+    report.affected = connection.execute(text(update_sql)).rowcount
+    report.statements += 1
+    if date_columns and report.affected < len(records):
+        # Nicht alle Schlüssel gefunden: Datumswerte evtl. in anderem Textformat
+        # gespeichert, erneut mit normalisiertem Vergleich (trifft auch die übrigen Zeilen)
+        update_sql = staging_update_sql(engine, table, f'{table}_staging', key_columns, value_columns, date_columns)
+        report.affected = connection.execute(text(update_sql)).rowcount
+        report.statements += 1
+    report.stages['update'] = time.perf_counter() - started
+
+    connection.execute(text(f"{drop_sql} {staging}"))
+    report.statements += 1
+
+
+# Schreibt mit gebündeltem executemany (ein UPDATE pro Zeile, aber batchweise gesendet)
+def _update_via_executemany(connection, engine, table, records, key_columns, value_columns, batch_size, report,
+                            date_columns=()):
+    # Parameter in der Reihenfolge der Platzhalter: erst die Werte, dann die Schlüssel
+    placeholders = _placeholders(engine, len(value_columns) + len(key_columns))
+    update_sql = lambda dates: (
+        f"UPDATE {_quote(engine, table)} SET "
+        + ', '.join(f"{_quote(engine, c)} = {p}" for c, p in zip(value_columns, placeholders))
+        + " WHERE "
+        + ' AND '.join(_key_equals(engine, _quote(engine, c), p, c in dates)
+                       for c, p in zip(key_columns, placeholders[len(value_columns):]))
+    )
+    n_keys = len(key_columns)
+    started = time.perf_counter()
+    for batch in _batches(records, batch_size):
+        params = [row[n_keys:] + row[:n_keys] for row in batch]
+        affected = max(connection.exec_driver_sql(update_sql(()), params).rowcount, 0)
+        report.statements += 1
+        if date_columns and affected < len(batch):
+            # wie in _update_via_staging: Batch erneut mit normalisiertem Datumsvergleich
+            affected = max(connection.exec_driver_sql(update_sql(date_columns), params).rowcount, 0)
+            report.statements += 1
+        report.affected += affected
+    report.stages['update'] = time.perf_counter() - started
+
+
+# Funktion zum Zurückschreiben eines Ergebnis-DataFrames in die Datenbank.
+# Die Zeilen werden über die Schlüsselspalten (z.B. `Key Date`, `Business ID`)
+# zugeordnet. method: 'auto' (Staging + UPDATE JOIN, sonst executemany),
+# 'staging' oder 'executemany'. Mit current (gespeicherte Werte, siehe
+# changed_rows) werden nur abweichende Zeilen gesendet; dry_run schreibt nichts
+# und berichtet nur, was sich ändern würde.
+def bulk_update(engine, df, key_columns, value_columns, table='ldp', method='auto', batch_size=10000,
+                current=None, dry_run=False, rtol=DIFF_RTOL, atol=DIFF_ATOL):
+    key_columns = list(key_columns)
+    value_columns = list(value_columns)
+    report = WriteReport(table=table, columns=value_columns, rows=len(df))
+    started = time.perf_counter()
+    if current is not None and not df.empty:
+        changed, report.changes, report.sample = changed_rows(
+            df, current, key_columns, value_columns, rtol, atol, DIFF_SAMPLE_ROWS if dry_run else 0)
+        report.skipped = int((~changed).sum())
+        report.stages['diff'] = time.perf_counter() - started
+        df = df[changed]
+    if dry_run:
+        report.method = 'dry-run'
+        report.seconds = time.perf_counter() - started
+        return report
+    if df.empty:
+        report.method = 'none'
+        return report
+
+    records = _records(df, key_columns + value_columns)
+    # Datumsschlüssel, die SQLite als Text in wechselnden Formaten speichert (siehe _key_equals)
+    date_columns = ([c for c in key_columns if pd.api.types.is_datetime64_any_dtype(df[c])]
+                    if engine.dialect.name == 'sqlite' else [])
+    supports_staging = engine.dialect.name in JOIN_DIALECTS + FROM_DIALECTS
+    use_staging = method == 'staging' or (method == 'auto' and supports_staging)
+
+    with engine.connect() as connection:
+        if use_staging:
+            transaction = connection.begin()
+            try:
+                _update_via_staging(connection, engine, table, records, key_columns, value_columns, batch_size, report,
+                                    date_columns)
+                transaction.commit()
+                report.method = 'staging'
+            except DBAPIError as e:
+                transaction.rollback()
+                if method == 'staging':
+                    raise
+                # z.B. fehlende Rechte für temporäre Tabellen -> auf executemany ausweichen
+                print(f"Staging nicht möglich, weiche auf executemany aus: {e}")
+                report.statements = 0
+                report.affected = 0
+                report.stages = {}
+                use_staging = False
+
+        if not use_staging:
+            transaction = connection.begin()
+            try:
+                _update_via_executemany(connection, engine, table, records, key_columns, value_columns, batch_size,
+                                        report, date_columns)
+                transaction.commit()
+                report.method = 'executemany'
+            except Exception:
+                transaction.rollback()
+                raise
+
+    report.seconds = time.perf_counter() - started
+    return report
+
+
+# SQL für ein zeilenweises Upsert. Unveränderte Zeilen werden nicht neu
+# geschrieben (MySQL meldet sie mit 0 betroffenen Zeilen, SQLite/PostgreSQL
+# überspringen sie über die WHERE-Bedingung des DO UPDATE).
+def _upsert_sql(engine, table, key_columns, value_columns):
+    dialect = engine.dialect.name
+    target = _quote(engine, table)
+    columns = [_quote(engine, c) for c in key_columns + value_columns]
+    values = [_quote(engine, c) for c in value_columns]
+    insert_sql = f"INSERT INTO {target} ({', '.join(columns)}) VALUES ({', '.join(_placeholders(engine, len(columns)))})"
+    if dialect in JOIN_DIALECTS:
+        return insert_sql + " ON DUPLICATE KEY UPDATE " + ', '.join(f"{v} = VALUES({v})" for v in values)
+    if dialect in FROM_DIALECTS:
+        distinct = 'IS NOT' if dialect == 'sqlite' else 'IS DISTINCT FROM'
+        return (insert_sql + f" ON CONFLICT ({', '.join(_quote(engine, c) for c in key_columns)}) DO UPDATE SET "
+                + ', '.join(f"{v} = excluded.{v}" for v in values)
+                + " WHERE " + ' OR '.join(f"{target}.{v} {distinct} excluded.{v}" for v in values))
+    raise ValueError(f"Upsert wird für den Dialekt '{dialect}' nicht unterstützt.")
+
+
+# Schlüssel der Zeilen in scope, die in df fehlen. Verglichen wird als Text bzw.
+# Zeitpunkt; zurück kommen die Rohwerte des Treibers, damit das DELETE genau diese
+# Zeilen trifft (SQLite speichert DATETIME als Text).
+def _missing_keys(connection, engine, df, key_columns, table, scope):
+    q = lambda name: _quote(engine, name)
+    conditions, params = [], []
+    for column, values in scope.values.items():
+        values = [str(value) for value in values]
+        if not values:
+            return []
+        conditions.append(f"{q(column)} IN ({', '.join('{}' for _ in values)})")
+        params.extend(values)
+    if scope.range is not None:
+        column, after, upto = scope.range
+        if after is not None:
+            conditions.append(f"{q(column)} > {{}}")
+            params.append(after)
+        if upto is not None:
+            conditions.append(f"{q(column)} <= {{}}")
+            params.append(upto)
+    sql = f"SELECT {', '.join(q(c) for c in key_columns)} FROM {q(table)}"
+    if conditions:
+        sql += " WHERE " + ' AND '.join(conditions).format(*_placeholders(engine, len(params)))
+    rows = connection.exec_driver_sql(sql, tuple(params)).fetchall()
+    if not rows:
+        return []
+    existing = pd.DataFrame([tuple(row) for row in rows], columns=key_columns)
+    new = df[key_columns]
+    if len(new):
+        left, right = {}, {}
+        for column in key_columns:
+            if pd.api.types.is_datetime64_any_dtype(new[column]):
+                left[column], right[column] = pd.to_datetime(existing[column]), new[column]
+            else:
+                left[column], right[column] = existing[column].astype(str), new[column].astype(str)
+        found = pd.MultiIndex.from_frame(pd.DataFrame(left)).isin(pd.MultiIndex.from_frame(pd.DataFrame(right)))
+    else:
+        found = np.zeros(len(existing), dtype=bool)
+    return [tuple(row) for row, keep in zip(rows, found) if not keep]
+
+
+def _delete_missing(connection, engine, df, key_columns, table, scope, batch_size, report):
+    missing = _missing_keys(connection, engine, df, key_columns, table, scope)
+    if not missing:
+        return
+    q = lambda name: _quote(engine, name)
+    delete_sql = (f"DELETE FROM {q(table)} WHERE "
+                  + ' AND '.join(f"{q(c)} = {p}" for c, p in zip(key_columns, _placeholders(engine, len(key_columns)))))
+    for batch in _batches(missing, batch_size):
+        connection.exec_driver_sql(delete_sql, batch)
+        report.statements += 1
+    report.deleted = len(missing)
+
+
+# Fügt neue Zeilen ein und aktualisiert vorhandene (gleiche Schlüsselspalten).
+# Die Zieltabelle braucht einen PRIMARY KEY oder UNIQUE-Index auf key_columns.
+# Mit scope (DeleteScope) werden vorher in derselben Transaktion die Zeilen des
+# Bereichs gelöscht, die in df fehlen (z.B. Business IDs ohne gültige Regression).
+def bulk_upsert(engine, df, key_columns, value_columns, table, batch_size=10000, scope=None):
+    key_columns = list(key_columns)
+    value_columns = list(value_columns)
+    report = WriteReport(table=table, columns=value_columns, rows=len(df), method='upsert')
+    if df.empty and scope is None:
+        report.method = 'none'
+        return report
+
+    started = time.perf_counter()
+    records = _records(df, key_columns + value_columns)
+    upsert_sql = _upsert_sql(engine, table, key_columns, value_columns)
+    with engine.begin() as connection:
+        if scope is not None:
+            _delete_missing(connection, engine, df, key_columns, table, scope, batch_size, report)
+            report.stages['delete'] = time.perf_counter() - started
+        for batch in _batches(records, batch_size):
+            result = connection.exec_driver_sql(upsert_sql, batch)
+            report.affected += max(result.rowcount, 0)
+            report.statements += 1
+    report.seconds = time.perf_counter() - started
+    report.stages['upsert'] = report.seconds - report.stages.get('delete', 0.0)
+    return report
@@ -0,0 +1,52 @@
+import pytest
+
+from tci.synthetic import synthetic_sqlite
+
+
+# Synthetische ldp-Tabelle in einer SQLite-Datei je Test (tci.synthetic), mit
+# Lücken (nan_ratio) und unterschiedlich langen Zeitreihen (skew)
+@pytest.fixture
+def make_ldp(tmp_path):
+    engines = []
+
+    def make(table='ldp', n_ids=200, quarters=12, nan_ratio=0.1, skew=0.5, seed=0, name='ldp.db'):
+        engine = synthetic_sqlite(tmp_path / name, table, n_ids=n_ids, quarters=quarters, nan_ratio=nan_ratio,
+                                  skew=skew, seed=seed)
+        engines.append(engine)
+        return engine
+
+    yield make
+    for engine in engines:
+        engine.dispose()
+
+
+@pytest.fixture
+def ldp_engine(make_ldp):
+    return make_ldp()
+
+
+# Vergleicht die in die Tabelle geschriebenen Spalten mit erwarteten Werten
+# (Schlüssel + Spalten; Werte je Business ID werden auf die Zeilen verteilt)
+@pytest.fixture
+def assert_written():
+    import numpy as np
+    import pandas as pd
+
+    from tci.loader import LDP_COLUMNS, load_ldp
+    from tci.metrics import KEY_COLUMNS
+
+    def check(engine, expected, columns, table='ldp', rtol=1e-7, atol=1e-9):
+        stored = load_ldp(engine, table, columns=LDP_COLUMNS + list(columns))
+        stored = stored[stored['Business ID'].notna()]
+        stored['Business ID'] = stored['Business ID'].astype(str)
+        expected = expected.assign(**{'Business ID': expected['Business ID'].astype(str)})
+        keys = [key for key in KEY_COLUMNS if key in expected.columns]
+        merged = stored.merge(expected[keys + list(columns)], on=keys, how='left', suffixes=('', ' (erwartet)'))
+        assert len(merged) == len(stored)
+        for column in columns:
+            a = pd.to_numeric(merged[column], errors='coerce').to_numpy(dtype=float)
+            b = pd.to_numeric(merged[f'{column} (erwartet)'], errors='coerce').to_numpy(dtype=float)
+            bad = ~np.isclose(a, b, rtol=rtol, atol=atol, equal_nan=True)
+            assert not bad.any(), f"{column}: {int(bad.sum())} abweichende Zeilen"
+
+    return check
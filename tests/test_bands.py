@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from tci.bands import band_column, sigma_band_flags
+from tci.loader import load_ldp
+from tci.metrics import LdpFrame
+
+
+# Zeilenweise Berechnung wie im ursprünglichen 2STD_Name.py (je Zeile Filter über die ganze Tabelle)
+def rowwise_flags(df, k):
+    def within(row):
+        group = df[df['Business ID'] == row['Business ID']]['Value']
+        mean, std_dev = group.mean(), group.std()
+        return bool(mean - k * std_dev <= row['Value'] <= mean + k * std_dev)
+
+    return df.apply(within, axis=1)
+
+
+@pytest.mark.parametrize('thresholds', [(2,), (1, 2, 3), (0.5, 2.5)])
+def test_sigma_bands_match_rowwise_apply(make_ldp, thresholds):
+    df = load_ldp(make_ldp(n_ids=60))
+    df = df[df['Business ID'].notna()].reset_index(drop=True)
+    df['Business ID'] = df['Business ID'].astype(str)
+
+    flags = sigma_band_flags(df['Value'], df['Business ID'], thresholds=thresholds)
+    assert list(flags.columns) == [band_column(k) for k in thresholds]
+    for k in thresholds:
+        expected = rowwise_flags(df, k)
+        assert flags[band_column(k)].tolist() == expected.tolist()
+
+
+def test_within_range_matches_filled_bounds(ldp_engine):
+    frame = LdpFrame(load_ldp(ldp_engine))
+    df = frame.df.assign(Value=frame.df['Value'].fillna(0))
+    mean = df.groupby('Business ID', observed=True)['Value'].transform('mean')
+    std = df.groupby('Business ID', observed=True)['Value'].transform('std')
+    expected = (df['Value'] >= mean - 2 * std) & (df['Value'] <= mean + 2 * std)
+
+    np.testing.assert_array_equal(frame.calculate_within_range().to_numpy(), expected.to_numpy())
+
+
+def test_int8_flags_and_single_row_groups():
+    values = pd.Series([1.0, 2.0, 3.0, 10.0, np.nan])
+    groups = ['a', 'a', 'a', 'b', 'a']
+    flags = sigma_band_flags(values, groups, thresholds=[1], dtype='int8')
+
+    assert flags[band_column(1)].dtype == np.int8
+    # Gruppe 'b' hat keine Std, NaN-Werte liegen in keinem Band
+    assert flags[band_column(1)].tolist() == [1, 1, 1, 0, 0]
@@ -0,0 +1,63 @@
+import pandas as pd
+from sqlalchemy import text
+
+from tci.cache import load_cached
+from tci.loader import load_ldp
+
+
+def sorted_frame(df):
+    df = df[df['Business ID'].notna()].assign(**{'Business ID': lambda d: d['Business ID'].astype(str),
+                                                 'Key Date': lambda d: d['Key Date'].astype('datetime64[ns]')})
+    return df.sort_values(['Business ID', 'Key Date']).reset_index(drop=True)
+
+
+def assert_cache_matches_table(engine, cache_dir):
+    cached = sorted_frame(load_cached(engine, cache_dir=str(cache_dir)))
+    direct = sorted_frame(load_ldp(engine))
+    pd.testing.assert_frame_equal(cached, direct)
+
+
+# Geänderte Werte an Ort und Stelle: gleiche Zeilenzahl, gleiche Business IDs und
+# gleiche Wertesumme der Partition
+def test_in_place_update_is_detected(ldp_engine, tmp_path):
+    assert_cache_matches_table(ldp_engine, tmp_path)
+    with ldp_engine.begin() as connection:
+        key_date, a, b = connection.execute(text(
+            "SELECT `Key Date`, MIN(`Business ID`), MAX(`Business ID`) FROM ldp WHERE `Value` IS NOT NULL "
+            "GROUP BY `Key Date` HAVING COUNT(`Value`) > 1 LIMIT 1")).one()
+        for business_id, delta in ((a, 1.0), (b, -1.0)):
+            connection.execute(text("UPDATE ldp SET `Value` = `Value` + :delta "
+                                    "WHERE `Key Date` = :key_date AND `Business ID` = :id"),
+                               {'delta': delta, 'key_date': key_date, 'id': business_id})
+    assert_cache_matches_table(ldp_engine, tmp_path)
+
+
+# Zwei Business IDs gleicher Länge tauschen ihre Werte innerhalb eines Key Date
+def test_swapped_values_are_detected(ldp_engine, tmp_path):
+    assert_cache_matches_table(ldp_engine, tmp_path)
+    with ldp_engine.begin() as connection:
+        key_date = connection.execute(text(
+            "SELECT `Key Date` FROM ldp WHERE `Value` IS NOT NULL GROUP BY `Key Date` "
+            "HAVING COUNT(DISTINCT `Value`) > 2 LIMIT 1")).scalar_one()
+        rows = connection.execute(text(
+            "SELECT `Business ID`, `Value` FROM ldp WHERE `Key Date` = :key_date AND `Value` IS NOT NULL "
+            "AND `Business ID` > (SELECT MIN(`Business ID`) FROM ldp WHERE `Key Date` = :key_date) "
+            "ORDER BY `Business ID` LIMIT 2"), {'key_date': key_date}).fetchall()
+        (a, value_a), (b, value_b) = rows
+        for business_id, value in ((a, value_b), (b, value_a)):
+            connection.execute(text("UPDATE ldp SET `Value` = :value "
+                                    "WHERE `Key Date` = :key_date AND `Business ID` = :id"),
+                               {'value': value, 'key_date': key_date, 'id': business_id})
+    assert_cache_matches_table(ldp_engine, tmp_path)
+
+
+# Key Dates mit Uhrzeit am selben Tag bleiben getrennte Partitionen
+def test_key_dates_with_time_keep_separate_partitions(ldp_engine, tmp_path):
+    with ldp_engine.begin() as connection:
+        connection.execute(text("INSERT INTO ldp (`Key Date`, `Business ID`, `Value`) VALUES "
+                                "('2030-01-01 00:00:00', 'X1', 1.0), ('2030-01-01 12:30:00', 'X1', 2.0), "
+                                "('2030-01-01 12:30:00', 'X2', 3.0)"))
+    assert_cache_matches_table(ldp_engine, tmp_path)
+    with ldp_engine.begin() as connection:
+        connection.execute(text("DELETE FROM ldp WHERE `Key Date` = '2030-01-01 12:30:00' AND `Business ID` = 'X2'"))
+    assert_cache_matches_table(ldp_engine, tmp_path)
@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+
+from tci.fit_cache import FitCache
+from tci.forecast import forecast_frame
+from tci.loader import load_ldp
+
+MODELS = ['poly1_h3', 'poly2_h3']
+
+
+def load(engine):
+    df = load_ldp(engine)
+    df = df[df['Business ID'].notna()].reset_index(drop=True)
+    df['Business ID'] = df['Business ID'].astype(str)
+    return df
+
+
+# Erster Lauf rechnet alles, zweiter Lauf trifft alles; eine geänderte Reihe
+# wird (nur sie) neu berechnet und liefert dasselbe wie ohne Cache
+def test_hits_and_invalidates_changed_series(ldp_engine, tmp_path):
+    df = load(ldp_engine)
+    n_ids = df['Business ID'].nunique()
+    expected = forecast_frame(df)
+
+    first = FitCache(tmp_path / 'fits')
+    pd.testing.assert_frame_equal(forecast_frame(df, cache=first), expected)
+    assert all(first.stats[model] == {'hits': 0, 'misses': n_ids, 'evicted': 0, 'entries': n_ids}
+               for model in MODELS)
+
+    second = FitCache(tmp_path / 'fits')
+    pd.testing.assert_frame_equal(forecast_frame(df, cache=second), expected)
+    assert all(second.stats[model]['hits'] == n_ids and second.stats[model]['misses'] == 0 for model in MODELS)
+
+    changed = df.copy()
+    row = changed.index[changed['Value'].notna()][0]
+    changed.loc[row, 'Value'] += 1.0
+    third = FitCache(tmp_path / 'fits')
+    pd.testing.assert_frame_equal(forecast_frame(changed, cache=third), forecast_frame(changed))
+    assert all(third.stats[model]['hits'] == n_ids - 1 and third.stats[model]['misses'] == 1 for model in MODELS)
+    assert all(third.stats[model]['entries'] == n_ids + 1 for model in MODELS)
+
+
+# Über max_entries hinaus werden die am längsten nicht verwendeten Einträge verdrängt
+def test_evicts_least_recently_used(tmp_path):
+    cache = FitCache(tmp_path / 'fits', max_entries=2)
+    compute = lambda miss: np.arange(miss.sum(), dtype=float)[:, None]
+    cache.get_or_compute('m', np.array([1, 2], dtype=np.uint64), 1, compute)
+    cache.get_or_compute('m', np.array([2, 3], dtype=np.uint64), 1, compute)
+    assert cache.stats['m'] == {'hits': 1, 'misses': 3, 'evicted': 1, 'entries': 2}
+
+    cache.get_or_compute('m', np.array([2, 3], dtype=np.uint64), 1, compute)
+    cache.get_or_compute('m', np.array([1], dtype=np.uint64), 1, compute)
+    assert cache.stats['m']['hits'] == 3
+    assert cache.stats['m']['misses'] == 4
@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from tci.forecast import TIME_COLUMN, degree_columns, forecast_frame, polynomial_fit_by_codes
+from tci.loader import load_ldp
+
+
+@pytest.mark.parametrize('degree', [1, 2, 3])
+def test_polynomial_fit_matches_polyfit(degree):
+    rng = np.random.default_rng(degree)
+    # Lückenhafte Zeitachsen: je Gruppe eine zufällige Auswahl aus 0..19, mindestens degree + 1 Punkte
+    xs = [np.sort(rng.choice(20, size=rng.integers(degree + 1, 16), replace=False)) for _ in range(200)]
+    codes = np.concatenate([np.full(len(x), code) for code, x in enumerate(xs)])
+    x = np.concatenate(xs).astype(float)
+    y = 3.0 - 0.5 * x + 0.02 * x ** 2 + rng.normal(0, 1, len(x))
+
+    coef = polynomial_fit_by_codes(x, y, codes, len(xs), degree)['coef']
+    for code in range(len(xs)):
+        expected = np.polyfit(x[codes == code], y[codes == code], degree)[::-1]
+        np.testing.assert_allclose(coef[code], expected, rtol=1e-6, atol=1e-8)
+
+
+# Vorhersagen wie in den ursprünglichen Predictions-Skripten: je Business ID
+# x = 0..n-1 über alle Zeilen, Fit über die Zeilen mit Wert, R² in Prozent
+def test_forecast_frame_matches_per_group_polyfit(ldp_engine):
+    df = load_ldp(ldp_engine)
+    df['Business ID'] = df['Business ID'].astype(str)
+    result = forecast_frame(df, degrees=(1, 2), horizon=3)
+
+    for business_id, group in df.sort_values('Key Date', kind='mergesort').groupby('Business ID'):
+        rows = result[(result['Business ID'] == business_id) & (result[TIME_COLUMN] < len(group))]
+        x = np.arange(len(group))
+        y = group['Value'].to_numpy(dtype=float)
+        clean = ~np.isnan(y)
+        for degree in (1, 2):
+            if clean.sum() <= degree:
+                continue
+            predicted_column, r2_column = degree_columns(degree)
+            coef = np.polyfit(x[clean], y[clean], degree)
+            predicted = np.polyval(coef, x)
+            ss_res = ((y[clean] - predicted[clean]) ** 2).sum()
+            ss_tot = ((y[clean] - y[clean].mean()) ** 2).sum()
+            np.testing.assert_allclose(rows[predicted_column].to_numpy(), predicted, rtol=1e-6, atol=1e-6)
+            if ss_tot > 0:
+                assert rows[r2_column].iloc[0] == pytest.approx((1 - ss_res / ss_tot) * 100, rel=1e-6, abs=1e-6)
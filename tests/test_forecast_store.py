@@ -0,0 +1,57 @@
+import pandas as pd
+from sqlalchemy import text
+
+from tci.forecast_store import forecast_tables
+from tci.jobs import run_jobs
+from tci.overlap import run_overlapped
+
+
+def read_table(engine, table):
+    return pd.read_sql_query(text(f"SELECT * FROM {table}"), engine)
+
+
+def test_sources_use_separate_tables(make_ldp):
+    engine = make_ldp('ldp', seed=1)
+    make_ldp('backup', seed=2)
+    run_jobs(engine, ['linear'])
+    ldp_forecasts = read_table(engine, forecast_tables('ldp')[0])
+    run_jobs(engine, ['quadratic'], table='backup')
+
+    pd.testing.assert_frame_equal(read_table(engine, forecast_tables('ldp')[0]), ldp_forecasts)
+    backup_models = read_table(engine, forecast_tables('backup')[1])
+    assert set(backup_models['model']) == {'linear', 'quadratisch'}
+    assert set(read_table(engine, forecast_tables('ldp')[1])['model']) == {'linear'}
+
+
+def _drop_business_ids(engine, business_ids):
+    with engine.begin() as connection:
+        for business_id in business_ids:
+            connection.execute(text("DELETE FROM ldp WHERE `Business ID` = :id"), {'id': business_id})
+
+
+def test_rerun_deletes_vanished_business_ids(ldp_engine):
+    run_jobs(ldp_engine, ['linear', 'best_fit'])
+    models = read_table(ldp_engine, 'forecast_model')
+    gone = sorted(models['Business ID'].unique())[:3]
+    _drop_business_ids(ldp_engine, gone)
+
+    run_jobs(ldp_engine, ['linear'])
+    forecasts, models = read_table(ldp_engine, 'forecast'), read_table(ldp_engine, 'forecast_model')
+    linear = models['model'] == 'linear'
+    assert not models.loc[linear, 'Business ID'].isin(gone).any()
+    assert not forecasts.loc[forecasts['model'] == 'linear', 'Business ID'].isin(gone).any()
+    # Modelle anderer Jobs bleiben unberührt
+    assert models.loc[models['model'] == 'auto', 'Business ID'].isin(gone).sum() == len(gone)
+
+
+def test_overlap_blocks_delete_only_their_range(ldp_engine):
+    run_jobs(ldp_engine, ['linear'])
+    expected = read_table(ldp_engine, 'forecast_model')
+    ids = sorted(expected['Business ID'].unique())
+    gone = [ids[0], ids[len(ids) // 2], ids[-1]]
+    _drop_business_ids(ldp_engine, gone)
+
+    run_overlapped(ldp_engine, ['linear'], batch_ids=25)
+    models = read_table(ldp_engine, 'forecast_model')
+    assert sorted(models['Business ID']) == [i for i in ids if i not in gone]
+    assert not read_table(ldp_engine, 'forecast')['Business ID'].isin(gone).any()
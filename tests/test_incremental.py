@@ -0,0 +1,85 @@
+import pandas as pd
+import pytest
+
+from tci.engine import make_engine
+from tci.incremental import INCREMENTAL_METRICS, run_incremental, verify_incremental
+from tci.loader import load_ldp
+from tci.metrics import METRICS, compute_metrics
+from tci.synthetic import generate_ldp, load_table
+
+COLUMNS = [METRICS[name][0] for name in INCREMENTAL_METRICS]
+
+
+def append_rows(engine, df, table='ldp'):
+    df = df.copy()
+    df['Key Date'] = df['Key Date'].dt.strftime('%Y-%m-%d %H:%M:%S')
+    df['Business ID'] = df['Business ID'].astype(str)
+    df.to_sql(table, engine, if_exists='append', index=False)
+
+
+def split_engine(tmp_path, cutoff='2016-12-31'):
+    df = generate_ldp(n_ids=150, quarters=12, nan_ratio=0.1, skew=0.5, seed=1)
+    engine = make_engine(url=f'sqlite:///{tmp_path / "ldp.db"}')
+    later = df['Key Date'] > pd.Timestamp(cutoff)
+    load_table(engine, df[~later])
+    return engine, df[later]
+
+
+def full_rebuild(engine):
+    return compute_metrics(load_ldp(engine, columns=['Key Date', 'Business ID', 'Value']), list(INCREMENTAL_METRICS))
+
+
+# Erst nur 'change', dann nur 'volatility' nach neuen Quartalen: beide Läufe
+# schreiben alle Spalten, das Ergebnis entspricht dem vollständigen Neuaufbau
+def test_metric_subsets_match_full_rebuild(tmp_path, assert_written):
+    engine, later = split_engine(tmp_path)
+    run_incremental(engine, ['change'])
+    append_rows(engine, later)
+    run_incremental(engine, ['volatility'])
+
+    assert_written(engine, full_rebuild(engine), COLUMNS)
+    assert verify_incremental(engine)
+
+
+def test_delta_runs_match_full_rebuild(tmp_path, assert_written):
+    engine, later = split_engine(tmp_path, cutoff='2016-06-30')
+    run_incremental(engine)
+    for key_date, rows in later.groupby('Key Date'):
+        append_rows(engine, rows)
+        run_incremental(engine)
+    incremental = load_ldp(engine, columns=['Key Date', 'Business ID', 'Value'] + COLUMNS)
+
+    run_incremental(engine, full_rebuild=True)
+    assert_written(engine, incremental, COLUMNS)
+    assert_written(engine, full_rebuild(engine), COLUMNS)
+    assert verify_incremental(engine)
+
+
+def test_verify_detects_stale_columns(tmp_path):
+    engine, later = split_engine(tmp_path)
+    run_incremental(engine)
+    append_rows(engine, later)
+    run_incremental(engine)
+    with engine.begin() as connection:
+        connection.exec_driver_sql("UPDATE ldp SET Volatility = NULL WHERE rowid % 7 = 0")
+    assert not verify_incremental(engine)
+
+
+# Scheitert das Schreiben beim Neuaufbau, bleiben alter Zustand und Watermark erhalten
+def test_failed_full_rebuild_keeps_state(ldp_engine, monkeypatch):
+    from tci.incremental import read_state
+
+    run_incremental(ldp_engine)
+    before = read_state(ldp_engine)
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("Schreibfehler")
+
+    monkeypatch.setattr(pd.DataFrame, 'to_sql', fail)
+    with pytest.raises(RuntimeError):
+        run_incremental(ldp_engine, full_rebuild=True)
+    monkeypatch.undo()
+
+    after = read_state(ldp_engine)
+    pd.testing.assert_frame_equal(after.sort_values('Business ID').reset_index(drop=True),
+                                  before.sort_values('Business ID').reset_index(drop=True))
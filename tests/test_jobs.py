@@ -0,0 +1,79 @@
+import pandas as pd
+from sqlalchemy import inspect, text
+
+import tci.cache
+from tci.cache import CACHE_DIR_ENV
+from tci.jobs import compute_rows, run_jobs
+from tci.loader import load_ldp
+
+JOBS = ['change', 'volatility', 'within_range', 'steigung']
+
+
+# Standardlauf (changed_only) liest ldp über den Snapshot-Cache, die gespeicherten
+# Kennzahlen getrennt, und überspringt beim zweiten Lauf alle unveränderten Zeilen
+def test_default_run_reads_through_cache(ldp_engine, tmp_path, monkeypatch, assert_written):
+    monkeypatch.setenv(CACHE_DIR_ENV, str(tmp_path / 'cache'))
+    calls = []
+    load_cached = tci.cache.load_cached
+    monkeypatch.setattr(tci.cache, 'load_cached',
+                        lambda *args, **kwargs: calls.append(args) or load_cached(*args, **kwargs))
+
+    first = run_jobs(ldp_engine, JOBS)['extra']['writes'][0]
+    second = run_jobs(ldp_engine, JOBS)['extra']['writes'][0]
+
+    assert len(calls) == 2
+    assert (tmp_path / 'cache' / 'ldp' / 'meta.json').exists()
+    assert first['affected'] > 0
+    assert second['affected'] == 0
+    assert second['skipped'] == second['rows']
+    columns = ['Change', 'Volatility', 'Within_Range', 'Steigung']
+    assert_written(ldp_engine, compute_rows(load_ldp(ldp_engine), JOBS), columns)
+
+
+# tci.pipeline läuft über run_jobs: gleiche Werte, zweiter Lauf schreibt nichts
+def test_pipeline_uses_job_runner(ldp_engine, assert_written):
+    from tci.metrics import METRICS, compute_metrics
+    from tci.pipeline import run_pipeline
+
+    run_pipeline(ldp_engine)
+    second = run_pipeline(ldp_engine)['extra']['writes'][0]
+
+    assert second['affected'] == 0
+    assert_written(ldp_engine, compute_metrics(load_ldp(ldp_engine)), [column for column, _ in METRICS.values()])
+
+
+def dump(engine):
+    tables = sorted(inspect(engine).get_table_names())
+    return tables, pd.read_sql_query(text("SELECT * FROM ldp ORDER BY `Business ID`, `Key Date`"), engine)
+
+
+# Probelauf schreibt nichts: weder Schema (neue Spalten) noch Werte noch
+# Vorhersagetabellen, berichtet aber die Zeilen, die sich ändern würden
+def test_dry_run_writes_nothing(ldp_engine):
+    tables, before = dump(ldp_engine)
+    write = run_jobs(ldp_engine, JOBS + ['linear'], dry_run=True)['extra']['writes'][0]
+
+    after_tables, after = dump(ldp_engine)
+    assert after_tables == tables
+    pd.testing.assert_frame_equal(after, before)
+    assert write['method'] == 'dry-run'
+    assert write['affected'] == 0
+    assert write['skipped'] == 0
+
+
+# Nach einem Lauf und einer Änderung an einer Business ID meldet der Probelauf
+# nur deren Zeilen als geändert und lässt die Tabelle unverändert
+def test_dry_run_reports_changed_rows_only(ldp_engine):
+    run_jobs(ldp_engine, JOBS)
+    with ldp_engine.begin() as connection:
+        business_id = connection.execute(text("SELECT MIN(`Business ID`) FROM ldp")).scalar()
+        n_rows = connection.execute(text("SELECT COUNT(*) FROM ldp WHERE `Business ID` = :id"),
+                                    {'id': business_id}).scalar()
+        connection.execute(text("UPDATE ldp SET `Value` = `Value` + 1000 WHERE `Business ID` = :id"),
+                           {'id': business_id})
+    _, before = dump(ldp_engine)
+    write = run_jobs(ldp_engine, JOBS, dry_run=True)['extra']['writes'][0]
+
+    pd.testing.assert_frame_equal(dump(ldp_engine)[1], before)
+    assert write['affected'] == 0
+    assert 0 < write['rows'] - write['skipped'] <= n_rows
@@ -0,0 +1,78 @@
+import json
+import threading
+from http.server import ThreadingHTTPServer
+from urllib.error import HTTPError
+from urllib.request import urlopen
+
+import pandas as pd
+import pytest
+from sqlalchemy import String, text
+
+from tci.jobs import run_jobs
+from tci.lookup import MAX_HORIZON, ForecastLookup, _handler
+
+
+@pytest.fixture
+def lookup(ldp_engine):
+    run_jobs(ldp_engine, ['linear'])
+    return ForecastLookup(ldp_engine)
+
+
+def test_case_insensitive_ids_map_back_to_request(ldp_engine, lookup):
+    models = pd.read_sql_query(text("SELECT * FROM forecast_model"), ldp_engine)
+    # Modelltabelle mit Collation ohne Groß-/Kleinschreibung (wie utf8mb4_general_ci)
+    models.to_sql('forecast_model_ci', ldp_engine, index=False, dtype={'Business ID': String(collation='NOCASE')})
+    business_id = models['Business ID'].iloc[0]
+
+    result = ForecastLookup(ldp_engine, table='forecast_model_ci').get_many([business_id.lower()])
+    assert result[business_id.lower()] == lookup.get(business_id)
+    assert result[business_id.lower()]
+
+
+# Groß-/Kleinschreibung unterscheidende Tabelle (SQLite BINARY): 'B000' und 'b000'
+# sind verschiedene Business IDs und behalten jeweils ihre eigenen Modelle
+def test_case_sensitive_ids_keep_their_own_rows(ldp_engine, lookup):
+    models = pd.read_sql_query(text("SELECT * FROM forecast_model"), ldp_engine)
+    models = models[models['Business ID'].isin(['B000', 'B001'])].replace({'Business ID': {'B001': 'b000'}})
+    models.to_sql('forecast_model_cs', ldp_engine, index=False)
+
+    result = ForecastLookup(ldp_engine, table='forecast_model_cs').get_many(['B000', 'b000'])
+    assert result['B000'] == lookup.get('B000')
+    assert result['b000'] == lookup.get('B001')
+    assert result['B000'] != result['b000']
+
+
+@pytest.fixture
+def server(lookup):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _handler(lookup))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_port}'
+    server.shutdown()
+    server.server_close()
+
+
+def get(url):
+    try:
+        with urlopen(url) as response:
+            return response.status, json.loads(response.read())
+    except HTTPError as error:
+        return error.code, json.loads(error.read())
+
+
+def test_http_status_codes(server, lookup, monkeypatch):
+    business_id = 'B000'
+    assert get(f'{server}/forecast?ids={business_id}&horizon=x')[0] == 400
+    assert get(f'{server}/forecast')[0] == 400
+    assert get(f'{server}/unbekannt')[0] == 404
+    assert get(f'{server}/forecast/gibt-es-nicht')[0] == 404
+
+    status, payload = get(f'{server}/forecast/{business_id}?horizon=100000')
+    assert status == 200
+    assert len(payload[business_id]['linear']['forecast']) == MAX_HORIZON
+    status, payload = get(f'{server}/stats')
+    assert status == 200 and payload['cached'] >= 1
+
+    monkeypatch.setattr(lookup, 'get_many', lambda *args: 1 / 0)
+    status, payload = get(f'{server}/forecast/{business_id}')
+    assert status == 500 and 'ZeroDivisionError' in payload['error']
@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+from tci.jobs import run_jobs
+from tci.loader import LDP_COLUMNS, load_ldp
+from tci.overlap import run_overlapped
+
+JOBS = ['change', 'volatility', 'within_range', 'within_2std', 'steigung', 'rolling_volatility',
+        'linear', 'quadratic', 'best_fit']
+COLUMNS = ['Change', 'Volatility', 'Within_Range', 'Within_2Std_Range', 'Steigung',
+           'Volatility_4Q', 'Volatility_8Q', 'Volatility_12Q']
+
+
+def read_sorted(engine, table):
+    df = pd.read_sql_query(text(f"SELECT * FROM {table}"), engine)
+    keys = [column for column in df.columns if not pd.api.types.is_numeric_dtype(df[column])]
+    return df.sort_values(keys).reset_index(drop=True)
+
+
+# Blockweise überlappte Ausführung (viele kleine Blöcke) schreibt dieselben
+# Kennzahlen und Vorhersagen wie der gemeinsame Lauf über die ganze Tabelle
+def test_overlapped_matches_fused_run(make_ldp, assert_written):
+    fused, overlapped = make_ldp(name='fused.db'), make_ldp(name='overlapped.db')
+    run_jobs(fused, JOBS)
+    report = run_overlapped(overlapped, JOBS, batch_ids=37, depth=1)
+
+    assert report['extra']['batches'] == -(-200 // 37)
+    assert_written(overlapped, load_ldp(fused, columns=LDP_COLUMNS + COLUMNS), COLUMNS)
+    for table in ('forecast', 'forecast_model'):
+        a, b = read_sorted(overlapped, table), read_sorted(fused, table)
+        assert list(a.columns) == list(b.columns)
+        assert len(a) == len(b)
+        for column in a.columns:
+            if pd.api.types.is_numeric_dtype(a[column]):
+                assert np.allclose(a[column], b[column], equal_nan=True), column
+            else:
+                assert (a[column].astype(str) == b[column].astype(str)).all(), column
+
+    # Zweiter Lauf: alle Zeilen unverändert
+    writes = run_overlapped(overlapped, JOBS, batch_ids=37)['extra']['writes']
+    assert sum(w['affected'] for w in writes if w['table'] == 'ldp') == 0
@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from tci.jobs import JOBS, compute_rows, row_jobs
+from tci.loader import load_ldp
+from tci.metrics import LdpFrame
+from tci.panel import PanelFrame, dense_frame
+
+ROW_JOBS = row_jobs(list(JOBS))
+
+
+def assert_frames_close(panel, long):
+    assert list(panel.columns) == list(long.columns)
+    assert len(panel) == len(long)
+    for column in long.columns:
+        if pd.api.types.is_numeric_dtype(long[column]):
+            np.testing.assert_allclose(panel[column].to_numpy(dtype=float), long[column].to_numpy(dtype=float),
+                                       rtol=1e-9, atol=1e-9, equal_nan=True, err_msg=column)
+        else:
+            assert (panel[column].astype(str) == long[column].astype(str)).all(), column
+
+
+# Panel (lückenhaft bzw. vollständig belegt) liefert dieselben Zeilen wie das Langformat
+@pytest.mark.parametrize('nan_ratio, skew', [(0.1, 0.5), (0.0, 0.0)])
+def test_panel_matches_long_format(make_ldp, nan_ratio, skew):
+    df = load_ldp(make_ldp(nan_ratio=nan_ratio, skew=skew))
+    frame = dense_frame(df)
+
+    assert isinstance(frame, PanelFrame)
+    assert_frames_close(compute_rows(df, ROW_JOBS, panel=True), compute_rows(df, ROW_JOBS))
+
+
+# Doppelte (Business ID, Key Date) passen nicht in eine Zelle: Rückfall aufs Langformat
+def test_duplicate_cells_fall_back_to_long_format(ldp_engine):
+    df = load_ldp(ldp_engine)
+    df = pd.concat([df, df.iloc[:1]], ignore_index=True)
+    frame = dense_frame(df)
+
+    assert type(frame) is LdpFrame
+    assert_frames_close(compute_rows(df, ROW_JOBS, panel=True), compute_rows(df, ROW_JOBS))
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import text
+
+from tci.jobs import run_jobs
+from tci.loader import LDP_COLUMNS, load_ldp
+from tci.metrics import METRICS, LdpFrame, compute_metrics, prepare_frame
+from tci.parallel import run_parallel
+
+FORECASTS = ['linear', 'quadratic', 'best_fit']
+
+
+def read_sorted(engine, table):
+    df = pd.read_sql_query(text(f"SELECT * FROM {table}"), engine)
+    keys = [column for column in df.columns if not pd.api.types.is_numeric_dtype(df[column])]
+    return df.sort_values(keys).reset_index(drop=True)
+
+
+def add_null_ids(engine):
+    with engine.begin() as connection:
+        connection.execute(text("INSERT INTO ldp (`Key Date`, `Business ID`, `Value`) VALUES "
+                                "('2022-03-31 00:00:00', NULL, 5.0), ('2022-06-30 00:00:00', NULL, 7.0)"))
+
+
+@pytest.fixture
+def serial_and_parallel(make_ldp):
+    serial, parallel = make_ldp(name='serial.db'), make_ldp(name='parallel.db')
+    for engine in (serial, parallel):
+        add_null_ids(engine)
+    run_jobs(serial, list(METRICS) + FORECASTS)
+    return serial, parallel
+
+
+def assert_tables_equal(a, b):
+    assert list(a.columns) == list(b.columns)
+    assert len(a) == len(b)
+    for column in a.columns:
+        if not pd.api.types.is_numeric_dtype(a[column]):
+            assert (a[column].astype(str) == b[column].astype(str)).all(), column
+        else:
+            assert np.allclose(a[column], b[column], equal_nan=True), column
+
+
+def test_parallel_matches_serial(serial_and_parallel, assert_written):
+    serial, parallel = serial_and_parallel
+    run_parallel(parallel, list(METRICS), workers=2, forecasts=FORECASTS)
+
+    columns = [column for column, _ in METRICS.values()]
+    assert_written(parallel, load_ldp(serial, columns=LDP_COLUMNS + columns), columns)
+    for table in ('forecast', 'forecast_model'):
+        assert_tables_equal(read_sorted(parallel, table), read_sorted(serial, table))
+
+
+# Vorbereitete Blöcke (tci.streaming) mit NULL-IDs: gleiche Kennzahlen wie ohne
+def test_prepared_frame_drops_null_business_ids(ldp_engine):
+    df = prepare_frame(load_ldp(ldp_engine))
+    df['Business ID'] = df['Business ID'].astype(object)
+    nulls = pd.DataFrame({'Key Date': df['Key Date'].iloc[:2], 'Business ID': [None, None], 'Value': [5.0, 7.0]})
+    with_nulls = pd.concat([nulls, df], ignore_index=True)
+
+    expected = compute_metrics(LdpFrame(df, prepared=True))
+    pd.testing.assert_frame_equal(compute_metrics(LdpFrame(with_nulls, prepared=True)), expected)
@@ -0,0 +1,15 @@
+from tci.jobs import compute_rows, row_columns
+from tci.loader import load_ldp
+from tci.pushdown import PUSHDOWN_JOBS, run_pushdown, verify_pushdown
+
+
+def test_pushdown_select_matches_pandas(ldp_engine):
+    mismatches = verify_pushdown(ldp_engine, list(PUSHDOWN_JOBS))
+    assert mismatches == {name: 0 for name in mismatches}
+
+
+def test_pushdown_writes_pandas_results(ldp_engine, assert_written):
+    names = list(PUSHDOWN_JOBS)
+    expected = compute_rows(load_ldp(ldp_engine), names)
+    run_pushdown(ldp_engine, names)
+    assert_written(ldp_engine, expected, row_columns(names))
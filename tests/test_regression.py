@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import LinearRegression
+
+from tci.jobs import compute_rows
+from tci.loader import load_ldp
+from tci.regression import linear_fit_by_codes
+
+REFERENCE_DATE = pd.Timestamp('2022-01-01')
+
+
+# Steigung je Business ID wie in den ursprünglichen Skripten: ein
+# LinearRegression-Modell je Gruppe über Days (seit 2022-01-01)
+def sklearn_slopes(df, target):
+    df = df.sort_values(by=['Key Date']).copy()
+    df['Days'] = (pd.to_datetime(df['Key Date']) - REFERENCE_DATE).dt.days
+    if target == 'Change':
+        df['Change'] = df.groupby('Business ID')['Value'].diff()
+    df = df.dropna(subset=[target])
+    slopes = {}
+    for business_id, group in df.groupby('Business ID', observed=True):
+        model = LinearRegression().fit(group['Days'].to_numpy().reshape(-1, 1), group[target].to_numpy())
+        slopes[business_id] = model.coef_[0]
+    return pd.Series(slopes, dtype=float)
+
+
+def test_linear_fit_matches_sklearn():
+    rng = np.random.default_rng(3)
+    sizes = rng.integers(3, 20, 300)
+    codes = np.repeat(np.arange(len(sizes)), sizes)
+    x = rng.normal(0, 500, len(codes)) + 1000
+    y = 2.5 * x + rng.normal(0, 100, len(codes))
+
+    fit = linear_fit_by_codes(x, y, codes, len(sizes))
+    for code in range(len(sizes)):
+        X, Y = x[codes == code].reshape(-1, 1), y[codes == code]
+        model = LinearRegression().fit(X, Y)
+        assert fit['slope'][code] == pytest.approx(model.coef_[0], rel=1e-9, abs=1e-12)
+        assert fit['intercept'][code] == pytest.approx(model.intercept_, rel=1e-9, abs=1e-9)
+        assert fit['r2'][code] == pytest.approx(model.score(X, Y), rel=1e-9, abs=1e-12)
+
+
+@pytest.mark.parametrize('job, column, target', [('steigung', 'Steigung', 'Value'),
+                                                 ('steigung_trend', 'SteigungTrend', 'Change')])
+def test_steigung_matches_sklearn(ldp_engine, job, column, target):
+    df = load_ldp(ldp_engine)
+    result = compute_rows(df, [job]).set_index('Business ID')[column]
+    expected = sklearn_slopes(df.assign(**{'Business ID': df['Business ID'].astype(str)}), target)
+
+    result.index = result.index.astype(str)
+    result = result.reindex(expected.index)
+    np.testing.assert_allclose(result.to_numpy(), expected.to_numpy(), rtol=1e-7, atol=1e-9)
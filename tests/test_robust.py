@@ -0,0 +1,31 @@
+import pytest
+
+from tci.cache import CACHE_DIR_ENV
+from tci.robust import SKETCH_FILE, SketchStore, run_robust_incremental
+
+
+def test_sketches_are_kept_per_table(make_ldp, tmp_path, monkeypatch):
+    monkeypatch.setenv(CACHE_DIR_ENV, str(tmp_path / 'cache'))
+    engine = make_ldp('ldp', seed=1)
+    make_ldp('backup', seed=2)
+
+    ldp_store, _ = run_robust_incremental(engine)
+    backup_store, _ = run_robust_incremental(engine, table='backup')
+
+    assert ldp_store.path == str(tmp_path / 'cache' / SKETCH_FILE.format(table='ldp'))
+    assert backup_store.path == str(tmp_path / 'cache' / SKETCH_FILE.format(table='backup'))
+    # zweiter Lauf je Tabelle: Watermark der eigenen Tabelle, keine neuen Zeilen
+    assert run_robust_incremental(engine)[1] is None
+    assert SketchStore(ldp_store.path, 'ldp').watermark == ldp_store.watermark
+
+
+def test_sketch_file_of_other_table_is_rejected(make_ldp, tmp_path):
+    engine = make_ldp('ldp')
+    make_ldp('backup', seed=2)
+    path = str(tmp_path / 'sketches.npz')
+    run_robust_incremental(engine, path=path)
+
+    with pytest.raises(ValueError, match='Tabelle ldp'):
+        run_robust_incremental(engine, table='backup', path=path)
+    store, report = run_robust_incremental(engine, table='backup', path=path, full_rebuild=True)
+    assert store.table == 'backup' and report.rows > 0
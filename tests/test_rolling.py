@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+
+from tci.loader import load_ldp
+from tci.metrics import LdpFrame
+from tci.rolling import ROLLING_WINDOWS, rolling_mean_std, rolling_metrics, volatility_column
+
+
+# Erwartung: je Business ID auf ein lückenloses Quartalsraster gebracht und dort
+# mit pandas rolling über window Quartale gerechnet (fehlende Quartale sind NaN)
+def pandas_rolling_std(df, window):
+    expected = []
+    for _, group in df.groupby('Business ID', observed=True, sort=False):
+        series = group.set_index(group['Key Date'].dt.to_period('Q'))['Value'].fillna(0)
+        grid = pd.period_range(series.index.min(), series.index.max(), freq='Q')
+        rolled = series.reindex(grid).rolling(window, min_periods=window).std()
+        expected.append(rolled.loc[series.index].to_numpy())
+    return np.concatenate(expected)
+
+
+def test_rolling_windows_count_quarters(ldp_engine):
+    df = load_ldp(ldp_engine)
+    # Lücken: jede fünfte Zeile fehlt, das Quartal bleibt im Fenster leer
+    frame = LdpFrame(df.drop(index=df.index[::5]).reset_index(drop=True))
+
+    result = rolling_metrics(frame, bands=False)
+    for window in ROLLING_WINDOWS:
+        expected = pandas_rolling_std(frame.df, window)
+        actual = result[volatility_column(window)].to_numpy()
+        assert np.allclose(actual, expected, rtol=1e-9, atol=1e-9, equal_nan=True), window
+
+
+# Großes Niveau mit Trend (Werte um 1e9, Streuung ~1): die Fenster-Std darf weder
+# durch Auslöschung verloren gehen noch negativ/NaN werden; konstante Fenster bleiben 0
+def test_rolling_std_with_large_offset():
+    rng = np.random.default_rng(0)
+    t = np.arange(80, dtype=float)
+    trend = 1e9 + 1e6 * t + rng.normal(0, 1, len(t))
+    constant = np.full(len(t), 1e9 + 0.1)
+    values = np.concatenate([trend, constant, -trend])
+    codes = np.repeat(np.arange(3), len(t))
+
+    result = rolling_mean_std(values, codes)
+    for window, (mean, std) in result.items():
+        expected = pd.Series(values).groupby(codes).rolling(window).std().to_numpy()
+        assert np.allclose(std, expected, rtol=1e-6, atol=1e-6, equal_nan=True), window
+        assert (std[window - 1:len(t)] > 0.5).all()
+        assert (std[len(t) + window - 1:2 * len(t)] == 0).all()
+        assert np.allclose(mean, pd.Series(values).groupby(codes).rolling(window).mean().to_numpy(),
+                           rtol=1e-12, equal_nan=True)
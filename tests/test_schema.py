@@ -0,0 +1,20 @@
+from sqlalchemy import inspect, text
+
+from tci.schema import ensure_schema, get_schema
+
+
+# Ein anderer Prozess legt Spalte und Index an, nachdem das Schema gelesen wurde:
+# das fehlschlagende ALTER TABLE/CREATE INDEX (SQLite: OperationalError) ist kein Fehler
+def test_concurrently_added_column_and_index(ldp_engine, capsys):
+    schema = get_schema(ldp_engine)
+    schema.invalidate()
+    assert schema.missing_columns(['Change']) == ['Change']
+    assert not schema.has_key_index()
+    with ldp_engine.begin() as connection:
+        connection.execute(text("ALTER TABLE ldp ADD COLUMN `Change` FLOAT"))
+        connection.execute(text("CREATE INDEX idx_ldp_business_id_key_date ON ldp (`Business ID`, `Key Date`)"))
+
+    assert ensure_schema(ldp_engine, columns=['Change', 'Volatility']) == ['Volatility']
+    assert 'Fehler' not in capsys.readouterr().out
+    assert {'Change', 'Volatility'} <= {c['name'] for c in inspect(ldp_engine).get_columns('ldp')}
+    assert schema.has_key_index()
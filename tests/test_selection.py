@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from tci.selection import ADJUSTED_R2_TOLERANCE, masked_pinv, select_models, vandermonde
+
+
+# Reihen verschiedener Länge mit linearen, quadratischen und kubischen Verläufen und Lücken
+def synthetic_series(seed, n_groups=300):
+    rng = np.random.default_rng(seed)
+    sizes = rng.integers(2, 16, n_groups)
+    values = []
+    for size in sizes:
+        x = np.arange(size, dtype=float)
+        degree = rng.integers(1, 4)
+        y = np.polyval(rng.normal(0, 1, degree + 1), x / 4) * 10 + rng.normal(0, 0.5, size)
+        y[rng.random(size) < 0.2] = np.nan
+        values.append(y)
+    codes = np.repeat(np.arange(n_groups), sizes)
+    return codes, np.concatenate(values), values
+
+
+# Modellauswahl je Reihe direkt mit np.linalg.lstsq über die Werte ohne NaN
+def lstsq_selection(y, max_degree):
+    x = np.arange(len(y), dtype=float)
+    clean = ~np.isnan(y)
+    m = clean.sum()
+    best = (0, np.nan, None, np.nan)
+    if m < 2:
+        return best
+    ss_tot = ((y[clean] - y[clean].mean()) ** 2).sum()
+    for degree in range(1, max_degree + 1):
+        if degree > 1 and m < degree + 2:
+            break
+        coef = np.linalg.lstsq(vandermonde(len(y), degree)[clean], y[clean], rcond=None)[0]
+        ss_res = ((y[clean] - vandermonde(len(y), degree)[clean] @ coef) ** 2).sum()
+        r2 = 1 - ss_res / ss_tot if ss_tot > 0 else float(ss_res <= np.finfo(float).eps)
+        adjusted = 1 - (1 - r2) * (m - 1) / (m - degree - 1) if m > degree + 1 else np.nan
+        if degree == 1 or adjusted > best[1] + ADJUSTED_R2_TOLERANCE:
+            best = (degree, adjusted, coef, r2)
+    return best
+
+
+@pytest.mark.parametrize('max_degree', [1, 2, 3])
+def test_selection_matches_per_series_lstsq(max_degree):
+    codes, values, series = synthetic_series(max_degree)
+    selected = select_models(codes, values, len(series), max_degree)
+
+    for code, y in enumerate(series):
+        degree, adjusted, coef, r2 = lstsq_selection(y, max_degree)
+        assert selected['degree'][code] == degree
+        if degree:
+            np.testing.assert_allclose(selected['coef'][code, :degree + 1], coef, rtol=1e-6, atol=1e-6)
+            assert not selected['coef'][code, degree + 1:].any()
+            assert selected['r2'][code] == pytest.approx(r2, rel=1e-6, abs=1e-9)
+        else:
+            assert np.isnan(selected['coef'][code]).all()
+
+
+# Gemaskte Pseudo-Inverse: gleiche Koeffizienten wie lstsq über die gültigen Werte
+@pytest.mark.parametrize('degree', [1, 2, 3])
+def test_masked_pinv_matches_lstsq(degree):
+    rng = np.random.default_rng(degree)
+    block = rng.normal(0, 1, (50, 12))
+    valid = rng.random(block.shape) > 0.3
+    valid[:, :degree + 1] = True
+    coef = np.einsum('gkl,gl->gk', masked_pinv(valid, degree), np.where(valid, block, 0.0))
+
+    for g in range(len(block)):
+        expected = np.linalg.lstsq(vandermonde(12, degree)[valid[g]], block[g, valid[g]], rcond=None)[0]
+        np.testing.assert_allclose(coef[g], expected, rtol=1e-8, atol=1e-10)
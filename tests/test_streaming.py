@@ -0,0 +1,21 @@
+from sqlalchemy import text
+
+from tci.loader import load_ldp
+from tci.metrics import METRICS, compute_metrics
+from tci.streaming import run_streaming
+
+
+# Blockweises Lesen und Schreiben auf einer SQLite-Datei, mit NULL-Business-IDs
+# und Gruppen, die über Blockgrenzen reichen: gleiche Kennzahlen wie in einem Stück
+def test_streaming_matches_full_computation(make_ldp, assert_written):
+    engine = make_ldp(n_ids=3000)
+    with engine.begin() as connection:
+        connection.execute(text("INSERT INTO ldp (`Key Date`, `Business ID`, `Value`) VALUES "
+                                "('2022-03-31 00:00:00', NULL, 5.0), ('2022-06-30 00:00:00', NULL, 7.0)"))
+    expected = compute_metrics(load_ldp(engine))
+
+    total_rows, chunks = run_streaming(engine, chunk_rows=5000)
+
+    assert chunks > 2
+    assert total_rows == len(expected)
+    assert_written(engine, expected, [column for column, _ in METRICS.values()])
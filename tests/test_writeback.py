@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import text
+
+from tci.jobs import compute_rows
+from tci.loader import load_ldp
+from tci.schema import ensure_schema
+from tci.writeback import bulk_update, changed_rows
+
+KEYS = ['Key Date', 'Business ID']
+
+
+def frame(values, flags):
+    return pd.DataFrame({'Key Date': pd.to_datetime(['2020-03-31', '2020-06-30', '2020-09-30', '2020-12-31']),
+                         'Business ID': ['A', 'A', 'B', 'B'], 'Volatility': values, 'Within_Range': flags})
+
+
+# Toleranz, NaN = NULL, Bools gegen gespeicherte 0/1 und fehlende Zeilen
+def test_changed_rows_compares_with_tolerance():
+    current = frame([1.0, np.nan, 3.0, 4.0], [1.0, 0.0, 1.0, np.nan]).iloc[:3]
+    new = frame([1.0 + 1e-12, np.nan, 3.5, 4.0], [True, False, False, True])
+
+    changed, counts, sample = changed_rows(new, current, KEYS, ['Volatility', 'Within_Range'], sample_rows=5)
+
+    assert changed.tolist() == [False, False, True, True]
+    assert counts == {'Volatility': 2, 'Within_Range': 2}
+    assert sample['Business ID'].tolist() == ['B', 'B']
+    assert sample['Volatility (alt)'].iloc[0] == 3.0
+
+
+# Werte je Business ID gegen mehrere gespeicherte Zeilen: eine abweichende genügt
+def test_changed_rows_by_group_key():
+    current = pd.DataFrame({'Business ID': ['A', 'A', 'B', 'B'], 'Steigung': [2.0, 2.0, 5.0, 4.0]})
+    new = pd.DataFrame({'Business ID': ['A', 'B'], 'Steigung': [2.0, 5.0]})
+
+    changed, counts, _ = changed_rows(new, current, ['Business ID'], ['Steigung'])
+
+    assert changed.tolist() == [False, True]
+    assert counts == {'Steigung': 1}
+
+
+# Key Date als Text mit Mikrosekunden (so legt z.B. SQLAlchemy DATETIME in SQLite
+# ab), gesendet wird ohne: alle Zeilen werden trotzdem getroffen
+@pytest.mark.parametrize('method', ['staging', 'executemany'])
+def test_update_matches_key_dates_stored_in_other_formats(ldp_engine, assert_written, method):
+    ensure_schema(ldp_engine, 'ldp', ['Volatility'])
+    with ldp_engine.begin() as connection:
+        connection.execute(text("UPDATE ldp SET `Key Date` = `Key Date` || '.000000'"))
+    df = load_ldp(ldp_engine)
+    rows = compute_rows(df, ['volatility'])
+
+    report = bulk_update(ldp_engine, rows, ['Key Date', 'Business ID'], ['Volatility'], method=method)
+
+    assert report.affected == len(rows)
+    assert_written(ldp_engine, rows, ['Volatility'])